@@ -0,0 +1,497 @@
+"""
+성능 측정 도구.
+
+    python bench.py pow [--seconds 3] [--workers N]
+    python bench.py stress [--seconds 5] [--writers 4] [--readers 4]
+    python bench.py codec [--blocks 200] [--txs 100]
+    python bench.py blocks [--blocks 100000]
+    python bench.py tx-load [--nodes 3] [--txs 2000] [--batch-size 100]
+    python bench.py sync [--blocks 1050] [--txs 100]
+    python bench.py store [--blocks 5000] [--txs 50]
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import threading
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, time
+
+from miner import ProofOfWorkMiner, difficulty_to_target, search_range
+
+# 측정용 목표값: 절대 만족할 수 없으므로 주어진 nonce 범위를 끝까지 해시합니다.
+IMPOSSIBLE_TARGET = bytes(32)
+
+
+def legacy_valid_proof(last_proof, proof):
+    """기존 Blockchain.valid_proof와 같은 방식 (f-string + hexdigest + 슬라이싱)"""
+    guess = f'{last_proof}{proof}'.encode()
+    guess_hash = hashlib.sha256(guess).hexdigest()
+    return guess_hash[:4] == "0000"
+
+
+def measure(label, run, seconds):
+    """run(start, count)을 seconds초 동안 반복 호출해 초당 해시 수를 출력합니다."""
+    count = 50000
+    hashes = 0
+    started = perf_counter()
+    while perf_counter() - started < seconds:
+        hashes += run(hashes, count)
+    elapsed = perf_counter() - started
+    rate = hashes / elapsed
+    print(f"{label:<28} {rate:>14,.0f} H/s")
+    return rate
+
+
+def bench_pow(args):
+    last_proof = 35293
+
+    def legacy(start, count):
+        for proof in range(start, start + count):
+            legacy_valid_proof(last_proof, proof)
+        return count
+
+    def single(start, count):
+        search_range(last_proof, start, start + count, IMPOSSIBLE_TARGET)
+        return count
+
+    miner = ProofOfWorkMiner(IMPOSSIBLE_TARGET, args.workers)
+    pool = miner._get_pool()
+
+    def parallel(start, count):
+        # 모든 작업자에게 count개씩 나누어 동시에 탐색
+        starts = [start + i * count for i in range(miner.workers)]
+        list(pool.map(search_range, [last_proof] * miner.workers, starts, [s + count for s in starts], [IMPOSSIBLE_TARGET] * miner.workers))
+        return count * miner.workers
+
+    parallel(0, 1)  # 작업자 프로세스를 미리 띄워 둠
+
+    print(f"작업 증명 해시 속도 ({args.seconds}초씩 측정, 작업자 {miner.workers}개)")
+    base = measure('기존 루프 (1코어)', legacy, args.seconds)
+    rate = measure('prefix 재사용 (1코어)', single, args.seconds)
+    multi = measure(f'프로세스 풀 ({miner.workers}코어)', parallel, args.seconds)
+    print(f"기존 대비: 1코어 {rate / base:.2f}배, 전체 {multi / base:.2f}배")
+    miner.shutdown()
+
+
+def bench_stress(args):
+    """
+    노드의 쓰기/읽기 API를 여러 스레드에서 동시에 호출한 뒤, 체인과 잔액 상태가 온전한지 검사합니다.
+    (노드 프로세스를 띄우지 않고 Flask 테스트 클라이언트로 같은 프로세스 안에서 실행)
+    """
+    import blockchain_node_v3 as node
+    from merkle import MERKLE_VERSION, compute_merkle_root
+    from mempool import transaction_id
+    from state import BLOCK_REWARD, AccountState
+
+    blockchain = node.blockchain
+    node.app.config['PORT'] = 0
+    node.node_identifier = 'stress-miner'
+    blockchain.set_pow_target(difficulty_to_target(args.difficulty), workers=1)
+    statuses = Counter()
+    errors = []
+    stop = threading.Event()
+
+    def call(client, label, method, path, **kwargs):
+        try:
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+        except Exception as e:
+            errors.append(f'{label}: {e!r}')
+            return None
+        statuses[(label, response.status_code)] += 1
+        if response.status_code >= 500 and not (label == 'transactions/new' and response.status_code == 503):
+            errors.append(f'{label}: HTTP {response.status_code}')
+        return response
+
+    def send_transactions(worker):
+        client = node.app.test_client()
+        while not stop.is_set():
+            transaction = {'sender': 'stress-miner', 'recipient': f'user-{worker}', 'amount': 0.01, 'time': time()}
+            call(client, 'transactions/new', 'POST', '/transactions/new', json=transaction)
+
+    def mine(worker):
+        client = node.app.test_client()
+        while not stop.is_set():
+            call(client, 'mine', 'GET', '/mine')
+
+    def mine_fork(worker):
+        client = node.app.test_client()
+        while not stop.is_set():
+            call(client, 'mine_fork', 'POST', '/mine_fork', json={'transactions': []})
+
+    def receive_blocks(worker):
+        # 다른 노드가 채굴한 것처럼 채굴 보상만 담은 블록을 만들어 /blocks/receive 로 보냅니다. (경쟁에서 지면 곁가지로 보관: 202)
+        client = node.app.test_client()
+        while not stop.is_set():
+            last_block = blockchain.last_block
+            transactions = [{'sender': '0', 'recipient': f'peer-{worker}', 'amount': BLOCK_REWARD, 'time': time()}]
+            block = {
+                'index': last_block['index'] + 1,
+                'timestamp': time(),
+                'transactions': transactions,
+                'proof': blockchain.proof_of_work(last_block['proof']),
+                'previous_hash': blockchain.hash(last_block),
+                'merkle_root': compute_merkle_root(transactions, MERKLE_VERSION),
+                'version': MERKLE_VERSION
+            }
+            call(client, 'blocks/receive', 'POST', '/blocks/receive', json=block)
+
+    def read(worker):
+        client = node.app.test_client()
+        paths = ['/chain?format=ndjson', '/chain?limit=50', '/transactions/pending', '/status', '/chain/tip']
+        while not stop.is_set():
+            for path in paths:
+                call(client, path, 'GET', path)
+
+    writers = [send_transactions, mine, mine_fork, receive_blocks]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # 거래를 보낼 수 있도록 먼저 채굴 보상을 모아 둡니다.
+        funding_client = node.app.test_client()
+        for _ in range(args.funding_blocks):
+            call(funding_client, 'mine', 'GET', '/mine')
+
+        threads = [threading.Thread(target=writers[i % len(writers)], args=(i,), daemon=True) for i in range(args.writers)]
+        threads += [threading.Thread(target=read, args=(i,), daemon=True) for i in range(args.readers)]
+        started = perf_counter()
+        for thread in threads:
+            thread.start()
+        stop.wait(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=30)
+        elapsed = perf_counter() - started
+        blockchain.miner.shutdown()
+
+    print(f"동시 요청 부하 시험 ({elapsed:.1f}초, 쓰기 스레드 {args.writers}개, 읽기 스레드 {args.readers}개)")
+    for (label, code), n in sorted(statuses.items()):
+        print(f"  {label:<28} HTTP {code}: {n:>7,}")
+    print(f"  총 {sum(statuses.values()) / elapsed:,.0f} 요청/초")
+
+    chain = blockchain.chain
+    checks = {
+        'validate_chain 통과': blockchain.validate_chain(chain),
+        '블록 번호 연속': all(block['index'] == position + 1 for position, block in enumerate(chain)),
+        '잔액 상태가 체인 끝과 일치': blockchain.state.height == len(chain) and blockchain.state.tip_hash == blockchain.hash(chain[-1]),
+    }
+    rebuilt = AccountState()
+    rebuilt.rebuild(chain, blockchain.hash)
+    checks['잔액을 처음부터 다시 계산한 값과 일치'] = rebuilt.balances == blockchain.state.balances
+    checks['음수 잔액 없음'] = all(balance >= 0 for balance in blockchain.state.balances.values())
+    txids = [transaction_id(tx) for block in chain for tx in block['transactions']]
+    checks['체인에 중복 거래 없음'] = len(txids) == len(set(txids))
+    checks['대기 목록에 이미 담긴 거래 없음'] = not set(txids) & {transaction_id(tx) for tx in blockchain.mempool}
+    checks['5xx 응답/예외 없음'] = not errors
+
+    print(f"체인 길이 {len(chain)}, 거래 {len(txids)}개, 대기 거래 {len(blockchain.mempool)}개")
+    for name, ok in checks.items():
+        print(f"  {'✅' if ok else '🚨'} {name}")
+    for error in errors[:10]:
+        print(f"     {error}")
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+def bench_codec(args):
+    """JSON과 바이너리 인코딩(codec)의 블록 크기, 인코딩/디코딩 시간, 블록 해시 계산 시간을 비교합니다."""
+    import codec
+    from blockchain_node_v3 import Blockchain
+    from merkle import BINARY_HEADER_VERSION, MERKLE_VERSION, compute_merkle_root
+
+    def make_blocks(version):
+        blocks = []
+        for index in range(2, args.blocks + 2):
+            transactions = [
+                {'sender': f'sender-{index}-{i}', 'recipient': f'recipient-{i}', 'amount': i + 1, 'time': time(), 'fee': 0.001 * i}
+                for i in range(args.txs)
+            ]
+            blocks.append({
+                'index': index,
+                'timestamp': time(),
+                'transactions': transactions,
+                'proof': 123456 + index,
+                'previous_hash': hashlib.sha256(str(index).encode()).hexdigest(),
+                'merkle_root': compute_merkle_root(transactions, version),
+                'version': version
+            })
+        return blocks
+
+    def timed(run):
+        started = perf_counter()
+        result = run()
+        return result, perf_counter() - started
+
+    json_blocks = make_blocks(MERKLE_VERSION)
+    binary_blocks = make_blocks(BINARY_HEADER_VERSION)
+
+    encoded_json, json_encode = timed(lambda: [json.dumps(block, sort_keys=True, separators=(',', ':')).encode() for block in json_blocks])
+    _, json_decode = timed(lambda: [json.loads(payload) for payload in encoded_json])
+    _, json_hash = timed(lambda: [Blockchain.hash(block) for block in json_blocks])
+    encoded_binary, binary_encode = timed(lambda: [codec.encode_block(block) for block in binary_blocks])
+    decoded, binary_decode = timed(lambda: [codec.decode_block(payload) for payload in encoded_binary])
+    _, binary_hash = timed(lambda: [Blockchain.hash(block) for block in binary_blocks])
+    assert decoded == binary_blocks
+
+    json_size = sum(map(len, encoded_json))
+    binary_size = sum(map(len, encoded_binary))
+    print(f"블록 {args.blocks}개 (블록당 거래 {args.txs}개)")
+    print(f"{'':<16} {'JSON (버전 2)':>16} {'바이너리 (버전 3)':>18}")
+    print(f"{'크기':<16} {json_size:>14,} B {binary_size:>16,} B  ({binary_size / json_size:.0%})")
+    print(f"{'인코딩':<16} {json_encode * 1000:>13.1f} ms {binary_encode * 1000:>15.1f} ms")
+    print(f"{'디코딩':<16} {json_decode * 1000:>13.1f} ms {binary_decode * 1000:>15.1f} ms")
+    print(f"{'블록 해시':<16} {json_hash * 1000:>13.1f} ms {binary_hash * 1000:>15.1f} ms")
+
+
+def bench_blocks(args):
+    """dict 블록과 Block(__slots__, 해시 캐시)의 메모리 사용량과 해시 조회 비용을 비교합니다."""
+    import tracemalloc
+    from block import Block, compute_hash
+    from blockchain_node_v3 import Blockchain
+    from merkle import BINARY_HEADER_VERSION, MERKLE_VERSION, compute_merkle_root
+
+    # 거래 dict는 양쪽이 똑같이 쓰므로 미리 만들어 두고, 블록 자체의 크기만 비교합니다.
+    transactions = [[{'sender': '0', 'recipient': 'miner', 'amount': 1, 'time': 1500000000.0 + i}] for i in range(args.blocks)]
+    merkle_roots = [compute_merkle_root(txs) for txs in transactions]
+
+    def make_dicts(version):
+        chain = []
+        previous_hash = hashlib.sha256(b'genesis').hexdigest()
+        for i in range(args.blocks):
+            block = {
+                'index': i + 1,
+                'timestamp': 1500000000.0 + i,
+                'transactions': list(transactions[i]),
+                'proof': i * 7919,
+                'previous_hash': previous_hash,
+                'merkle_root': merkle_roots[i],
+                'version': version
+            }
+            previous_hash = compute_hash(block)
+            chain.append(block)
+        return chain
+
+    def measure_memory(build):
+        tracemalloc.start()
+        chain = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return chain, size
+
+    def hash_passes(chain, passes=3):
+        # validate_chain처럼 이전 블록 해시와 previous_hash를 비교하는 작업을 여러 번 반복
+        started = perf_counter()
+        for _ in range(passes):
+            for previous, block in zip(chain, chain[1:]):
+                assert block['previous_hash'] == Blockchain.hash(previous)
+        return (perf_counter() - started) / passes
+
+    legacy_chain = make_dicts(MERKLE_VERSION)
+    dict_source = make_dicts(BINARY_HEADER_VERSION)
+    dict_chain, dict_size = measure_memory(lambda: [dict(block) for block in dict_source])
+    block_chain, block_size = measure_memory(lambda: [Block.from_dict(block) for block in dict_source])
+    first_pass = hash_passes(block_chain, passes=1)
+
+    print(f"블록 {args.blocks:,}개 체인")
+    print(f"블록 메모리 (거래 제외): dict {dict_size / args.blocks:,.0f} B/블록, Block {block_size / args.blocks:,.0f} B/블록 ({block_size / dict_size:.0%})")
+    print("체인 전체 해시 조회 1회 (이전 블록 해시 비교)")
+    print(f"  dict, 버전 2 (JSON 헤더)      {hash_passes(legacy_chain) * 1000:>9.1f} ms")
+    print(f"  dict, 버전 3 (바이너리 헤더)  {hash_passes(dict_chain) * 1000:>9.1f} ms")
+    print(f"  Block, 첫 조회 (해시 계산)    {first_pass * 1000:>9.1f} ms")
+    print(f"  Block, 이후 조회 (캐시)       {hash_passes(block_chain) * 1000:>9.1f} ms")
+
+
+def bench_tx_load(args):
+    """
+    노드 여러 개를 띄워 거래를 한 노드에 보내고, 모든 노드의 대기 목록에 전파될 때까지의 처리량(tx/s)을 잽니다.
+    - 예전 방식: 거래마다 /transactions/new, 노드는 거래마다 모든 이웃에게 바로 전파 (--tx-relay-window 0)
+    - 일괄 전파: 거래마다 /transactions/new, 노드는 모아서 inv/batch로 전파
+    - 일괄 제출: /transactions/batch로 batch-size개씩 제출, 노드는 모아서 inv/batch로 전파
+    """
+    modes = [
+        ('예전 방식 (거래마다 전파)', False, ['--tx-relay-window', '0']),
+        ('일괄 전파 (inv/batch)', False, ['--tx-relay-window', str(args.relay_window)]),
+        ('일괄 제출 + 일괄 전파', True, ['--tx-relay-window', str(args.relay_window)]),
+    ]
+    from simulator import SimulatedNetwork
+
+    print(f"거래 전파 처리량 (노드 {args.nodes}개, 거래 {args.txs:,}개, 제출 스레드 {args.clients}개)")
+    for label, batched, extra_args in modes:
+        node_args = ['--no-balance-check', '--mempool-size', str(args.txs * 2)] + extra_args
+        with SimulatedNetwork(args.nodes, args.base_port, use_dashboard=False, node_args=node_args) as network:
+            stamp = time()
+            transactions = [{'sender': 'load', 'recipient': f'user-{i % 100}', 'amount': 1, 'time': stamp + i * 1e-6} for i in range(args.txs)]
+            if batched:
+                chunks = [transactions[i:i + args.batch_size] for i in range(0, len(transactions), args.batch_size)]
+                submit = lambda chunk: network.post(0, '/transactions/batch', json={'transactions': chunk})
+            else:
+                chunks = transactions
+                submit = lambda transaction: network.post(0, '/transactions/new', json=transaction)
+
+            started = perf_counter()
+            with ThreadPoolExecutor(max_workers=args.clients) as pool:
+                list(pool.map(submit, chunks))
+            submitted = perf_counter() - started
+
+            # 모든 노드의 대기 목록에 거래가 다 들어올 때까지 기다립니다.
+            done = network.wait_until(lambda statuses: all(status['mempool_size'] >= args.txs for status in statuses), args.timeout)
+            propagated = perf_counter() - started
+            pending = [status['mempool_size'] for status in network.statuses()]
+        result = f"{args.txs / propagated:>9,.0f} tx/s" if done is not None else f"시간 초과 (노드별 대기 거래 {pending})"
+        print(f"  {label:<24} 제출 {args.txs / submitted:>9,.0f} tx/s, 전체 노드 전파 {result}")
+
+def bench_sync(args):
+    """
+    블록이 많이 쌓인 네트워크에 늦게 합류한 노드가 체인을 따라잡는 시간을 비교합니다.
+    - 전체 동기화: 제네시스부터 모든 블록을 받아 검증 (--no-fast-sync)
+    - 빠른 동기화: 이웃의 스냅샷(헤더 + 잔액)을 받고 스냅샷 이후 블록만 검증, 과거 블록은 백그라운드에서 검증
+    따라잡기는 새 노드가 요청에 응답하기 시작할 때까지(시작 전 동기화 완료), 전체 검증은 과거 블록 검증까지 끝날 때까지입니다.
+    """
+    from simulator import SimulatedNetwork
+
+    node_args = ['--difficulty', '1', '--mining-workers', '1', '--max-txs-per-block', str(args.txs)]
+    with SimulatedNetwork(1, args.base_port, args.base_port + 99, node_args=node_args, topology='full') as network:
+        print(f"체인 만드는 중... (블록 {args.blocks:,}개, 블록당 거래 {args.txs}개)")
+        # 동기화하는 노드는 잔액도 검증하므로, 거래는 0번 노드의 채굴 보상(블록마다 1) 안에서 보냅니다.
+        funder = network.miner_address(0)
+        amount = 1 / (args.txs * 2)
+        stamp = time()
+        for n in range(args.blocks - 1):
+            if n:
+                transactions = [{'sender': funder, 'recipient': f'user-{i % 100}', 'amount': amount, 'time': stamp + (n * args.txs + i) * 1e-6} for i in range(args.txs)]
+                network.post(0, '/transactions/batch', json={'transactions': transactions})
+            network.get(0, '/mine', timeout=60)
+        status = network.get(0, '/status').json()
+        print(f"블록 {status['length']:,}개 체인, 스냅샷 높이 {status['snapshot_height']}")
+
+        for label, extra_args in (('전체 동기화', ['--no-fast-sync']), ('빠른 동기화 (스냅샷)', [])):
+            started = perf_counter()
+            i = network.add_node(extra_args, timeout=args.timeout)
+            caught_up = perf_counter() - started
+            verified = network.wait_until(lambda statuses: statuses[i]['history_missing_blocks'] == 0, args.timeout)
+            verified = perf_counter() - started if verified is not None else None
+            joined = network.get(i, '/status').json()
+            before_ready = network.metric(i, 'blockchain_validated_blocks_total', source='chain')
+            result = f"{verified:6.2f}초" if verified is not None else '시간 초과'
+            print(f"  {label:<18} 따라잡기 {caught_up:6.2f}초 (검증한 블록 {before_ready:,.0f}개, 헤더만 {network.metric(i, 'blockchain_validated_blocks_total', source='snapshot'):,.0f}개), "
+                  f"전체 검증 {result}, 팁 일치 {joined['tip_hash'] == status['tip_hash']}")
+
+def bench_store(args):
+    """
+    블록 로그에서 체인을 읽는 두 방식의 시작 시간과 메모리를 비교합니다.
+    - 전체 읽기: 모든 블록을 거래 내역까지 디코딩해 Block으로 (예전 load_chain)
+    - 지연 읽기: 헤더와 위치만 읽은 StoredBlock, 거래 내역은 필요할 때 mmap으로 (BlockStore.open)
+    체인 길이를 두 배로 늘려 가며 재어, 지연 읽기의 메모리가 거래 수와 상관없이 블록당 일정한지 확인합니다.
+    """
+    import random
+    import tempfile
+    import tracemalloc
+    from block import Block
+    from block_store import BlockStore, read_blocks
+    from merkle import BINARY_HEADER_VERSION, compute_merkle_root
+
+    def measure(build):
+        # 시간은 tracemalloc 없이 따로 잽니다. (tracemalloc을 켜면 할당마다 느려짐)
+        started = perf_counter()
+        build()
+        elapsed = perf_counter() - started
+        tracemalloc.start()
+        chain = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return chain, size, elapsed
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.log')
+        store = BlockStore(path)
+        store.open()
+        previous_hash = hashlib.sha256(b'genesis').hexdigest()
+        written = 0
+        for length in (args.blocks, args.blocks * 2):
+            for i in range(written, length):
+                transactions = [{'sender': f'user-{j}', 'recipient': f'user-{j + 1}', 'amount': 1, 'time': 1500000000.0 + i + j * 1e-4} for j in range(args.txs)]
+                block = Block(i + 1, 1500000000.0 + i, transactions, i * 7919, previous_hash,
+                              compute_merkle_root(transactions, BINARY_HEADER_VERSION), BINARY_HEADER_VERSION)
+                previous_hash = store.append(block, block.hash).hash
+            store.flush()
+            written = length
+
+            eager_chain, eager_size, eager_time = measure(lambda: [Block.from_dict(block) for block in read_blocks(path)])
+            del eager_chain
+            readers = []
+
+            def open_lazy():
+                # open()은 읽기용 파일을 열어 두므로, 잰 뒤에 닫습니다.
+                readers.append(BlockStore(path, cache_size=args.cache_size))
+                return readers[-1].open()
+
+            lazy_chain, lazy_size, lazy_time = measure(open_lazy)
+            picks = [random.randrange(length) for _ in range(args.reads)]
+            started = perf_counter()
+            for position in picks:
+                lazy_chain[position]['transactions']
+            read_time = (perf_counter() - started) / args.reads
+            for reader in readers:
+                reader.close()
+
+            print(f"블록 {length:,}개 (블록당 거래 {args.txs}개, 로그 {os.path.getsize(path) / 2**20:,.1f} MB)")
+            print(f"  전체 읽기  {eager_time * 1000:>9.1f} ms, 메모리 {eager_size / 2**20:>8.1f} MB ({eager_size / length:>9,.0f} B/블록)")
+            print(f"  지연 읽기  {lazy_time * 1000:>9.1f} ms, 메모리 {lazy_size / 2**20:>8.1f} MB ({lazy_size / length:>9,.0f} B/블록)")
+            print(f"  무작위 블록의 거래 내역 읽기 {args.reads:,}회: 평균 {read_time * 1e6:,.1f} µs (캐시 {args.cache_size}개)")
+        store.close()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='블록체인 노드 성능 측정 도구')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pow_parser = subparsers.add_parser('pow', help='작업 증명 해시 속도 비교 (기존 루프 vs 새 채굴 엔진)')
+    pow_parser.add_argument('--seconds', default=3.0, type=float)
+    pow_parser.add_argument('--workers', default=os.cpu_count(), type=int)
+    pow_parser.set_defaults(func=bench_pow)
+
+    stress_parser = subparsers.add_parser('stress', help='쓰기/읽기 API 동시 호출 후 체인 무결성 검사')
+    stress_parser.add_argument('--seconds', default=5.0, type=float)
+    stress_parser.add_argument('--writers', default=4, type=int, help='쓰기 스레드 수 (거래 추가, 채굴, 공격용 채굴, 블록 수신을 번갈아 배정)')
+    stress_parser.add_argument('--readers', default=4, type=int, help='읽기 스레드 수 (/chain, /transactions/pending, /status)')
+    stress_parser.add_argument('--difficulty', default=2, type=int, help='시험용 작업 증명 난이도 (낮을수록 블록이 자주 생김)')
+    stress_parser.add_argument('--funding-blocks', default=20, type=int, help='시작 전에 채굴해 두는 블록 수 (거래 송신자의 잔액)')
+    stress_parser.set_defaults(func=bench_stress)
+
+    codec_parser = subparsers.add_parser('codec', help='JSON vs 바이너리 블록 인코딩 크기/속도 비교')
+    codec_parser.add_argument('--blocks', default=200, type=int)
+    codec_parser.add_argument('--txs', default=100, type=int, help='블록당 거래 수')
+    codec_parser.set_defaults(func=bench_codec)
+
+    blocks_parser = subparsers.add_parser('blocks', help='dict 블록 vs Block의 메모리/해시 조회 비용 비교')
+    blocks_parser.add_argument('--blocks', default=100000, type=int)
+    blocks_parser.set_defaults(func=bench_blocks)
+
+    tx_load_parser = subparsers.add_parser('tx-load', help='거래 제출/전파 처리량 비교 (거래마다 전파 vs 일괄 전파/제출)')
+    tx_load_parser.add_argument('--nodes', default=3, type=int)
+    tx_load_parser.add_argument('--txs', default=2000, type=int)
+    tx_load_parser.add_argument('--batch-size', default=100, type=int, help='일괄 제출 시 요청 하나에 담는 거래 수')
+    tx_load_parser.add_argument('--clients', default=8, type=int, help='거래를 동시에 제출하는 스레드 수')
+    tx_load_parser.add_argument('--relay-window', default=0.05, type=float, help='노드의 --tx-relay-window 값')
+    tx_load_parser.add_argument('--base-port', default=5600, type=int, help='시험용 노드의 첫 포트 번호')
+    tx_load_parser.add_argument('--timeout', default=120.0, type=float)
+    tx_load_parser.set_defaults(func=bench_tx_load)
+
+    sync_parser = subparsers.add_parser('sync', help='늦게 합류한 노드의 동기화 시간 비교 (전체 동기화 vs 스냅샷 빠른 동기화)')
+    sync_parser.add_argument('--blocks', default=1050, type=int, help='미리 쌓아 둘 체인의 블록 수 (스냅샷은 100블록마다)')
+    sync_parser.add_argument('--txs', default=100, type=int, help='블록당 거래 수')
+    sync_parser.add_argument('--base-port', default=5650, type=int, help='시험용 노드의 첫 포트 번호 (관제실은 base-port + 99)')
+    sync_parser.add_argument('--timeout', default=300.0, type=float)
+    sync_parser.set_defaults(func=bench_sync)
+
+    store_parser = subparsers.add_parser('store', help='블록 로그 읽기 비교 (전체 읽기 vs 헤더만 읽고 거래 내역은 mmap으로)')
+    store_parser.add_argument('--blocks', default=5000, type=int, help='처음 재는 체인의 블록 수 (그다음 두 배로 늘려 다시 잼)')
+    store_parser.add_argument('--txs', default=50, type=int, help='블록당 거래 수')
+    store_parser.add_argument('--reads', default=2000, type=int, help='거래 내역을 읽어 볼 무작위 블록 수')
+    store_parser.add_argument('--cache-size', default=256, type=int, help='거래 내역 캐시 크기 (블록 수)')
+    store_parser.set_defaults(func=bench_store)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+from collections.abc import Mapping
+
+import codec
+from merkle import BINARY_HEADER_VERSION, LEGACY_VERSION, MERKLE_VERSION
+
+# API/파일에서 쓰는 블록 dict의 키 순서
+FIELDS = ('index', 'timestamp', 'transactions', 'proof', 'previous_hash', 'merkle_root', 'version')
+# 예전 블록에는 없을 수 있는 필드
+OPTIONAL_FIELDS = ('merkle_root', 'version')
+
+
+def header_of(block):
+    """
+    블록에서 거래 내역을 뺀 헤더 부분만 반환합니다. (해시 계산 대상)
+    예전 블록과 해시가 바뀌지 않도록, 'version'은 버전 2 이상의 블록에만 포함합니다.
+    """
+    header = {
+        'index': block['index'],
+        'timestamp': block['timestamp'],
+        'proof': block['proof'],
+        'previous_hash': block['previous_hash'],
+        'merkle_root': block.get('merkle_root', '')
+    }
+    if block.get('version', LEGACY_VERSION) >= MERKLE_VERSION:
+        header['version'] = block['version']
+    return header
+
+
+def compute_hash(block):
+    """블록(dict 또는 Block)의 해시를 새로 계산합니다."""
+    # 버전 3 이상 블록은 고정 길이 헤더 바이트열의 해시입니다. (dict를 다시 JSON으로 직렬화하지 않음)
+    if block.get('version', LEGACY_VERSION) >= BINARY_HEADER_VERSION:
+        return codec.header_hash(block)
+    block_string = json.dumps(header_of(block), sort_keys=True).encode()
+    return hashlib.sha256(block_string).hexdigest()
+
+
+class Block(Mapping):
+    """
+    체인에 보관하는 블록. 만든 뒤에는 바꿀 수 없고(immutable), 해시는 처음 필요할 때 한 번만 계산해 보관합니다.
+    __slots__를 사용하므로 블록마다 dict를 두는 것보다 메모리를 적게 쓰며,
+    block['index'], block.get('version') 처럼 예전 dict 블록과 같은 방식으로도 읽을 수 있습니다.
+    API 응답이나 파일에 쓸 때는 to_dict()로 예전 dict 형태로 바꿉니다.
+    """
+
+    __slots__ = FIELDS + ('_hash',)
+
+    def __init__(self, index, timestamp, transactions, proof, previous_hash, merkle_root=None, version=None):
+        # 버전은 해시 계산 방식을 고르는 데 쓰이므로, 정수가 아니면 비교할 때 TypeError가 납니다.
+        if version is not None and type(version) is not int:
+            raise ValueError(f"블록 버전은 정수여야 합니다: {version!r}")
+        set_field = object.__setattr__
+        set_field(self, 'index', index)
+        set_field(self, 'timestamp', timestamp)
+        set_field(self, 'transactions', tuple(transactions))
+        set_field(self, 'proof', proof)
+        set_field(self, 'previous_hash', previous_hash)
+        set_field(self, 'merkle_root', merkle_root)
+        set_field(self, 'version', version)
+        set_field(self, '_hash', None)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        API/파일의 블록 dict로 Block을 만듭니다. 이미 Block이면 그대로 반환합니다. (필수 필드가 없으면 KeyError, 버전이 정수가 아니면 ValueError)
+        거래 내역을 나중에 읽는 하위 클래스(StoredBlock)는 거래 내역을 읽어 새 Block으로 만듭니다.
+        """
+        if type(data) is cls:
+            return data
+        return cls(
+            data['index'],
+            data['timestamp'],
+            data['transactions'],
+            data['proof'],
+            data['previous_hash'],
+            data.get('merkle_root'),
+            data.get('version')
+        )
+
+    def to_dict(self):
+        return {key: list(value) if key == 'transactions' else value for key, value in self.items()}
+
+    @property
+    def hash(self):
+        block_hash = self._hash
+        if block_hash is None:
+            if self.version is not None and self.version >= BINARY_HEADER_VERSION:
+                header = codec.pack_header(self.version, self.index, self.timestamp, self.proof, self.previous_hash, self.merkle_root)
+                block_hash = hashlib.sha256(header).hexdigest()
+            else:
+                block_hash = compute_hash(self)
+            object.__setattr__(self, '_hash', block_hash)
+        return block_hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Block은 만든 뒤에 바꿀 수 없습니다.')
+
+    def __delattr__(self, name):
+        raise AttributeError('Block은 만든 뒤에 바꿀 수 없습니다.')
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            value = getattr(self, key)
+            if value is not None or key not in OPTIONAL_FIELDS:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in FIELDS:
+            if key not in OPTIONAL_FIELDS or getattr(self, key) is not None:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, Block):
+            return self.hash == other.hash and self['transactions'] == other['transactions']
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'Block(index={self.index}, hash={self.hash[:16]}...)'
+
+    def __reduce__(self):
+        return (Block, tuple(getattr(self, key) for key in FIELDS))
+
+
+class HeaderBlock(Block):
+    """
+    거래 내역 없이 헤더만 가진 블록. 스냅샷으로 시작한 노드가, 거래 내역을 아직 받지 못한 과거 블록 자리에 둡니다.
+    블록 해시는 헤더만으로 계산하므로 원래 블록과 같고, 해시 연결과 작업 증명도 그대로 확인할 수 있습니다.
+    block['transactions']는 KeyError를 던지므로, 거래 내역이 필요한 곳에서 조용히 빈 블록으로 취급하지 않습니다.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, index, timestamp, proof, previous_hash, merkle_root=None, version=None):
+        super().__init__(index, timestamp, (), proof, previous_hash, merkle_root, version)
+
+    @classmethod
+    def from_header(cls, header):
+        """거래 내역을 뺀 블록 dict(헤더)로 HeaderBlock을 만듭니다. (필수 필드가 없으면 KeyError)"""
+        return cls(
+            header['index'],
+            header['timestamp'],
+            header['proof'],
+            header['previous_hash'],
+            header.get('merkle_root'),
+            header.get('version')
+        )
+
+    def __getitem__(self, key):
+        if key == 'transactions':
+            raise KeyError(key)
+        return super().__getitem__(key)
+
+    def __iter__(self):
+        return (key for key in super().__iter__() if key != 'transactions')
+
+    def __repr__(self):
+        return f'HeaderBlock(index={self.index}, hash={self.hash[:16]}...)'
+
+    def __reduce__(self):
+        return (HeaderBlock, (self.index, self.timestamp, self.proof, self.previous_hash, self.merkle_root, self.version))
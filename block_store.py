@@ -0,0 +1,363 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+from block import FIELDS, Block, compute_hash
+from codec import decode_block, decode_header, encode_block, is_binary
+
+# 레코드 헤더: (payload 길이, payload의 crc32) - 빅엔디안 4바이트씩
+RECORD_HEADER = struct.Struct('>II')
+
+# 거래 내역을 메모리에 보관해 두는 최근 블록 수 (LRU)
+DEFAULT_CACHE_SIZE = 256
+
+
+class StaleBlockError(ValueError):
+    """StoredBlock이 가리키는 위치의 레코드가 체인 교체로 잘려 나갔거나 다른 블록으로 바뀌었습니다."""
+
+
+class StoredBlock(Block):
+    """
+    블록 로그에 기록된 블록. 헤더와 로그 안의 위치(offset)만 메모리에 두고, 거래 내역은 필요할 때
+    BlockStore가 메모리 매핑(mmap)한 로그 파일에서 레코드 하나만 읽습니다. (최근에 읽은 거래 내역은 LRU 캐시에 보관)
+    그래서 체인이 길어져도 메모리에는 블록마다 헤더만 남습니다.
+    """
+
+    __slots__ = ('_store', '_offset')
+
+    def __init__(self, store, offset, header, block_hash=None):
+        super().__init__(
+            header['index'], header['timestamp'], (), header['proof'], header['previous_hash'],
+            header.get('merkle_root'), header.get('version')
+        )
+        object.__setattr__(self, '_store', store)
+        object.__setattr__(self, '_offset', offset)
+        if block_hash is not None:
+            object.__setattr__(self, '_hash', block_hash)
+
+    def __getitem__(self, key):
+        if key == 'transactions':
+            return self._store.read_transactions(self)
+        return super().__getitem__(key)
+
+    def __repr__(self):
+        return f'StoredBlock(index={self.index}, offset={self._offset}, hash={self.hash[:16]}...)'
+
+    def __reduce__(self):
+        return (Block, tuple(self[key] if key == 'transactions' else getattr(self, key) for key in FIELDS))
+
+
+class BlockStore:
+    """
+    Append-only 블록 로그 저장소.
+    블록 하나당 [길이 + crc32 + payload] 레코드 하나를 파일 끝에 덧붙이므로,
+    블록 저장 비용이 체인 길이와 무관하게 O(1)입니다.
+    payload는 binary가 True면 바이너리 인코딩(codec), 아니면 JSON이며, 읽을 때는 첫 바이트로 구별하므로
+    두 형식이 섞인 로그도 그대로 읽을 수 있습니다.
+    fsync_interval 블록마다 디스크에 fsync 하고, 체크포인트 파일을 갱신합니다.
+    open()과 append()는 헤더만 가진 StoredBlock을 반환하며, 거래 내역은 로그 파일을 mmap으로 열어 위치(offset)로 바로 읽습니다.
+    최근 cache_size개 블록의 거래 내역은 블록 해시로 캐시하므로, 로그가 잘린 뒤에도 같은 블록은 캐시에서 읽을 수 있습니다.
+    """
+
+    def __init__(self, path, fsync_interval=16, binary=True, cache_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.binary = binary
+        self.checkpoint_path = os.path.splitext(path)[0] + '.ckpt'
+        self.fsync_interval = fsync_interval
+        self.offsets = []          # 각 블록 레코드의 시작 위치
+        self.end_offset = 0        # 마지막 정상 레코드의 끝 위치
+        self.tip_hash = None
+        self.recovered_bytes = 0   # 복구 과정에서 잘라낸 손상된 꼬리 크기
+        self.checkpoint = None
+        self._unsynced = 0
+        self._file = None
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()  # 블록 해시 -> 거래 내역 (tuple)
+        self._cache_lock = threading.Lock()
+        self._reader = None
+        self._map = None
+        self._map_lock = threading.Lock()  # mmap을 읽는 동안 로그를 잘라내지 않도록 (잘린 영역을 읽으면 SIGBUS)
+
+    def open(self):
+        """
+        로그 파일을 훑어 블록마다 헤더와 위치만 읽은 StoredBlock 목록을 반환하고, 이후 추가(append)할 수 있도록 엽니다.
+        버전 3 블록은 거래 목록을 디코딩하지 않으므로, 체인이 길어도 시작할 때 메모리에 거래 내역을 올리지 않습니다.
+        크래시로 인해 마지막 레코드가 잘렸거나 손상되었다면 그 지점부터 잘라내어 복구합니다.
+        로그 중간의 레코드가 손상되었다면 아무것도 잘라내지 않고 ValueError.
+        """
+        self.checkpoint = self._read_checkpoint()
+        blocks = []
+        self.offsets = []
+        self.end_offset = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                for offset, end, header in iter_records(f, headers_only=True):
+                    self.offsets.append(offset)
+                    self.end_offset = end
+                    blocks.append(StoredBlock(self, offset, header))
+                file_size = os.fstat(f.fileno()).st_size
+            if file_size > self.end_offset:
+                self.recovered_bytes = file_size - self.end_offset
+                with open(self.path, 'r+b') as f:
+                    f.truncate(self.end_offset)
+                    f.flush()
+                    os.fsync(f.fileno())
+        self._file = open(self.path, 'ab')
+        self._reader = open(self.path, 'rb')
+        return blocks
+
+    def append(self, block, block_hash):
+        """블록 하나를 로그 끝에 기록하고, 이 블록을 가리키는 StoredBlock을 반환합니다. (거래 내역은 캐시에 넣어 둠)"""
+        offset = self.end_offset
+        if self.binary:
+            payload = encode_block(block)
+        else:
+            payload = json.dumps(dict(block), sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        self.offsets.append(self.end_offset)
+        self._file.write(record)
+        self.end_offset += len(record)
+        self.tip_hash = block_hash
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_interval:
+            self.flush()
+        else:
+            self._file.flush()
+        self._cache_put(block_hash, tuple(block['transactions']))
+        return StoredBlock(self, offset, block, block_hash)
+
+    def read_transactions(self, block):
+        """
+        StoredBlock의 거래 내역. 캐시에 없으면 로그 파일에서 그 블록의 레코드 하나만 읽어 디코딩합니다.
+        그 위치의 블록이 바뀌었다면(체인 교체로 로그가 잘린 뒤 다시 쓰임) StaleBlockError.
+        """
+        block_hash = block.hash
+        with self._cache_lock:
+            transactions = self._cache.get(block_hash)
+            if transactions is not None:
+                self._cache.move_to_end(block_hash)
+                self.cache_hits += 1
+                return transactions
+            self.cache_misses += 1
+        payload = self._read_payload(block._offset)
+        data = None
+        if payload is not None:
+            data = decode_block(payload) if is_binary(payload) else json.loads(payload.decode('utf-8'))
+        if data is None or compute_hash(data) != block_hash:
+            raise StaleBlockError(f"블록 로그의 {block._offset} 위치에서 블록 #{block.index}을(를) 찾을 수 없습니다. (체인이 교체되었을 수 있음)")
+        transactions = tuple(data['transactions'])
+        self._cache_put(block_hash, transactions)
+        return transactions
+
+    def _read_payload(self, offset):
+        """mmap에서 offset 위치 레코드의 payload를 복사해 반환합니다. (없거나 crc가 맞지 않으면 None)"""
+        with self._map_lock:
+            if self._reader is None:
+                return None
+            if self._map is None or offset + RECORD_HEADER.size > len(self._map):
+                self._remap()
+            if self._map is None or offset + RECORD_HEADER.size > len(self._map):
+                return None
+            length, crc = RECORD_HEADER.unpack_from(self._map, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > len(self._map):
+                self._remap()
+                if start + length > len(self._map):
+                    return None
+            payload = self._map[start:start + length]
+        return payload if zlib.crc32(payload) == crc else None
+
+    def _remap(self):
+        # self._map_lock을 잡은 상태에서 호출. 로그가 늘어났으면 늘어난 크기로 다시 매핑합니다.
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        size = os.fstat(self._reader.fileno()).st_size
+        if size:
+            self._map = mmap.mmap(self._reader.fileno(), size, access=mmap.ACCESS_READ)
+
+    def _cache_put(self, block_hash, transactions):
+        with self._cache_lock:
+            self._cache[block_hash] = transactions
+            self._cache.move_to_end(block_hash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def truncate(self, length, tip_hash):
+        """
+        로그를 앞에서부터 length개의 블록만 남기고 잘라냅니다. (체인 교체 시 사용)
+        tip_hash는 잘라낸 뒤 마지막으로 남는 블록의 해시입니다.
+        """
+        if length >= len(self.offsets):
+            return
+        self.end_offset = self.offsets[length]
+        del self.offsets[length:]
+        self._file.flush()
+        with self._map_lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.truncate(self.end_offset)
+        self.tip_hash = tip_hash
+        self.flush()
+
+    def flush(self):
+        """버퍼를 디스크에 fsync 하고 체크포인트를 갱신합니다."""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._write_checkpoint()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        with self._map_lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._reader.close()
+            self._reader = None
+
+    def discard_checkpoint(self):
+        """체크포인트 파일을 지웁니다. 다음에 열 때는 처음부터 다시 검증합니다."""
+        self.checkpoint = None
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_checkpoint(self):
+        # 임시 파일에 쓴 뒤 교체하여, 체크포인트 파일 자체가 깨지지 않도록 합니다.
+        self.checkpoint = {
+            'length': len(self.offsets),
+            'offset': self.end_offset,
+            'tip_hash': self.tip_hash
+        }
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+def iter_records(f, headers_only=False):
+    """
+    열린 로그 파일에서 (레코드 시작 위치, 레코드 끝 위치, 블록)을 순서대로 읽습니다.
+    headers_only면 블록 대신 거래 내역을 뺀 헤더 dict를 돌려줍니다.
+    크래시로 잘린 꼬리(파일 끝에서 모자라는 레코드, crc가 맞지 않는 마지막 레코드, 0으로 채워진 나머지)를 만나면 그 자리에서 멈춥니다.
+    로그 중간의 레코드가 손상되었거나 crc는 맞는데 블록으로 읽을 수 없다면, 뒤의 정상 블록을 버리지 않도록 ValueError.
+    """
+    size = os.fstat(f.fileno()).st_size
+    f.seek(0)
+    offset = 0
+    while True:
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        length, crc = RECORD_HEADER.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length:
+            return
+        end = offset + RECORD_HEADER.size + length
+        if not payload or zlib.crc32(payload) != crc:
+            if end >= size or _zero_filled(f, end):
+                return
+            raise ValueError(f"블록 로그의 {offset} 위치 레코드가 손상되었습니다. (뒤에 레코드가 더 있으므로 잘라내지 않음)")
+        try:
+            if is_binary(payload):
+                block = decode_header(payload) if headers_only else decode_block(payload)
+            else:
+                block = json.loads(payload.decode('utf-8'))
+                if headers_only:
+                    block.pop('transactions', None)
+        except (UnicodeDecodeError, ValueError, AttributeError) as e:
+            raise ValueError(f"블록 로그의 {offset} 위치 레코드를 블록으로 읽을 수 없습니다: {e}") from e
+        yield offset, end, block
+        offset = end
+
+
+def _zero_filled(f, offset):
+    """offset부터 파일 끝까지가 모두 0인지 (크래시 때 크기만 늘어나고 내용은 기록되지 않은 꼬리)"""
+    f.seek(offset)
+    while True:
+        chunk = f.read(1 << 16)
+        if not chunk:
+            return True
+        if chunk.count(0) != len(chunk):
+            return False
+
+
+def read_blocks(path):
+    """로그 파일 전체를 블록 목록으로 읽습니다. (손상된 꼬리는 무시)"""
+    with open(path, 'rb') as f:
+        return [block for _, _, block in iter_records(f)]
+
+
+def export_json(blocks, path):
+    """기존 blockchain_<port>.json 형식(들여쓰기 4칸)으로 체인을 내보냅니다."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(blocks, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def import_json(json_path, log_path, hash_fn):
+    """
+    기존 JSON 체인 파일을 새 블록 로그로 변환합니다. (로그를 처음부터 다시 씁니다)
+    변환한 블록은 검증을 거치지 않았으므로 체크포인트를 남기지 않습니다. (노드가 처음 읽을 때 전체 검증)
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        blocks = json.load(f)
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    store = BlockStore(log_path)
+    store.open()
+    for block in blocks:
+        store.append(block, hash_fn(block))
+    store.close()
+    store.discard_checkpoint()
+    return blocks
+
+
+if __name__ == '__main__':
+    # 압축/내보내기 도구:
+    #   python block_store.py export blockchain_5000.log blockchain_5000.json
+    #   python block_store.py import blockchain_5000.json blockchain_5000.log
+    from argparse import ArgumentParser
+    from blockchain_node_v3 import Blockchain
+
+    parser = ArgumentParser(description='블록 로그 <-> JSON 체인 파일 변환 도구')
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        blocks = read_blocks(args.source)
+        export_json(blocks, args.target)
+        print(f"{args.source} -> {args.target}: 블록 {len(blocks)}개를 JSON으로 내보냈습니다.")
+    else:
+        blocks = import_json(args.source, args.target, Blockchain.hash)
+        print(f"{args.source} -> {args.target}: 블록 {len(blocks)}개를 로그로 변환했습니다.")
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+
+
+def block_work(target):
+    """목표값(target)으로 블록 하나를 찾는 데 필요한 평균 해시 시도 횟수 (작업량)"""
+    return 2 ** 256 // (int.from_bytes(target, 'big') + 1)
+
+
+class BlockTree:
+    """
+    메인 체인에 들어가지 않은 블록을 해시로 보관합니다.
+    - 곁가지(side) 블록: 부모가 메인 체인이나 다른 곁가지에 있는 블록. 제네시스부터의 누적 작업량과 함께 보관하며,
+      어떤 곁가지의 누적 작업량이 메인 체인보다 커지면 fork 지점부터 그 가지로 재구성(reorg)합니다.
+    - 고아(orphan) 블록: 부모를 아직 받지 못한 블록. 부모가 도착하면 그 뒤에 이어 붙입니다.
+    메인 체인 자체는 Blockchain.chain(리스트)이 그대로 가지고 있고, 이 트리에는 들어가지 않습니다.
+    """
+
+    def __init__(self, max_side_blocks=1000, max_orphans=200):
+        self.max_side_blocks = max_side_blocks
+        self.max_orphans = max_orphans
+        self.side = {}               # 해시 -> (블록, 누적 작업량)
+        self.orphans = OrderedDict()  # 해시 -> 블록 (먼저 들어온 순서)
+
+    def __contains__(self, block_hash):
+        return block_hash in self.side or block_hash in self.orphans
+
+    def get(self, block_hash):
+        """곁가지 블록의 (블록, 누적 작업량). 없으면 None"""
+        return self.side.get(block_hash)
+
+    def add_side(self, block, work):
+        self.side[block.hash] = (block, work)
+        if len(self.side) > self.max_side_blocks:
+            # 가장 오래된(높이가 낮은) 곁가지 블록부터 버립니다.
+            oldest = min(self.side, key=lambda block_hash: self.side[block_hash][0]['index'])
+            del self.side[oldest]
+
+    def discard(self, block_hash):
+        self.side.pop(block_hash, None)
+        self.orphans.pop(block_hash, None)
+
+    def add_orphan(self, block):
+        self.orphans[block.hash] = block
+        while len(self.orphans) > self.max_orphans:
+            self.orphans.popitem(last=False)
+
+    def pop_orphans(self, parent_hash):
+        """부모가 parent_hash인 고아 블록들을 꺼내 반환합니다."""
+        children = [block for block in self.orphans.values() if block['previous_hash'] == parent_hash]
+        for block in children:
+            del self.orphans[block.hash]
+        return children
+
+    def branch(self, tip_hash):
+        """
+        곁가지 끝(tip_hash)에서 부모를 따라가 메인 체인과 만나는 곳까지의 블록들을 오래된 순으로 반환합니다.
+        (블록 목록, 메인 체인 쪽 부모의 해시)
+        """
+        blocks = []
+        block_hash = tip_hash
+        while block_hash in self.side:
+            block = self.side[block_hash][0]
+            blocks.append(block)
+            block_hash = block['previous_hash']
+        blocks.reverse()
+        return blocks, block_hash
+
+    def prune(self, min_index):
+        """블록 번호가 min_index보다 작은 곁가지/고아 블록을 버립니다. (너무 깊은 fork는 따라가지 않음)"""
+        for block_hash in [h for h, (block, _) in self.side.items() if block['index'] < min_index]:
+            del self.side[block_hash]
+        for block_hash in [h for h, block in self.orphans.items() if block['index'] < min_index]:
+            del self.orphans[block_hash]
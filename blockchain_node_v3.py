@@ -1,46 +1,125 @@
 import hashlib
 import json
-from time import time
+from time import perf_counter, sleep, time
 from uuid import uuid4
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, send_file
 import requests 
-from urllib.parse import urlparse
 import os
 import atexit
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import codec
+from block import Block, compute_hash, header_of
+from block_store import DEFAULT_CACHE_SIZE, BlockStore, StaleBlockError, import_json
+from block_tree import BlockTree, block_work
+from chain_index import ChainIndex
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry, Profiler
+from snapshot import SNAPSHOT_VERSION, SnapshotError, commitment, load_snapshot, make_snapshot, save_snapshot, snapshot_info, verify_snapshot
+from network import DEFAULT_GOSSIP_TTL, GOSSIP_FROM_HEADER, GOSSIP_TTL_HEADER, PeerClient, TransactionRelay, forward_ttl
+from mempool import Mempool, MempoolFullError, transaction_id
+from state import BLOCK_REWARD, REQUIRED_TRANSACTION_FIELDS, AccountState, InvalidTransactionError, block_fees, check_block_transactions, is_coinbase
+from merkle import CURRENT_BLOCK_VERSION, MERKLE_VERSION, MerkleTree, MerkleTreeCache, block_version, legacy_root
+from miner import DEFAULT_DIFFICULTY, MiningJobManager, ProofOfWorkMiner, check_proof, difficulty_to_target, parse_target
+from topology import DEFAULT_MAX_PEERS, PeerExchange, PeerTable, peer_address
 
 # --- (하드코딩된 GENESIS_BLOCK) ---
+# 제네시스 블록은 버전 필드가 없는 예전(버전 1) 형식 그대로 유지합니다.
 GENESIS_MERKLE_ROOT = hashlib.sha256(json.dumps([], sort_keys=True).encode()).hexdigest()
-GENESIS_BLOCK = {
+GENESIS_BLOCK = Block.from_dict({
     'index': 1,
     'timestamp': 1500000000, 
     'transactions': [],
     'proof': 100, 
     'previous_hash': '1',
     'merkle_root': GENESIS_MERKLE_ROOT 
-}
+})
 
-# 관제실 주소 (하드코딩)
+# 관제실 주소 (기본값, --dashboard 로 바꿀 수 있음)
 DASHBOARD_URL = 'http://127.0.0.1:8000'
 
+# 동기화 API 한 번의 요청으로 주고받는 최대 개수
+MAX_HEADERS_PER_REQUEST = 2000
+MAX_BLOCKS_PER_REQUEST = 500
+
+# /transactions/batch 요청 하나에 담을 수 있는 최대 거래 수
+MAX_TXS_PER_BATCH = 1000
+
+# 블록 하나에 담을 수 있는 최대 거래 수 (채굴 보상 거래 제외)
+DEFAULT_MAX_TXS_PER_BLOCK = 1000
+
+# 잔액 상태를 파일로 저장하는 주기 (블록 수)
+STATE_SAVE_INTERVAL = 100
+
+# 메인 체인 끝에서 이 블록 수보다 깊은 곳에서 갈라진 곁가지는 보관하지 않습니다.
+MAX_FORK_DEPTH = 100
+
+# 잠금 없이 읽던 체인이 교체되어 거래 내역을 읽지 못했을 때, 바뀐 체인으로 다시 읽는 최대 횟수
+STALE_READ_ATTEMPTS = 3
+
+# 상태 스냅샷(헤더 체인 + 잔액)을 만드는 주기 (블록 수)
+SNAPSHOT_INTERVAL = 100
+
 class Blockchain:
+    """
+    [동시성 규칙] 요청 스레드, 채굴 스레드가 함께 사용하므로 변경은 잠금 안에서만 합니다.
+    잠금 순서는 항상 sync_lock -> lock(체인) -> mempool.lock 이며, 체인 잠금을 잡은 채로 네트워크 요청을 하지 않습니다.
+    - lock: 체인, 잔액 상태, 블록 로그, 색인을 바꾸는 모든 작업 (블록 추가, 체인 교체, 거래 추가)
+    - sync_lock: 이웃과의 동기화(resolve_conflicts)를 한 번에 하나만 실행
+    메인 체인이 아닌 블록(곁가지, 고아 블록)은 self.tree에 해시로 보관하며, 누적 작업량이 가장 큰 가지가 메인 체인입니다.
+    스냅샷으로 시작한 노드는 과거 블록을 받을 때까지 chain[1:history_start] 자리에 거래 내역 없는 HeaderBlock을 둡니다.
+    읽기는 잠금 없이 self.chain을 한 번 읽어 쓰면 됩니다. 체인 리스트는 끝에 추가만 되고,
+    교체할 때는 새 리스트로 바꾸므로 한 번 읽어 둔 리스트의 앞부분은 바뀌지 않습니다.
+    """
+
     def __init__(self):
+        self.lock = threading.RLock()
+        self.sync_lock = threading.Lock()
         self.chain = [GENESIS_BLOCK] 
-        self.current_transactions = []
-        self.nodes = set()
+        self.positions = {GENESIS_BLOCK.hash: 0}  # 메인 체인 블록 해시 -> 체인 내 위치
+        self.tree = BlockTree()
+        self.mempool = Mempool()
+        self.max_txs_per_block = DEFAULT_MAX_TXS_PER_BLOCK
+        self.block_version = CURRENT_BLOCK_VERSION  # 새로 만드는 블록의 버전 (merkle_root 계산 방식)
+        self.merkle_trees = MerkleTreeCache()
+        self.nodes = PeerTable()  # 이웃 노드 주소 ('127.0.0.1:5001'). 최대 max_peers개
+        self.store = None
+        self.index = None
+        self.state = AccountState()
+        self.state.apply_block(GENESIS_BLOCK, self.hash(GENESIS_BLOCK), validate=False)
+        self.state_path = None
+        self.enforce_balances = True  # False면 잔액 검사 없이 모든 거래를 받음 (예전 동작)
+        self.full_verify = False  # True면 체크포인트를 무시하고 항상 제네시스부터 전체 검증
+        self.binary_store = True  # 블록 로그에 바이너리 인코딩(codec)으로 기록 (False면 JSON)
+        self.block_cache_size = DEFAULT_CACHE_SIZE  # 거래 내역을 메모리에 보관해 두는 최근 블록 수
+        self.snapshot_path = None
+        self.snapshot_interval = SNAPSHOT_INTERVAL  # 0이면 스냅샷을 만들지 않음
+        self.snapshot = None           # 이웃에게 제공하는 스냅샷 요약 (snapshot_info)
+        self.snapshot_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot')  # 스냅샷을 요청 순서대로 하나씩 씀
+        self.history_start = 0         # 스냅샷으로 시작했다면 스냅샷의 블록 수 (그 이전 블록은 헤더만 있음). 0이면 모두 있음
+        self.history_commitment = None  # 과거 블록으로 다시 계산한 잔액과 비교할 스냅샷의 commitment
+        self.history_fetched = 0       # 지금까지 받은 과거 블록 수
+        self.deferred_store = None     # 과거 블록을 모두 받을 때까지 쓰지 않는 블록 로그
+        self.set_pow_target(difficulty_to_target(DEFAULT_DIFFICULTY))
         
-    def new_block(self, proof, previous_hash=None):
-        """정상적인 블록 생성 함수"""
-        merkle_root = hashlib.sha256(json.dumps(self.current_transactions, sort_keys=True).encode()).hexdigest()
-        block = {
-            'index': len(self.chain) + 1,
-            'timestamp': time(),
-            'transactions': self.current_transactions,
-            'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.last_block),
-            'merkle_root': merkle_root 
-        }
-        self.current_transactions = []
-        self.chain.append(block)
+    def new_block(self, proof, previous_hash=None, reward_transaction=None):
+        """
+        정상적인 블록 생성 함수.
+        대기 목록에서 우선순위(수수료, 시간) 순으로 최대 max_txs_per_block개의 거래를 꺼내 담고,
+        채굴 보상 거래가 있다면 담은 거래의 수수료 합계를 보상 금액에 더해 마지막에 붙입니다.
+        고른 거래는 블록이 체인에 붙은 뒤에 대기 목록에서 지우므로, 블록 추가에 실패하면 그대로 남습니다.
+        """
+        with self.lock:
+            selected = self.mempool.select(self.max_txs_per_block)
+            transactions = list(selected)
+            if self.enforce_balances:
+                # 대기 중에 다른 블록이 먼저 잔액을 써버린 거래는 버립니다.
+                transactions = self.state.select_valid(transactions)
+            if reward_transaction:
+                transactions.append(dict(reward_transaction, amount=reward_transaction['amount'] + block_fees(transactions)))
+            block = self.build_block(proof, previous_hash, transactions)
+            self.append_block(block)
+            self.mempool.remove_transactions(selected)
         return block
 
     def new_block_force(self, proof, previous_hash, transactions_to_include):
@@ -48,63 +127,365 @@ class Blockchain:
         [추가] 이중 지불 공격 시뮬레이션을 위한, 대기 목록을 무시하고 특정 거래 목록으로
         블록을 강제 생성하는 함수. (transactions_to_include가 공격 거래를 담고 있음)
         """
-        merkle_root = hashlib.sha256(json.dumps(transactions_to_include, sort_keys=True).encode()).hexdigest()
-        block = {
-            'index': len(self.chain) + 1,
-            'timestamp': time(),
-            'transactions': transactions_to_include,
-            'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.last_block),
-            'merkle_root': merkle_root 
-        }
-        # 이 함수는 self.current_transactions를 건드리지 않음
-        self.chain.append(block)
+        with self.lock:
+            block = self.build_block(proof, previous_hash, transactions_to_include)
+            # 이 함수는 대기 거래 목록(mempool)을 건드리지 않음
+            self.append_block(block)
         return block
 
+    def build_block(self, proof, previous_hash, transactions):
+        """
+        현재 블록 버전(self.block_version)에 맞게 merkle_root를 계산해 블록을 만듭니다.
+        버전 2 이상이면 머클 트리를 만들고, 포함 증명에 쓰도록 캐시에 넣어 둡니다.
+        """
+        if self.block_version >= MERKLE_VERSION:
+            tree = MerkleTree.from_transactions(transactions)
+            merkle_root = tree.root
+        else:
+            tree = None
+            merkle_root = legacy_root(transactions)
+        block = Block(
+            index=len(self.chain) + 1,
+            timestamp=time(),
+            transactions=transactions,
+            proof=proof,
+            previous_hash=previous_hash or self.hash(self.last_block),
+            merkle_root=merkle_root,
+            version=self.block_version if self.block_version >= MERKLE_VERSION else None
+        )
+        if tree is not None:
+            self.merkle_trees.put(block.hash, tree)
+        return block
+
+    def valid_merkle_root(self, block):
+        """
+        블록의 거래 내역으로 merkle_root를 다시 계산해 헤더의 값과 비교합니다.
+        같은 거래(거래 ID)가 두 번 담긴 블록은 거부합니다. 머클 트리는 홀수 층의 마지막 노드를 복제하므로,
+        정상 블록의 마지막 거래를 한 번 더 붙인 블록도 merkle_root와 블록 해시가 같기 때문입니다. (CVE-2012-2459)
+        버전 2 이상 블록은 검증에 성공한 머클 트리를 캐시에 보관해 포함 증명에 재사용합니다.
+        """
+        stored_merkle_root = block.get('merkle_root')
+        if stored_merkle_root is None:
+            return False
+        if not all(isinstance(tx, dict) for tx in block['transactions']):
+            return False  # 거래 ID를 계산할 수 없는 형식
+        if block_version(block) < MERKLE_VERSION:
+            txids = [transaction_id(tx) for tx in block['transactions']]
+            return len(set(txids)) == len(txids) and stored_merkle_root == legacy_root(block['transactions'])
+        tree = MerkleTree.from_transactions(block['transactions'])
+        if tree.has_duplicates or tree.root != stored_merkle_root:
+            return False
+        self.merkle_trees.put(self.hash(block), tree)
+        return True
+
+    def merkle_tree(self, block):
+        """블록의 머클 트리 (캐시에 없으면 새로 만듭니다)"""
+        return self.merkle_trees.get(self.hash(block), block['transactions'])
+
+    def append_block(self, block):
+        """
+        검증이 끝난 블록을 체인 끝에 붙이고, 잔액 상태, 블록 로그, 조회용 색인에 이 블록만 반영합니다.
+        잔액이 부족한 거래나 이미 체인에 담긴 거래가 있으면 InvalidTransactionError를 던지고 아무것도 바꾸지 않습니다.
+        """
+        block_hash = self.hash(block)
+        with self.lock:
+            self.check_replay([block], len(self.chain))
+            self.state.apply_block(block, block_hash, validate=self.enforce_balances)
+            self.chain.append(block)
+            self.positions[block_hash] = len(self.chain) - 1
+            if self.state_path and block['index'] % STATE_SAVE_INTERVAL == 0:
+                with STATE_SAVE_SECONDS.time():
+                    self.state.save(self.state_path)
+            if self.store:
+                with STORE_APPEND_SECONDS.time():
+                    # 거래 내역은 블록 로그에서 읽도록, 로그에 기록된 블록(StoredBlock)으로 바꿔 둡니다.
+                    self.chain[-1] = self.store.append(block, block_hash)
+            if self.index:
+                self.index.add_block(block, block_hash)
+            if self.snapshot_interval and block['index'] % self.snapshot_interval == 0:
+                self.write_snapshot(wait=False)
+
+    def replace_chain(self, new_chain):
+        """
+        체인을 new_chain으로 교체합니다. 잔액 상태는 fork 지점까지 되돌린 뒤 새 블록만 다시 적용하고,
+        블록 로그와 색인도 fork 지점 이후만 고칩니다. 새 블록에 잔액이 부족한 거래가 있거나,
+        후보를 받아오는 동안 내 체인이 자라서 new_chain의 누적 작업량이 더 크지 않게 되었다면 교체하지 않고 False.
+        밀려난 블록은 곁가지로 보관하고, 그 블록에만 있던 거래는 대기 목록으로 되돌립니다.
+        """
+        with self.lock:
+            if self.chain_work(new_chain) <= self.chain_work(self.chain):
+                return False
+            fork_length = self.common_prefix_length(new_chain)
+            if fork_length < self.history_start:
+                # 스냅샷 이전으로 되돌리려면 그 이전 잔액이 필요하지만, 과거 블록의 거래 내역을 아직 받지 못했습니다.
+                print(f"🚨 체인 교체 보류: 블록 #{fork_length}에서 갈라진 체인이지만, 스냅샷(블록 #{self.history_start}) 이전 블록을 아직 받는 중입니다.")
+                return False
+            old_blocks = self.chain[fork_length:]
+            new_blocks = new_chain[fork_length:]
+            try:
+                self.check_replay(new_blocks, fork_length)
+                self.state.reorg(self.chain, fork_length, new_blocks, self.hash)
+            except InvalidTransactionError as e:
+                print(f"🚨 체인 교체 거부: {e}")
+                return False
+            self.chain = new_chain
+            for block in old_blocks:
+                self.positions.pop(self.hash(block), None)
+            for position, block in enumerate(new_blocks, fork_length):
+                self.positions[self.hash(block)] = position
+                self.tree.discard(self.hash(block))
+            for position, block in enumerate(old_blocks, fork_length):
+                self.tree.add_side(Block.from_dict(block), (position + 1) * self.work_per_block)
+            for block in new_blocks:
+                self.mempool.remove_transactions(block['transactions'])
+            returned = self.return_to_mempool(old_blocks, new_blocks)
+            if old_blocks:
+                CHAIN_REORGS.inc()
+                print(f"🔀 체인 재구성: 블록 #{fork_length} 이후 {len(old_blocks)}개를 되돌리고 {len(new_blocks)}개를 적용했습니다. (거래 {returned}개를 대기 목록으로 되돌림)")
+            if self.store:
+                with STORE_APPEND_SECONDS.time():
+                    self.store.truncate(fork_length, self.hash(new_chain[fork_length - 1]))
+                    for position, block in enumerate(new_blocks, fork_length):
+                        new_chain[position] = self.store.append(block, self.hash(block))
+                    self.store.flush()
+            if self.index:
+                self.index.rollback_to(fork_length)
+                for block in new_blocks:
+                    self.index.add_block(block, self.hash(block))
+            if self.snapshot_interval and len(new_chain) // self.snapshot_interval > fork_length // self.snapshot_interval:
+                self.write_snapshot(wait=False)
+        return True
+
+    def return_to_mempool(self, old_blocks, new_blocks):
+        """
+        [체인 잠금 안에서 호출] 메인 체인에서 밀려난 블록의 거래 중 새 블록에 없는 거래를 대기 목록으로 되돌립니다.
+        채굴 보상 거래와, 바뀐 잔액으로는 더 이상 보낼 수 없는 거래는 버립니다. 되돌린 거래 수를 반환합니다.
+        """
+        included = {transaction_id(tx) for block in new_blocks for tx in block['transactions']}
+        returned = 0
+        for block in old_blocks:
+            for tx in block['transactions']:
+                if is_coinbase(tx) or transaction_id(tx) in included:
+                    continue
+                try:
+                    if self.enforce_balances:
+                        self.state.check_transaction(tx, self.mempool.spent_by(tx['sender']))
+                    if self.mempool.add(tx) is not None:
+                        returned += 1
+                except (InvalidTransactionError, MempoolFullError):
+                    continue
+        return returned
+
+    def receive_block(self, block):
+        """
+        이웃에게서 받은 블록을 블록 트리에 넣고 결과를 반환합니다.
+        - 'extended': 메인 체인 끝에 붙음
+        - 'reorg': 곁가지의 누적 작업량이 메인 체인보다 커져서, fork 지점부터 그 가지로 재구성함
+        - 'side': 곁가지에 보관함 (메인 체인은 그대로)
+        - 'orphan': 부모를 몰라 고아 블록으로 보관함
+        - 'known': 이미 가지고 있는 블록
+        블록이 유효하지 않으면 ValueError(잔액 부족이면 InvalidTransactionError)를 던집니다.
+        이 블록을 기다리던 고아 블록도 이어서 처리하며, 그중 메인 체인을 바꾼 결과가 있으면 그것을 반환합니다.
+        """
+        block_hash = self.hash(block)
+        with self.lock:
+            if block_hash in self.tree or self.block_position(block_hash) is not None:
+                return 'known'
+            last_block = self.last_block
+            if block['previous_hash'] == self.hash(last_block):
+                self.check_block(block, last_block)
+                self.append_block(block)
+                self.mempool.remove_transactions(block['transactions'])
+                result = 'extended'
+            else:
+                parent = self.find_block(block['previous_hash'])
+                if parent is None:
+                    # 변조된 블록이 정상 블록과 같은 해시로 먼저 자리를 차지하지 않도록, 고아 블록도 본문은 확인합니다.
+                    self.check_block_body(block)
+                    self.tree.add_orphan(block)
+                    return 'orphan'
+                self.check_block(block, parent[0])
+                work = parent[1] + self.work_per_block
+                self.tree.add_side(block, work)
+                result = 'side'
+                if work > self.chain_work(self.chain) and self.reorganize(block_hash):
+                    result = 'reorg'
+            self.tree.prune(self.last_block['index'] - MAX_FORK_DEPTH)
+            child_result = self.connect_orphans(block_hash)
+        if child_result and result not in ('extended', 'reorg'):
+            return child_result
+        return 'reorg' if 'reorg' in (result, child_result) else result
+
+    def connect_orphans(self, parent_hash):
+        """
+        부모가 parent_hash인 고아 블록들을 다시 받아 이어 붙입니다.
+        그중 메인 체인을 바꾼 블록이 있으면 'extended' 또는 'reorg', 없으면 None을 반환합니다.
+        """
+        result = None
+        with self.lock:
+            for child in self.tree.pop_orphans(parent_hash):
+                try:
+                    child_result = self.receive_block(child)
+                except ValueError as e:
+                    print(f"🚨 고아 블록 #{child['index']}을(를) 버립니다: {e}")
+                    continue
+                if child_result in ('extended', 'reorg'):
+                    result = 'reorg' if 'reorg' in (result, child_result) else 'extended'
+        return result
+
+    def check_block(self, block, parent):
+        """
+        부모 블록(parent) 뒤에 오는 블록으로서 번호, 작업 증명, 거래 형식과 채굴 보상 규칙, merkle_root를 확인합니다. (잔액은 체인에 붙일 때 확인)
+        거래 형식이나 채굴 보상 규칙에 맞지 않으면 InvalidTransactionError, 그 밖에는 ValueError.
+        """
+        with BLOCK_VALIDATION_SECONDS.time():
+            if block['index'] != parent['index'] + 1:
+                raise ValueError('블록 번호가 이전 블록과 이어지지 않습니다.')
+            if not self.valid_proof(parent['proof'], block['proof']):
+                raise ValueError('블록의 작업 증명이 유효하지 않습니다.')
+            self.check_block_body(block)
+        VALIDATED_BLOCKS.inc(source='receive')
+
+    def check_block_body(self, block):
+        """부모와 상관없이 블록 자체만으로 확인할 수 있는 거래 형식, 채굴 보상 규칙, merkle_root(중복 거래 포함)를 확인합니다."""
+        check_block_transactions(block['transactions'])
+        if not self.valid_merkle_root(block):
+            raise ValueError('블록의 거래 내역(merkle_root)이 조작되었거나 같은 거래가 두 번 담겨 있습니다.')
+
+    def find_block(self, block_hash):
+        """메인 체인이나 곁가지에 있는 블록의 (블록, 누적 작업량). 없으면 None"""
+        position = self.block_position(block_hash)
+        if position is not None:
+            return self.chain[position], (position + 1) * self.work_per_block
+        return self.tree.get(block_hash)
+
+    def reorganize(self, tip_hash):
+        """[체인 잠금 안에서 호출] 곁가지 끝(tip_hash)까지를 메인 체인으로 만듭니다. 그 가지가 유효하지 않으면 버리고 False."""
+        branch, fork_hash = self.tree.branch(tip_hash)
+        fork_position = self.block_position(fork_hash)
+        if fork_position is None:
+            return False
+        if self.replace_chain(self.chain[:fork_position + 1] + branch):
+            return True
+        for block in branch:
+            self.tree.discard(self.hash(block))
+        return False
+
+    def chain_work(self, chain):
+        """
+        체인의 누적 작업량. 네트워크의 모든 블록이 같은 목표값(pow_target)을 쓰므로 블록 수 × 블록당 작업량입니다.
+        """
+        return len(chain) * self.work_per_block
+
+    def common_prefix_length(self, other_chain):
+        """
+        내 체인과 other_chain이 공유하는 앞부분의 블록 수를 반환합니다.
+        해시는 이전 블록 해시를 포함하므로, 끝에서부터 처음 일치하는 블록을 찾으면 됩니다.
+        """
+        length = min(len(self.chain), len(other_chain))
+        while length > 1 and self.hash(self.chain[length - 1]) != self.hash(other_chain[length - 1]):
+            length -= 1
+        return length
+
 
     def new_transaction(self, transaction):
-        tx_to_store = transaction.copy() 
-        tx_to_store.pop('propagated', None) 
-        if tx_to_store not in self.current_transactions:
-            self.current_transactions.append(tx_to_store)
+        """
+        거래를 대기 목록에 추가하고, 담길 예정인 블록 번호를 반환합니다. 이미 있는 거래면 None.
+        잔액(대기 중인 거래로 보낼 금액 제외)이 부족하면 InvalidTransactionError,
+        대기 목록이 가득 찼고 이 거래의 우선순위가 가장 낮으면 MempoolFullError가 발생합니다.
+        """
+        # 같은 송신자의 거래 두 개가 동시에 잔액 검사를 통과하지 않도록, 검사와 추가를 한 번에 합니다.
+        with self.lock, self.mempool.lock:
+            if self.add_transaction(transaction) is None:
+                return None
             return self.last_block['index'] + 1
-        return None
+
+    def new_transactions(self, transactions):
+        """
+        여러 거래를 한 번의 잠금 안에서 검증해 대기 목록에 추가합니다.
+        거래마다 (거래 ID, 오류 메시지)를 반환합니다. 추가되면 (ID, None), 이미 있으면 (None, None), 거부되면 (None, 메시지)
+        """
+        results = []
+        with self.lock, self.mempool.lock:
+            for transaction in transactions:
+                try:
+                    if not isinstance(transaction, dict) or not all(k in transaction for k in REQUIRED_TRANSACTION_FIELDS):
+                        raise ValueError(f"필수 값이 누락되었습니다. ({', '.join(REQUIRED_TRANSACTION_FIELDS)})")
+                    results.append((self.add_transaction(transaction), None))
+                except ValueError as e:
+                    results.append((None, str(e)))
+        return results
+
+    def add_transaction(self, transaction):
+        """[체인 잠금과 대기 목록 잠금 안에서 호출] 잔액을 검사하고 대기 목록에 넣습니다. 거래 ID (이미 있으면 None)"""
+        if is_coinbase(transaction):
+            raise InvalidTransactionError('채굴 보상 거래(sender=0)는 직접 제출할 수 없습니다.')
+        if self.confirmed_transactions([transaction_id(transaction)]):
+            raise InvalidTransactionError('이미 블록에 담긴 거래입니다. (같은 거래를 다시 보낼 수 없음)')
+        if self.enforce_balances:
+            self.state.check_transaction(transaction, self.mempool.spent_by(transaction['sender']))
+        return self.mempool.add(transaction)
+
+    @property
+    def current_transactions(self):
+        """대기 중인 거래 목록 (도착 순서, 잠금 없이 읽는 사본)"""
+        return list(self.mempool.snapshot())
+
+    @staticmethod
+    def header(block):
+        """블록에서 거래 내역을 뺀 헤더 부분 (해시 계산 대상)"""
+        return header_of(block)
 
     @staticmethod
     def hash(block):
-        block_header = {
-            'index': block['index'],
-            'timestamp': block['timestamp'],
-            'proof': block['proof'],
-            'previous_hash': block['previous_hash'],
-            'merkle_root': block.get('merkle_root', '') 
-        }
-        block_string = json.dumps(block_header, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        """블록 해시. Block은 한 번 계산해 둔 값을 돌려주고, dict 블록은 매번 새로 계산합니다."""
+        if isinstance(block, Block):
+            return block.hash
+        return compute_hash(block)
 
     @property
     def last_block(self):
         return self.chain[-1]
 
-    def proof_of_work(self, last_proof):
-        proof = 0
-        while self.valid_proof(last_proof, proof) is False:
-            proof += 1
+    def set_pow_target(self, target, workers=None):
+        """작업 증명 목표값(난이도)을 설정합니다. 네트워크의 모든 노드가 같은 값을 써야 합니다."""
+        self.pow_target = target
+        self.work_per_block = block_work(target)
+        self.miner = ProofOfWorkMiner(target, workers)
+
+    def proof_of_work(self, last_proof, cancel_event=None, on_progress=None):
+        started = perf_counter()
+        proof = self.miner.search(last_proof, cancel_event, on_progress)
+        if proof is not None:
+            # nonce는 0부터 차례로 탐색하므로, 찾은 proof + 1을 시도한 해시 수로 봅니다.
+            elapsed = perf_counter() - started
+            POW_SECONDS.observe(elapsed)
+            POW_HASHES.inc(proof + 1)
+            if elapsed > 0:
+                POW_HASH_RATE.set((proof + 1) / elapsed)
         return proof
 
-    @staticmethod
-    def valid_proof(last_proof, proof):
-        guess = f'{last_proof}{proof}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:4] == "0000"
+    def valid_proof(self, last_proof, proof):
+        return check_proof(last_proof, proof, self.pow_target)
         
-    def validate_chain(self, chain):
+    def validate_chain(self, chain, start=1):
+        """
+        체인을 검증합니다. start 이전의 블록들은 이미 검증된(신뢰하는) 블록으로 보고,
+        chain[start]부터만 해시 연결, 작업 증명, merkle_root를 다시 확인합니다.
+        """
+        with CHAIN_VALIDATION_SECONDS.time():
+            valid = self._validate_chain(chain, start)
+        VALIDATED_BLOCKS.inc(max(len(chain) - max(start, 1), 0), source='chain')
+        return valid
+
+    def _validate_chain(self, chain, start):
         if chain[0] != GENESIS_BLOCK:
             print(f"🚨 검증 실패: 0번 블록(제네시스 블록)이 네트워크 표준과 다릅니다!")
             return False
 
-        previous_block = chain[0]
-        block_index = 1
+        block_index = max(start, 1)
+        previous_block = chain[block_index - 1]
+        seen = set()  # 검증한 블록에 담긴 거래 ID (fork 지점 이전과의 중복은 replace_chain의 check_replay가 확인)
 
         while block_index < len(chain):
             current_block = chain[block_index]
@@ -114,12 +495,20 @@ class Blockchain:
             if not self.valid_proof(previous_block['proof'], current_block['proof']):
                 print(f"🚨 검증 실패: 블록 {current_block['index']}의 작업 증명(proof) 실패.")
                 return False
-            
-            tx_hash_check = hashlib.sha256(json.dumps(current_block['transactions'], sort_keys=True).encode()).hexdigest()
-            stored_merkle_root = current_block.get('merkle_root') 
-            if stored_merkle_root is None or stored_merkle_root != tx_hash_check: 
-                print(f"🚨 검증 실패: 블록 {current_block['index']}의 거래 내역(merkle_root)이 조작되었거나 형식이 맞지 않습니다.")
+            try:
+                check_block_transactions(current_block['transactions'])
+            except InvalidTransactionError as e:
+                print(f"🚨 검증 실패: 블록 {current_block['index']}: {e}")
+                return False
+
+            if not self.valid_merkle_root(current_block): 
+                print(f"🚨 검증 실패: 블록 {current_block['index']}의 거래 내역(merkle_root)이 조작되었거나 형식이 맞지 않습니다. (같은 거래가 두 번 담긴 블록 포함)")
+                return False
+            txids = [transaction_id(tx) for tx in current_block['transactions']]
+            if seen.intersection(txids):
+                print(f"🚨 검증 실패: 블록 {current_block['index']}에 앞 블록에 이미 담긴 거래가 있습니다.")
                 return False
+            seen.update(txids)
 
             previous_block = current_block
             block_index += 1
@@ -127,183 +516,1038 @@ class Blockchain:
         return True
 
     def register_node(self, address):
-        parsed_url = urlparse(address)
-        if parsed_url.netloc:
-            self.nodes.add(parsed_url.netloc)
-        elif parsed_url.path:
-            self.nodes.add(parsed_url.path)
-        else:
-            raise ValueError('잘못된 URL입니다.')
+        """이웃을 추가합니다. 이웃 자리가 가득 찼으면 주소록에만 넣고 False를 반환합니다. (잘못된 URL이면 ValueError)"""
+        return self.nodes.add(peer_address(address))
 
     def resolve_conflicts(self):
-        neighbours = self.nodes
-        new_chain = None
-        max_length = len(self.chain)
+        """
+        이웃들의 팁(tip)만 먼저 확인하고, 누적 작업량이 더 큰 체인을 가진 이웃에게서는
+        헤더로 fork 지점을 찾은 뒤 그 이후의 블록(delta)만 받아와 검증합니다.
+        동기화는 한 번에 하나만 실행하며, 블록을 받아오는 동안에는 체인 잠금을 잡지 않습니다.
+        """
+        with self.sync_lock, profiler.section('resolve_conflicts'):
+            return self._resolve_conflicts()
 
-        for node in neighbours:
+    def _resolve_conflicts(self):
+        # 1. 모든 이웃의 팁을 동시에 조회
+        tips = {}
+        for node, response in peers.gather('GET', '/chain/tip', list(self.nodes)).items():
+            if isinstance(response, Exception):
+                print(f"[{app.config['PORT']}번 노드] 이웃 {node}에 연결할 수 없습니다: {response}")
+            elif response.status_code == 200:
+                tip = response.json()
+                # 작업량을 알려주지 않는 예전 노드는 블록 수로 계산합니다.
+                work = int(tip['work'], 16) if 'work' in tip else tip['length'] * self.work_per_block
+                tips[node] = (work, tip['length'])
+
+        # 2. 누적 작업량이 가장 큰 체인을 가진 이웃부터 delta를 받아 검증하고, 처음으로 유효한 체인으로 교체
+        for node, (work, length) in sorted(tips.items(), key=lambda item: item[1], reverse=True):
+            if work <= self.chain_work(self.chain):
+                break
             try:
-                response = requests.get(f'http://{node}/chain')
-                if response.status_code == 200:
-                    length = response.json()['length']
-                    chain = response.json()['chain']
-                    if length > max_length and self.validate_chain(chain):
-                        max_length = length
-                        new_chain = chain
-            except requests.exceptions.RequestException as e:
-                print(f"[{app.config['PORT']}번 노드] 이웃 {node}에 연결할 수 없습니다: {e}")
-
-        if new_chain:
-            self.chain = new_chain
-            self.save_chain_to_json() 
-            return True
+                candidate = self.fetch_candidate_chain(node, length)
+            except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+                # 이웃이 보낸 헤더나 블록의 필드 형식이 잘못되었으면(예: 정수가 아닌 번호) TypeError가 날 수 있습니다.
+                print(f"[{app.config['PORT']}번 노드] 이웃 {node}에게서 블록을 받지 못했습니다: {e}")
+                continue
+            if candidate and self.replace_chain(candidate):
+                # 받아온 블록 뒤에 이어지는 고아 블록이 있었다면 이제 붙일 수 있습니다.
+                self.connect_orphans(self.hash(self.last_block))
+                return True
         return False
 
-    def save_chain_to_json(self):
-        with open(f"blockchain_{app.config['PORT']}.json", "w", encoding="utf-8") as f:
-            json.dump(self.chain, f, indent=4, ensure_ascii=False)
+    def find_fork_point(self, node, peer_length):
+        """
+        이웃의 헤더를 뒤에서부터 점점 넓은 범위로 받아오며, 내 체인과 해시가 같은
+        마지막 블록을 찾습니다. 공유하는 앞부분의 블록 수를 반환합니다. (없으면 0)
+        """
+        end = min(len(self.chain), peer_length)
+        batch = 16
+        while end >= 1:
+            start = max(1, end - batch + 1)
+            response = peers.get(node, '/chain/headers', params={'from': start, 'limit': end - start + 1})
+            response.raise_for_status()
+            for header in reversed(response.json()['headers']):
+                position = header['index'] - 1
+                if 0 <= position < len(self.chain) and header['hash'] == self.hash(self.chain[position]):
+                    return position + 1
+            end = start - 1
+            batch = min(batch * 2, MAX_HEADERS_PER_REQUEST)
+        return 0
+
+    def fetch_candidate_chain(self, node, peer_length):
+        """
+        fork 지점 이후의 블록만 이웃에게서 받아, 내 체인의 공통 부분 뒤에 이어 붙인 후보 체인을 만듭니다.
+        fork 지점 이후 블록만 검증하며(--full-verify면 전체), 검증에 실패하면 None을 반환합니다.
+        """
+        fork_length = self.find_fork_point(node, peer_length)
+        if fork_length == 0:
+            print(f"[{app.config['PORT']}번 노드] 이웃 {node}의 체인은 제네시스 블록부터 다릅니다.")
+            return None
+
+        blocks = []
+        next_index = fork_length + 1
+        while next_index <= peer_length:
+            response = peers.get(node, '/chain/blocks', params={'from': next_index, 'limit': MAX_BLOCKS_PER_REQUEST}, headers=sync_request_headers())
+            response.raise_for_status()
+            received = blocks_from_response(response)
+            if not received:
+                break
+            blocks.extend(received)
+            next_index += len(received)
+
+        candidate = self.chain[:fork_length] + blocks
+        print(f"[{app.config['PORT']}번 노드] 이웃 {node}에게서 fork 지점(블록 #{fork_length}) 이후 블록 {len(blocks)}개를 받았습니다.")
+        if self.validate_chain(candidate, 1 if self.full_verify else fork_length):
+            return candidate
+        return None
+
+    def block_position(self, block_hash):
+        """해시가 block_hash인 블록의 메인 체인 내 위치를 반환합니다. (없으면 None)"""
+        chain = self.chain
+        position = self.positions.get(block_hash)
+        if position is not None and position < len(chain) and self.hash(chain[position]) == block_hash:
+            return position
+        return None
+
+    def trusted_length(self, chain):
+        """
+        블록 로그 체크포인트(이미 검증을 마친 마지막 블록의 개수와 해시)를 기준으로,
+        다시 검증하지 않아도 되는 앞부분 블록의 개수를 반환합니다.
+        """
+        checkpoint = self.store.checkpoint if self.store else None
+        if self.full_verify or not checkpoint:
+            return 1
+        length = checkpoint.get('length', 0)
+        if 1 <= length <= len(chain) and self.hash(chain[length - 1]) == checkpoint.get('tip_hash'):
+            return length
+        return 1
+
+    def transaction_location(self, txid):
+        """거래가 담긴 (블록, 블록 내 위치)를 반환합니다. (없으면 None)"""
+        chain = self.chain
+        if self.index:
+            location = self.index.transaction_location(txid)
+            if location is None or location[0] > len(chain):
+                return None
+            return chain[location[0] - 1], location[1]
+        for block in reversed(chain):
+            for position, tx in enumerate(block['transactions']):
+                if transaction_id(tx) == txid:
+                    return block, position
+        return None
+
+    def confirmed_transactions(self, txids, length=None):
+        """
+        txids 중 메인 체인의 앞쪽 length개 블록(없으면 전체)에 이미 담긴 거래 ID의 집합.
+        색인이 있으면 색인에서, 없으면 체인을 훑어서 찾습니다. (스냅샷 이전의 거래 내역 없는 블록은 건너뜀)
+        """
+        chain = self.chain
+        length = len(chain) if length is None else min(length, len(chain))
+        txids = set(txids)
+        if not txids:
+            return set()
+        if self.index:
+            return self.index.confirmed(txids, length)
+        return {txid for block in chain[self.history_start:length] for txid in map(transaction_id, block['transactions']) if txid in txids}
+
+    def check_replay(self, blocks, fork_length):
+        """
+        [체인 잠금 안에서 호출] chain[:fork_length] 뒤에 blocks를 이어 붙일 때, 이미 앞 블록에 담긴 거래를 다시 담은 블록이 있으면
+        InvalidTransactionError. 같은 거래가 두 번 적용되면 송신자는 두 번 내고 수신자는 두 번 받기 때문입니다.
+        """
+        seen = set()
+        for block in blocks:
+            txids = [transaction_id(tx) for tx in block['transactions']]
+            if seen.intersection(txids):
+                raise InvalidTransactionError(f"블록 #{block['index']}: 앞 블록에 이미 담긴 거래를 다시 담았습니다.")
+            seen.update(txids)
+        if self.confirmed_transactions(seen, fork_length):
+            raise InvalidTransactionError(f"블록 #{blocks[0]['index']} 이후: 이미 체인에 담긴 거래를 다시 담았습니다.")
+
+    def open_index(self, port):
+        """blockchain_<port>.index.db 색인을 열고, 마지막으로 색인한 블록 이후만 따라잡습니다."""
+        self.index = ChainIndex(f"blockchain_{port}.index.db")
+        indexed = self.index.sync(self.chain, self.hash)
+        if indexed:
+            print(f"[{port}번 노드] 조회용 색인에 블록 {indexed}개를 추가했습니다.")
+
+    def open_state(self, port):
+        """저장된 잔액 상태(blockchain_<port>.state.json)를 불러오고, 그 이후 블록만 적용합니다."""
+        self.state_path = f"blockchain_{port}.state.json"
+        applied = self.state.load(self.state_path, self.chain, self.hash)
+        if applied:
+            print(f"[{port}번 노드] 잔액 상태에 블록 {applied}개를 적용했습니다. (주소 {len(self.state.balances)}개)")
 
-    def load_chain_from_json(self, port):
-        filepath = f"blockchain_{port}.json"
-        if os.path.exists(filepath):
+    def save_state(self):
+        if self.state_path:
+            with self.lock, STATE_SAVE_SECONDS.time():
+                self.state.save(self.state_path)
+
+    def load_chain(self, port):
+        """
+        blockchain_<port>.log 블록 로그에서 체인을 읽어 검증합니다.
+        로그가 없고 예전 형식의 blockchain_<port>.json만 있다면 로그로 변환해서 사용합니다.
+        """
+        log_path = f"blockchain_{port}.log"
+        json_path = f"blockchain_{port}.json"
+        if not os.path.exists(log_path) and os.path.exists(json_path):
             try:
-                with open(filepath, "r") as f:
-                    loaded_chain = json.load(f)
-                if self.validate_chain(loaded_chain):
-                    self.chain = loaded_chain
-                    print(f"[{port}번 노드] 성공: {filepath}에서 체인을 검증하고 로드했습니다.")
-                else:
-                    print(f"[{port}번 노드] 🚨 치명적 오류: {filepath} 파일이 손상되었습니다! 프로그램을 중단합니다.")
-                    exit()
+                import_json(json_path, log_path, self.hash)
+                print(f"[{port}번 노드] 기존 {json_path} 파일을 블록 로그({log_path})로 변환했습니다.")
             except json.JSONDecodeError:
-                print(f"[{port}번 노드] 오류: {filepath} 파일을 읽을 수 없습니다.")
+                print(f"[{port}번 노드] 오류: {json_path} 파일을 읽을 수 없습니다.")
                 exit()
+
+        # 블록마다 헤더와 로그 안의 위치만 읽고, 거래 내역은 필요할 때 로그 파일에서 읽습니다. (StoredBlock)
+        self.store = BlockStore(log_path, binary=self.binary_store, cache_size=self.block_cache_size)
+        try:
+            loaded_chain = self.store.open()
+        except ValueError as e:
+            print(f"[{port}번 노드] 🚨 치명적 오류: {log_path} 파일이 손상되었습니다! ({e}) 프로그램을 중단합니다.")
+            exit()
+        if self.store.recovered_bytes:
+            print(f"[{port}번 노드] 경고: {log_path} 끝의 손상된 레코드({self.store.recovered_bytes}바이트)를 잘라내고 복구했습니다.")
+
+        if not loaded_chain:
+            print(f"[{port}번 노드] 새로운 {log_path} 파일을 생성합니다. (제네시스 블록 기반)")
+            for block in self.chain:
+                self.store.append(block, self.hash(block))
+            self.store.flush()
+            return
+
+        trusted = self.trusted_length(loaded_chain)
+        if self.validate_chain(loaded_chain, trusted):
+            self.chain = loaded_chain
+            self.positions = {self.hash(block): position for position, block in enumerate(loaded_chain)}
+            self.store.tip_hash = self.hash(self.last_block)
+            self.store.flush()
+            print(f"[{port}번 노드] 성공: {log_path}에서 체인을 로드했습니다. (블록 {len(self.chain)}개 중 체크포인트 이후 {len(self.chain) - trusted}개 검증)")
+        else:
+            print(f"[{port}번 노드] 🚨 치명적 오류: {log_path} 파일이 손상되었습니다! 프로그램을 중단합니다.")
+            exit()
+
+    def has_bodies(self, start, end):
+        """chain[start:end] 블록의 거래 내역이 모두 있는지 (스냅샷으로 시작해 과거 블록을 받는 중이면 일부는 헤더만 있음)"""
+        return max(start, 1) >= min(end, self.history_start)
+
+    def open_snapshot(self, port):
+        """blockchain_<port>.snapshot.json이 있고 그 마지막 블록이 메인 체인에 있으면, 이웃에게 제공할 스냅샷으로 씁니다."""
+        self.snapshot_path = f"blockchain_{port}.snapshot.json"
+        if self.snapshot is not None or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            snapshot = load_snapshot(self.snapshot_path)
+            if self.block_position(snapshot.get('tip_hash')) is not None and commitment(snapshot) == snapshot.get('commitment'):
+                self.snapshot = snapshot_info(snapshot)
+        except (SnapshotError, KeyError):
+            pass
+
+    def write_snapshot(self, wait=True):
+        """
+        현재 체인의 헤더와 잔액 상태로 스냅샷 파일을 만들고 요약을 반환합니다. (제네시스 블록뿐이면 None)
+        체인 잠금 안에서는 체인 길이와 잔액 사본만 잡아 두고, 헤더를 모아 파일로 쓰는 일(체인 길이에 비례)은
+        잠금 밖의 스냅샷 스레드에서 요청 순서대로 합니다. wait가 False면 끝나기를 기다리지 않고 None을 반환합니다.
+        """
+        with self.lock:
+            if not self.snapshot_path or len(self.chain) <= 1:
+                return None
+            # 체인 리스트는 끝에 추가되거나 통째로 바뀌기만 하므로, 잡아 둔 길이까지의 앞부분은 그대로입니다.
+            chain, length = self.chain, len(self.chain)
+            state = AccountState()
+            state.restore(self.state.balances, self.state.height, self.state.tip_hash)
+        future = self.snapshot_writer.submit(self._save_snapshot, chain, length, state, wait)
+        return future.result() if wait else None
+
+    def _save_snapshot(self, chain, length, state, wait):
+        try:
+            with SNAPSHOT_SAVE_SECONDS.time():
+                snapshot = make_snapshot(chain[:length], state)
+                save_snapshot(snapshot, self.snapshot_path)
+        except (SnapshotError, OSError) as e:
+            if wait:
+                raise
+            print(f"🚨 블록 #{state.height}의 스냅샷을 저장하지 못했습니다: {e}")
+            return None
+        self.snapshot = snapshot_info(snapshot)
+        return self.snapshot
+
+    def fast_sync(self, path=None, expected=None):
+        """
+        체인이 제네시스 블록뿐일 때, 스냅샷으로 헤더 체인과 잔액 상태를 한 번에 받습니다. 설치했으면 True.
+        path(--snapshot)가 없으면 이전에 받아 둔 로컬 스냅샷, 그다음 높이가 높은 이웃의 스냅샷 순으로 시도합니다.
+        expected(--snapshot-hash)가 있으면 commitment가 그 값인 스냅샷만 씁니다.
+        """
+        if len(self.chain) > 1:
+            return False
+        if path:
+            sources = [(path, lambda: load_snapshot(path))]
         else:
-            print(f"[{port}번 노드] 새로운 {filepath} 파일을 생성합니다. (제네시스 블록 기반)")
-            self.save_chain_to_json()
+            sources = [(f'이웃 {node}', lambda node=node: self.download_snapshot(node)) for node in self.snapshot_peers(expected)]
+            if self.snapshot_path and os.path.exists(self.snapshot_path):
+                sources.insert(0, (self.snapshot_path, lambda: load_snapshot(self.snapshot_path)))
+        for source, load in sources:
+            try:
+                self.install_snapshot(load(), expected)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"[{app.config['PORT']}번 노드] {source}의 스냅샷을 쓸 수 없습니다: {e}")
+                continue
+            print(f"[{app.config['PORT']}번 노드] {source}의 스냅샷으로 시작합니다. (블록 #{self.history_start}까지 헤더 {self.history_start}개, 주소 {len(self.state.balances)}개)")
+            return True
+        return False
+
+    def snapshot_peers(self, expected=None):
+        """스냅샷을 제공하는 이웃을 스냅샷 높이가 높은 순으로 반환합니다."""
+        heights = {}
+        for node, response in peers.gather('GET', '/snapshot/info', list(self.nodes)).items():
+            if isinstance(response, Exception) or response.status_code != 200:
+                continue
+            info = response.json()
+            if info.get('height', 0) > 1 and (expected is None or info.get('commitment') == expected):
+                heights[node] = info['height']
+        return sorted(heights, key=heights.get, reverse=True)
+
+    def download_snapshot(self, node):
+        response = peers.get(node, '/snapshot')
+        response.raise_for_status()
+        return response.json()
+
+    def install_snapshot(self, snapshot, expected=None):
+        """
+        스냅샷을 검증하고 체인(제네시스 + HeaderBlock)과 잔액 상태로 씁니다. 잘못된 스냅샷이면 SnapshotError.
+        과거 블록은 backfill_history가 받아 올 때까지 헤더만 있으므로, 블록 로그는 그때까지 쓰지 않습니다.
+        """
+        chain = verify_snapshot(snapshot, GENESIS_BLOCK, self.valid_proof, expected)
+        VALIDATED_BLOCKS.inc(len(chain) - 1, source='snapshot')
+        with self.lock:
+            if len(self.chain) > 1:
+                raise SnapshotError('이미 블록을 가진 노드에는 스냅샷을 설치할 수 없습니다.')
+            self.chain = chain
+            self.positions = {self.hash(block): position for position, block in enumerate(chain)}
+            self.state.restore(snapshot['balances'], snapshot['height'], snapshot['tip_hash'])
+            self.history_start = len(chain)
+            self.history_commitment = snapshot['commitment']
+            self.history_fetched = 0
+            # 블록 로그는 블록 번호 순서대로만 이어 쓸 수 있으므로, 과거 블록을 모두 받은 뒤에 한꺼번에 씁니다.
+            self.deferred_store, self.store = self.store, None
+            if self.snapshot_path:
+                save_snapshot(snapshot, self.snapshot_path)
+            self.snapshot = snapshot_info(snapshot)
+
+    def backfill_history(self, retry_interval=5.0):
+        """
+        [백그라운드 스레드] 스냅샷 이전 블록의 거래 내역을 이웃에게서 받아 헤더와 맞는지 확인하고,
+        제네시스부터 잔액을 다시 계산해 스냅샷과 같은지 확인합니다. 받을 수 있는 이웃이 없으면 기다렸다가 다시 시도합니다.
+        """
+        while self.history_start:
+            for node in list(self.nodes):
+                try:
+                    blocks = self.fetch_history(node)
+                except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+                    print(f"[{app.config['PORT']}번 노드] 이웃 {node}에게서 과거 블록을 받지 못했습니다: {e}")
+                    continue
+                self.complete_history(blocks)
+                return
+            sleep(retry_interval)
+
+    def fetch_history(self, node):
+        """이웃에게서 블록 #2부터 스냅샷 높이까지를 받아, 스냅샷 헤더와 해시, merkle_root가 맞는지 확인해 반환합니다."""
+        chain = self.chain
+        end = self.history_start
+        blocks = []
+        self.history_fetched = 0
+        while len(blocks) < end - 1:
+            next_index = len(blocks) + 2
+            limit = min(MAX_BLOCKS_PER_REQUEST, end - next_index + 1)
+            response = peers.get(node, '/chain/blocks', params={'from': next_index, 'limit': limit}, headers=sync_request_headers())
+            response.raise_for_status()
+            received = blocks_from_response(response)[:limit]
+            if not received:
+                raise ValueError(f'블록 #{next_index} 이후를 보내 주지 않았습니다.')
+            for block in received:
+                if self.hash(block) != self.hash(chain[len(blocks) + 1]):
+                    raise ValueError(f"블록 #{block['index']}의 해시가 스냅샷의 헤더와 다릅니다.")
+                if not self.valid_merkle_root(block):
+                    raise ValueError(f"블록 #{block['index']}의 거래 내역(merkle_root)이 헤더와 맞지 않습니다.")
+                blocks.append(block)
+            self.history_fetched = len(blocks)
+        return blocks
+
+    def complete_history(self, blocks):
+        """
+        받은 과거 블록(#2 ~ 스냅샷 높이)으로 제네시스부터 잔액을 다시 계산해 스냅샷의 commitment와 비교하고,
+        체인의 HeaderBlock을 원래 블록으로 바꾼 뒤 블록 로그와 색인에 씁니다.
+        잔액이 다르면 스냅샷이 잘못된 것이므로, 다시 계산한 잔액으로 최근 블록을 검증해 유효한 블록까지만 남깁니다.
+        """
+        end = self.history_start
+        history = [GENESIS_BLOCK] + blocks
+        verified = AccountState()
+        valid_length = 0
+        for block in history:
+            try:
+                # 제네시스 블록은 채굴 보상 거래가 없으므로 검사하지 않습니다.
+                verified.apply_block(block, self.hash(block), validate=self.enforce_balances and block is not GENESIS_BLOCK)
+            except InvalidTransactionError as e:
+                print(f"[{app.config['PORT']}번 노드] 🚨 과거 블록 검증 실패: {e}")
+                break
+            valid_length += 1
+        VALIDATED_BLOCKS.inc(len(blocks), source='history')
+        recomputed = {'version': SNAPSHOT_VERSION, 'height': verified.height, 'tip_hash': verified.tip_hash, 'balances': verified.balances}
+        matches = valid_length == end and commitment(recomputed) == self.history_commitment
+
+        with self.lock:
+            recent = self.chain[end:]
+            new_chain = history[:valid_length]
+            if valid_length == end:
+                for block in recent:
+                    try:
+                        # 잔액이 스냅샷과 같으면 최근 블록은 이미 같은 잔액으로 검증했습니다.
+                        verified.apply_block(block, self.hash(block), validate=self.enforce_balances and not matches)
+                    except InvalidTransactionError as e:
+                        print(f"[{app.config['PORT']}번 노드] 🚨 최근 블록 검증 실패: {e}")
+                        break
+                    new_chain.append(block)
+            self.chain = new_chain
+            self.positions = {self.hash(block): position for position, block in enumerate(new_chain)}
+            self.state = verified
+            self.history_start = 0
+            self.store, self.deferred_store = self.deferred_store, None
+            if self.store:
+                with STORE_APPEND_SECONDS.time():
+                    self.store.truncate(1, self.hash(GENESIS_BLOCK))
+                    for position in range(1, len(new_chain)):
+                        new_chain[position] = self.store.append(new_chain[position], self.hash(new_chain[position]))
+                    self.store.flush()
+            if self.index and not matches:
+                self.index.rollback_to(1)
+                for block in new_chain[1:]:
+                    self.index.add_block(block, self.hash(block))
+            if self.state_path:
+                self.state.save(self.state_path)
+            if not matches:
+                self.snapshot = None
+                if self.snapshot_path and os.path.exists(self.snapshot_path):
+                    os.remove(self.snapshot_path)
+        if matches:
+            # 과거 블록 번호는 최근 블록과 겹치지 않으므로, 체인 잠금을 놓은 뒤에 색인합니다.
+            if self.index:
+                for block in blocks:
+                    self.index.add_block(block, self.hash(block))
+            print(f"[{app.config['PORT']}번 노드] ✅ 과거 블록 {len(blocks)}개를 받아 검증했습니다. 스냅샷의 잔액이 제네시스부터 다시 계산한 값과 같습니다.")
+        else:
+            print(f"[{app.config['PORT']}번 노드] 🚨 스냅샷의 잔액이 과거 블록으로 다시 계산한 값과 다릅니다! 스냅샷을 버리고 유효한 블록 {len(new_chain)}개까지만 남깁니다.")
+        return matches
 
 # --- Flask 웹 서버 설정 ---
 app = Flask(__name__)
 node_identifier = str(uuid4()).replace('-', '')
+
+# --- 지표 (/metrics, Prometheus 텍스트 형식) ---
+metrics = MetricsRegistry(prefix='blockchain_')
+# /debug/profile/<작업> 으로 요청하면 그 작업의 다음 실행 한 번을 cProfile로 기록합니다. (--profiling 옵션으로 켬)
+profiler = Profiler(targets=('mine', 'resolve_conflicts'))
+HTTP_REQUEST_SECONDS = metrics.histogram('http_request_seconds', '라우트별 요청 처리 시간(초)', ['route', 'method'])
+HTTP_REQUESTS = metrics.counter('http_requests_total', '라우트별 응답 수', ['route', 'method', 'status'])
+POW_SECONDS = metrics.histogram('pow_seconds', '블록 하나의 작업 증명에 걸린 시간(초)', buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+POW_HASHES = metrics.counter('pow_hashes_total', '작업 증명에 사용한 해시 수')
+POW_HASH_RATE = metrics.gauge('pow_hash_rate', '마지막 작업 증명의 초당 해시 수')
+BLOCK_VALIDATION_SECONDS = metrics.histogram('block_validation_seconds', '수신한 블록 하나의 검증 시간(초, 잔액 검사 제외)')
+CHAIN_VALIDATION_SECONDS = metrics.histogram('chain_validation_seconds', '체인(동기화 후보, 시작 시 로드) 검증 시간(초)')
+VALIDATED_BLOCKS = metrics.counter('validated_blocks_total', '검증한 블록 수 (snapshot: 스냅샷의 헤더만, history: 스냅샷 이전 과거 블록)', ['source'])
+STORE_APPEND_SECONDS = metrics.histogram('block_store_write_seconds', '블록 로그 기록 시간(초)')
+STATE_SAVE_SECONDS = metrics.histogram('state_save_seconds', '잔액 상태 파일 저장 시간(초)')
+SNAPSHOT_SAVE_SECONDS = metrics.histogram('snapshot_save_seconds', '상태 스냅샷을 만들어 파일로 저장하는 시간(초)')
+CHAIN_REORGS = metrics.counter('chain_reorgs_total', '메인 체인 블록을 되돌린 재구성 횟수')
+BLOCKS_MINED = metrics.counter('blocks_mined_total', '이 노드가 채굴해 체인에 붙인 블록 수 (mine: 일반 채굴, fork: 공격용 채굴)', ['kind'])
+BLOCKS_RECEIVED = metrics.counter('blocks_received_total', '이웃에게서 받은 블록 수 (처리 결과별)', ['result'])
+PEER_REQUEST_SECONDS = metrics.histogram('peer_request_seconds', '이웃 요청의 응답 시간(초, 재시도 포함)', ['peer', 'path'])
+PEER_REQUEST_FAILURES = metrics.counter('peer_request_failures_total', '재시도 후에도 실패한 이웃 요청 수', ['peer', 'path'])
+PEER_REQUESTS = metrics.counter('peer_requests_total', '이웃에게 보낸 요청 수 (경로별, 전파 메시지 수를 비교할 때 사용)', ['path'])
+GOSSIP_FANOUT_SECONDS = metrics.histogram('gossip_fanout_seconds', '전파 하나가 모든 이웃에게 전송되기까지 걸린 시간(초)', ['path'])
+metrics.gauge('mempool_transactions', '대기 거래 수', function=lambda: len(blockchain.mempool))
+metrics.gauge('chain_length', '메인 체인의 블록 수', function=lambda: len(blockchain.chain))
+metrics.gauge('side_blocks', '보관 중인 곁가지 블록 수', function=lambda: len(blockchain.tree.side))
+metrics.gauge('orphan_blocks', '보관 중인 고아 블록 수', function=lambda: len(blockchain.tree.orphans))
+metrics.gauge('peers', '이웃 노드 수', function=lambda: len(blockchain.nodes))
+metrics.gauge('block_cache_hits', '블록 로그에서 읽지 않고 캐시에서 읽은 거래 내역 수',
+              function=lambda: blockchain.store.cache_hits if blockchain.store else 0)
+metrics.gauge('block_cache_misses', '블록 로그(mmap)에서 읽은 거래 내역 수',
+              function=lambda: blockchain.store.cache_misses if blockchain.store else 0)
+metrics.gauge('history_missing_blocks', '스냅샷으로 시작한 뒤 아직 받지 못한 과거 블록 수',
+              function=lambda: max(blockchain.history_start - 1 - blockchain.history_fetched, 0) if blockchain.history_start else 0)
+
+def instrument_peers(client):
+    """이웃 요청/전파가 끝날 때마다 지표에 기록하도록 PeerClient에 연결합니다."""
+    def on_request(node, path, seconds, error):
+        PEER_REQUEST_SECONDS.observe(seconds, peer=node, path=path)
+        PEER_REQUESTS.inc(path=path)
+        if error is not None:
+            PEER_REQUEST_FAILURES.inc(peer=node, path=path)
+        # 계속 응답하지 않는 이웃은 이웃 목록에서 뺍니다. (빈자리는 이웃 교환으로 채움)
+        if blockchain.nodes.record(node, error):
+            print(f"[{app.config['PORT']}번 노드] 이웃 {node}이(가) 계속 응답하지 않아 이웃 목록에서 뺐습니다.")
+    client.on_request = on_request
+    client.on_broadcast = lambda path, seconds, failures: GOSSIP_FANOUT_SECONDS.observe(seconds, path=path)
+    return client
+
 blockchain = Blockchain() 
+peers = instrument_peers(PeerClient())
+relay = TransactionRelay(
+    peers,
+    nodes=lambda: blockchain.nodes,
+    lookup=blockchain.mempool.get,
+    confirmed=blockchain.confirmed_transactions,
+    on_error=lambda node, error: print(f"[{app.config['PORT']}번 노드] 노드 {node}에게 거래 전파 실패: {error}")
+)
+# 블록을 주고받을 때 쓰는 형식. 'binary'면 codec 인코딩, 'json'이면 예전처럼 JSON (받는 쪽은 둘 다 처리)
+app.config['WIRE_FORMAT'] = 'binary'
+# 이 노드에서 처음 전파하는 블록/거래가 몇 단계(hop)까지 전달될 수 있는지
+app.config['GOSSIP_TTL'] = DEFAULT_GOSSIP_TTL
 
-# --- API 엔드포인트: mine, new_transaction, receive_block, chain, pending, resolve ---
-@app.route('/mine', methods=['GET'])
-def mine():
+def report_gossip_failure(kind):
+    """비동기 전파가 실패했을 때 로그를 남기는 콜백을 만듭니다."""
+    def on_error(node, error):
+        print(f"[{app.config['PORT']}번 노드] 노드 {node}에게 {kind} 전파 실패: {error}")
+    return on_error
+
+def broadcast_block(block, ttl=None, exclude=None):
+    """
+    블록을 이웃에게 전파합니다. (결과를 기다리지 않음)
+    ttl은 받는 이웃이 앞으로 더 전달할 수 있는 단계 수(없으면 이 노드가 처음 전파: GOSSIP_TTL), exclude는 이 블록을 보내 준 이웃입니다.
+    """
+    ttl = app.config['GOSSIP_TTL'] if ttl is None else ttl
+    if ttl <= 0:
+        return
+    nodes = [node for node in blockchain.nodes if node != exclude]
+    headers = {GOSSIP_TTL_HEADER: str(ttl)}
+    if blockchain.nodes.me:
+        headers[GOSSIP_FROM_HEADER] = blockchain.nodes.me
+    on_error = report_gossip_failure('블록')
+    if app.config['WIRE_FORMAT'] == 'binary':
+        peers.broadcast('/blocks/receive', codec.encode_block(block), nodes, on_error=on_error, content_type=codec.CONTENT_TYPE, headers=headers)
+    else:
+        peers.broadcast('/blocks/receive', block.to_dict(), nodes, on_error=on_error, headers=headers)
+
+def gossip_ttl():
+    """
+    받은 블록/거래를 이웃에게 다시 보낼 때 붙일 TTL.
+    TTL 헤더 없이 propagated 표시만 있으면 예전 노드가 모든 이웃에게 직접 보낸 것이므로 더 전달하지 않습니다.
+    """
+    ttl = request.headers.get(GOSSIP_TTL_HEADER)
+    if ttl is None:
+        values = request.get_json(silent=True)
+        if isinstance(values, dict) and values.get('propagated'):
+            return 0
+    return forward_ttl(ttl, app.config['GOSSIP_TTL'])
+
+def sync_request_headers():
+    """동기화 요청에 붙이는 Accept 헤더. 바이너리를 모르는 이웃은 무시하고 JSON으로 답합니다."""
+    if app.config['WIRE_FORMAT'] == 'binary':
+        return {'Accept': f'{codec.BATCH_CONTENT_TYPE}, application/json;q=0.5'}
+    return {}
+
+def blocks_from_response(response):
+    """/chain/blocks 응답의 블록 목록 (응답의 Content-Type에 따라 바이너리 또는 JSON)"""
+    if response.headers.get('Content-Type', '').startswith(codec.BATCH_CONTENT_TYPE):
+        blocks = codec.decode_blocks(response.content)
+    else:
+        blocks = response.json()['blocks']
+    return [Block.from_dict(block) for block in blocks]
+
+def request_block():
+    """요청 본문의 블록. Content-Type이 application/x-block이면 바이너리, 아니면 JSON으로 읽습니다."""
+    if request.mimetype == codec.CONTENT_TYPE:
+        return Block.from_dict(codec.decode_block(request.get_data()))
+    block = request.get_json()
+    if not isinstance(block, dict):
+        raise ValueError('블록은 JSON 객체여야 합니다.')
+    return Block.from_dict(block)
+
+def mine_block(job):
+    """
+    [채굴 작업 스레드에서 실행] 작업 증명을 수행하고 새 블록을 체인에 추가한 뒤 전파합니다.
+    작업이 취소되었거나, 그 사이 같은 높이의 블록을 다른 노드에게서 먼저 받았다면 None을 반환합니다.
+    """
+    with profiler.section('mine'):
+        return _mine_block(job)
+
+def _mine_block(job):
     last_block = blockchain.last_block
     last_proof = last_block['proof']
-    proof = blockchain.proof_of_work(last_proof)
+    proof = blockchain.proof_of_work(last_proof, job.cancel_event, job.on_progress)
+    if proof is None:
+        return None
 
     reward_transaction = {
-        "sender": "0", "recipient": node_identifier, "amount": 1, "time": time() 
+        "sender": "0", "recipient": node_identifier, "amount": BLOCK_REWARD, "time": time() 
     }
-    blockchain.new_transaction(reward_transaction)
-
     previous_hash = blockchain.hash(last_block)
-    block = blockchain.new_block(proof, previous_hash)
-    blockchain.save_chain_to_json()
+    with blockchain.lock:
+        # 작업 증명을 하는 동안 다른 스레드가 블록을 붙였다면 이 proof는 쓸 수 없습니다.
+        if blockchain.last_block is not last_block:
+            return None
+        block = blockchain.new_block(proof, previous_hash, reward_transaction)
+    BLOCKS_MINED.inc(kind='mine')
 
-    for node in blockchain.nodes:
-        try:
-            requests.post(f'http://{node}/blocks/receive', json=block)
-        except requests.exceptions.RequestException:
-            print(f"[{app.config['PORT']}번 노드] 노드 {node}에게 블록 전파 실패")
+    # 블록은 이미 저장되었으므로, 전파 결과를 기다리지 않고 바로 끝냅니다.
+    broadcast_block(block)
+    print(f"[{app.config['PORT']}번 노드] ⛏️ 블록 #{block['index']} 채굴 성공 (작업 {job.id[:8]})")
+    return block.to_dict()
 
+mining_jobs = MiningJobManager(mine_block, has_pending_work=lambda: len(blockchain.mempool) > 0)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+# --- API 엔드포인트: mine, new_transaction, receive_block, chain, pending, resolve ---
+@app.route('/mine', methods=['GET', 'POST'])
+def mine():
+    """
+    채굴 작업을 백그라운드에서 시작하고 작업 ID를 바로 반환합니다. (POST)
+    예전 방식의 GET 요청은 호환을 위해 작업이 끝날 때까지 기다렸다가 블록을 반환합니다.
+    """
+    job = mining_jobs.submit(len(blockchain.chain) + 1)
+    if request.method == 'POST':
+        response = {'message': '채굴 작업을 시작했습니다.', 'job_id': job.id, 'status_url': f'/mine/jobs/{job.id}'}
+        return jsonify(response), 202
+
+    job.finished.wait()
+    if job.status != 'done':
+        return jsonify({'message': f'채굴이 완료되지 않았습니다. ({job.status})', 'job': job.to_dict()}), 409
     response = {
         'message': "새로운 블록 채굴 성공!",
-        'block': block
+        'block': job.block
     }
     return jsonify(response), 200
 
+@app.route('/mine/jobs', methods=['GET'])
+def list_mining_jobs():
+    response = {'jobs': [job.to_dict() for job in mining_jobs.list_jobs()], 'auto': mining_jobs.auto_enabled.is_set()}
+    return jsonify(response), 200
+
+@app.route('/mine/jobs/<job_id>', methods=['GET'])
+def mining_job_status(job_id):
+    job = mining_jobs.get(job_id)
+    if job is None:
+        return "오류: 해당 채굴 작업을 찾을 수 없습니다.", 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/mine/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_mining_job(job_id):
+    job = mining_jobs.cancel(job_id)
+    if job is None:
+        return "오류: 해당 채굴 작업을 찾을 수 없습니다.", 404
+    job.finished.wait(timeout=2)
+    return jsonify(job.to_dict()), 200
+
+@app.route('/mine/auto', methods=['GET', 'POST'])
+def auto_mining():
+    """연속 채굴 모드 조회/설정. POST {"enabled": true} 이면 대기 거래가 있는 동안 계속 채굴합니다."""
+    if request.method == 'POST':
+        enabled = bool((request.get_json() or {}).get('enabled'))
+        mining_jobs.set_auto(enabled, lambda: len(blockchain.chain) + 1)
+    return jsonify({'auto': mining_jobs.auto_enabled.is_set()}), 200
+
 # 👈 [추가] 이중 지불 공격 API 엔드포인트
 @app.route('/mine_fork', methods=['POST'])
 def mine_fork():
     """
     [추가] 공격용 블록 생성 API. 대기 목록을 무시하고, 요청에 담긴 거래만으로 블록을 생성합니다.
     """
-    values = request.get_json()
-    transactions = values.get('transactions', [])
+    values = request.get_json(silent=True)
+    transactions = values.get('transactions', []) if isinstance(values, dict) else None
+    if not isinstance(transactions, list) or not all(isinstance(tx, dict) and all(k in tx for k in REQUIRED_TRANSACTION_FIELDS) for tx in transactions):
+        return f"오류: 'transactions'는 거래({', '.join(REQUIRED_TRANSACTION_FIELDS)}) 목록이어야 합니다.", 400
+    if any(is_coinbase(tx) for tx in transactions):
+        return "오류: 채굴 보상 거래(sender=0)는 넣을 수 없습니다. (보상은 블록 끝에 자동으로 붙음)", 400
+    if blockchain.enforce_balances and len(blockchain.state.select_valid(transactions)) != len(transactions):
+        return "오류: 잔액이 부족한 거래가 포함되어 있습니다. (비밀 체인에서도 잔액은 지켜야 합니다)", 400
     
     last_block = blockchain.last_block
     last_proof = last_block['proof']
     proof = blockchain.proof_of_work(last_proof)
 
-    # 채굴 보상 추가 (공격자는 자기 보상은 챙김)
-    reward_transaction = {"sender": "0", "recipient": node_identifier, "amount": 1, "time": time()}
+    # 채굴 보상 추가 (공격자는 자기 보상과 수수료는 챙김)
+    reward_transaction = {"sender": "0", "recipient": node_identifier, "amount": BLOCK_REWARD + block_fees(transactions), "time": time()}
     transactions.append(reward_transaction)
 
     previous_hash = blockchain.hash(last_block)
     
-    # 강제 블록 생성
-    block = blockchain.new_block_force(proof, previous_hash, transactions)
-    blockchain.save_chain_to_json()
+    # 강제 블록 생성 (작업 증명 중에 체인이 바뀌었다면 이 proof는 쓸 수 없음)
+    with blockchain.lock:
+        if blockchain.last_block is not last_block:
+            return "오류: 채굴하는 동안 체인이 바뀌었습니다. 다시 시도하세요.", 409
+        try:
+            block = blockchain.new_block_force(proof, previous_hash, transactions)
+        except InvalidTransactionError as e:
+            return f"오류: {e}", 400
+    BLOCKS_MINED.inc(kind='fork')
     
     # 이 블록은 공격용이므로, 네트워크에 전파하지 않음 (비밀 체인)
 
     response = {
         'message': "공격용 블록 채굴 성공 (비밀리에 저장됨)",
-        'block': block
+        'block': block.to_dict()
     }
     return jsonify(response), 200
 
 
 @app.route('/transactions/new', methods=['POST'])
 def new_transaction():
-    values = request.get_json()
-    required = ['sender', 'recipient', 'amount', 'time'] 
-    if not all(k in values for k in required):
+    values = request.get_json(silent=True)
+    if not isinstance(values, dict) or not all(k in values for k in REQUIRED_TRANSACTION_FIELDS):
         return '필수 값이 누락되었습니다. (sender, recipient, amount, time)', 400
-    index = blockchain.new_transaction(values) 
+    try:
+        index = blockchain.new_transaction(values) 
+    except MempoolFullError as e:
+        return jsonify({'message': str(e)}), 503
+    except InvalidTransactionError as e:
+        return jsonify({'message': f'거래 거부: {e}'}), 400
     if index is None:
         response = {'message': '이미 존재하는 트랜잭션입니다.'}
         return jsonify(response), 200
-    is_propagated = values.get('propagated', False)
-    if not is_propagated:
-        values['propagated'] = True 
-        for node in blockchain.nodes:
-            try:
-                requests.post(f'http://{node}/transactions/new', json=values)
-            except requests.exceptions.RequestException:
-                print(f"[{app.config['PORT']}번 노드] 노드 {node}에게 거래 전파 실패")
+    # 처음 보는 거래만 여기까지 오므로(중복은 위에서 끝남), TTL이 남아 있으면 이웃에게 한 단계 더 전달합니다.
+    relay.announce([transaction_id(values)], gossip_ttl())
+    mining_jobs.notify_pending()
     response = {'message': f'거래가 블록 {index}에 추가될 예정입니다.'}
     return jsonify(response), 201
 
+@app.route('/transactions/batch', methods=['POST'])
+def new_transactions_batch():
+    """
+    여러 거래를 한 번에 받아 검증합니다. 본문: {"transactions": [거래, ...]} (최대 MAX_TXS_PER_BATCH개)
+    거래마다 결과가 다를 수 있으므로, 추가/중복/거부된 거래를 나누어 알려줍니다.
+    """
+    values = request.get_json(silent=True)
+    transactions = values.get('transactions') if isinstance(values, dict) else None
+    if not isinstance(transactions, list):
+        return "오류: 'transactions' 목록이 필요합니다.", 400
+    if len(transactions) > MAX_TXS_PER_BATCH:
+        return f"오류: 한 번에 최대 {MAX_TXS_PER_BATCH}개의 거래만 보낼 수 있습니다.", 413
+
+    accepted = []
+    rejected = []
+    duplicates = 0
+    for position, (txid, error) in enumerate(blockchain.new_transactions(transactions)):
+        if txid is not None:
+            accepted.append(txid)
+        elif error is not None:
+            rejected.append({'position': position, 'message': error})
+        else:
+            duplicates += 1
+    if accepted:
+        relay.announce(accepted, gossip_ttl())
+        mining_jobs.notify_pending()
+    response = {
+        'message': f'거래 {len(accepted)}개가 블록 {blockchain.last_block["index"] + 1}에 추가될 예정입니다.',
+        'accepted': len(accepted),
+        'duplicates': duplicates,
+        'rejected': rejected,
+        'txids': accepted
+    }
+    return jsonify(response), 201 if accepted else 200
+
+@app.route('/transactions/inv', methods=['POST'])
+def transaction_inventory():
+    """이웃이 알려준 거래 ID 목록 중 이 노드에 없는 것을 돌려줍니다. (이웃은 그 거래만 /transactions/batch로 보냄)"""
+    values = request.get_json(silent=True)
+    txids = values.get('txids') if isinstance(values, dict) else None
+    if not isinstance(txids, list):
+        return "오류: 'txids' 목록이 필요합니다.", 400
+    return jsonify({'missing': relay.missing(txids)}), 200
+
 @app.route('/blocks/receive', methods=['POST'])
 def receive_block():
-    new_block = request.get_json()
-    last_block = blockchain.last_block
-    
-    if new_block['previous_hash'] != blockchain.hash(last_block):
-        if new_block['index'] > last_block['index'] + 1:
-            print(f"[{app.config['PORT']}번 노드] 수신한 블록 #{new_block['index']}이 내 체인보다 너무 깁니다. 전체 동기화(/resolve)가 필요합니다.")
-            return "체인 동기화 필요", 409
-        return "오류: 블록의 previous_hash가 일치하지 않습니다.", 400
-        
-    if not blockchain.valid_proof(last_block['proof'], new_block['proof']):
-        return "오류: 블록의 작업 증명이 유효하지 않습니다.", 400
-        
-    if new_block['index'] <= last_block['index']:
-        return "이미 최신 블록을 가지고 있습니다.", 200
-
-    tx_hash_check = hashlib.sha256(json.dumps(new_block['transactions'], sort_keys=True).encode()).hexdigest()
-    if new_block.get('merkle_root') != tx_hash_check:
-        return "오류: 수신한 블록의 거래 내역(merkle_root)이 조작되었습니다.", 400
-
-    new_tx_list = [json.dumps(tx, sort_keys=True) for tx in new_block['transactions']]
-    temp_transactions = []
-    for tx in blockchain.current_transactions:
-        if json.dumps(tx, sort_keys=True) not in new_tx_list:
-            temp_transactions.append(tx)
-    blockchain.current_transactions = temp_transactions
-    
-    blockchain.chain.append(new_block)
-    blockchain.save_chain_to_json()
-    
-    print(f"[{app.config['PORT']}번 노드] 🎉 블록 #{new_block['index']}을(를) 네트워크로부터 수신 및 동기화했습니다.")
-    return "블록 수신 완료", 201
+    try:
+        new_block = request_block()
+        blockchain.hash(new_block)  # 헤더 형식 확인 (버전 3 블록은 고정 길이 헤더로 인코딩할 수 있어야 함)
+    except (ValueError, KeyError, TypeError) as e:
+        return f"오류: 블록 형식이 올바르지 않습니다. ({e})", 400
+    # 검증과 추가는 체인 잠금 안에서 한 번에 합니다. (메인 체인 끝, 곁가지, 고아 블록 중 어디에 들어갈지 결정)
+    try:
+        result = blockchain.receive_block(new_block)
+    except InvalidTransactionError as e:
+        BLOCKS_RECEIVED.inc(result='invalid')
+        return f"오류: 수신한 블록에 유효하지 않은 거래가 있습니다. ({e})", 400
+    except ValueError as e:
+        BLOCKS_RECEIVED.inc(result='invalid')
+        return f"오류: {e}", 400
+
+    BLOCKS_RECEIVED.inc(result=result)
+    # 이미 가진 블록(메인 체인, 곁가지, 고아 블록)은 다시 전달하지 않으므로, 블록마다 이웃 하나에게 한 번씩만 보냅니다.
+    if result == 'known':
+        return "이미 가지고 있는 블록입니다.", 200
+    ttl = gossip_ttl()
+    sender = request.headers.get(GOSSIP_FROM_HEADER)
+    if result == 'side':
+        # 곁가지도 전달해야, 이 가지가 나중에 더 길어졌을 때 이웃이 부모 블록을 이미 가지고 있습니다.
+        broadcast_block(new_block, ttl, exclude=sender)
+        print(f"[{app.config['PORT']}번 노드] 🌿 블록 #{new_block['index']}을(를) 곁가지에 보관했습니다. (메인 체인의 작업량이 더 큼)")
+        return "곁가지 블록으로 보관했습니다.", 202
+    if result in ('extended', 'reorg'):
+        broadcast_block(new_block, ttl, exclude=sender)
+        # 같은 높이의 블록을 채굴 중이었다면, 경쟁에서 졌으므로 채굴을 중단합니다.
+        mining_jobs.cancel_stale(len(blockchain.chain))
+        if result == 'reorg':
+            print(f"[{app.config['PORT']}번 노드] 🔀 블록 #{new_block['index']}로 더 큰 작업량의 가지가 되어 체인을 재구성했습니다.")
+            return "블록 수신 완료 (체인 재구성)", 201
+        print(f"[{app.config['PORT']}번 노드] 🎉 블록 #{new_block['index']}을(를) 네트워크로부터 수신 및 동기화했습니다.")
+        return "블록 수신 완료", 201
+
+    # 부모를 모르는 고아 블록: 이웃에게서 부족한 블록을 받아오는 동안에는 체인 잠금을 잡지 않습니다.
+    # 메인 체인 끝 다음 번호 이상이면 그 가지의 작업량이 더 크므로 바로 동기화합니다.
+    # (모든 노드와 연결되어 있지 않으면 부모 블록이 다른 경로로 오지 않을 수 있음)
+    if new_block['index'] <= blockchain.last_block['index']:
+        return "부모 블록을 기다리는 고아 블록으로 보관했습니다.", 202
+    print(f"[{app.config['PORT']}번 노드] 수신한 블록 #{new_block['index']}의 부모 블록을 모릅니다. 부족한 블록만 동기화합니다.")
+    if blockchain.resolve_conflicts():
+        mining_jobs.cancel_stale(len(blockchain.chain))
+        broadcast_block(blockchain.last_block, ttl, exclude=sender)
+        return "부족한 블록 동기화 완료", 201
+    return "체인 동기화 필요", 409
+
+def history_pending_response():
+    """스냅샷 이전 블록의 거래 내역을 아직 받는 중일 때의 응답 (헤더는 /chain/headers 로 조회 가능)"""
+    message = f"오류: 스냅샷(블록 #{blockchain.history_start}) 이전 블록의 거래 내역을 아직 받는 중입니다. 잠시 후 다시 시도하세요."
+    return message, 503
+
+def retry_stale_reads(view):
+    """
+    잠금 없이 체인을 읽는 라우트에 씁니다. 읽는 도중 체인이 교체되어, 붙잡고 있던 예전 체인 블록의 거래 내역이
+    블록 로그에서 사라졌다면(StaleBlockError) 바뀐 체인으로 처음부터 다시 읽습니다. (최대 STALE_READ_ATTEMPTS번)
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        for _ in range(STALE_READ_ATTEMPTS - 1):
+            try:
+                return view(*args, **kwargs)
+            except StaleBlockError:
+                continue
+        return view(*args, **kwargs)
+    return wrapper
+
+def header_with_hash(block):
+    header = blockchain.header(block)
+    header['hash'] = blockchain.hash(block)
+    return header
 
 @app.route('/chain', methods=['GET'])
+@retry_stale_reads
 def full_chain():
-    response = {'chain': blockchain.chain, 'length': len(blockchain.chain)}
+    """
+    체인 조회. 파라미터가 없으면 예전처럼 체인 전체를 반환합니다.
+    ?from=<블록 번호>&limit=<개수> : 일부 블록만 (페이지 단위)
+    ?headers=1 : 거래 내역 없이 헤더와 해시만
+    ?format=ndjson : 한 줄에 블록 하나씩 스트리밍 (응답 전체를 메모리에 만들지 않음, 도중에 체인이 교체되면 바뀐 체인으로 이어서 보냄)
+    """
+    chain = blockchain.chain
+    length = len(chain)
+    start = max(request.args.get('from', 1, type=int), 1) - 1
+    limit = request.args.get('limit', type=int)
+    end = length if limit is None else min(start + max(limit, 0), length)
+    render = header_with_hash if request.args.get('headers') in ('1', 'true') else Block.to_dict
+    if render is Block.to_dict and not blockchain.has_bodies(start, end):
+        return history_pending_response()
+
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            current = chain
+            for position in range(start, end):
+                try:
+                    rendered = render(current[position])
+                except StaleBlockError:
+                    current = blockchain.chain
+                    if position >= len(current):
+                        return
+                    rendered = render(current[position])
+                yield json.dumps(rendered, ensure_ascii=False) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson', headers={'X-Chain-Length': str(length)})
+
+    response = {'chain': [render(block) for block in chain[start:end]], 'length': length, 'from': start + 1}
+    return jsonify(response), 200
+
+@app.route('/status', methods=['GET'])
+def status():
+    """관제실 등이 주기적으로 확인하는 가벼운 상태 정보 (체인 본문은 보내지 않음)"""
+    chain = blockchain.chain
+    last_block = chain[-1]
+    response = {
+        'length': len(chain),
+        'tip_hash': blockchain.hash(last_block),
+        'tip_index': last_block['index'],
+        'mempool_size': len(blockchain.mempool),
+        'peers': len(blockchain.nodes),
+        'side_blocks': len(blockchain.tree.side),
+        'orphan_blocks': len(blockchain.tree.orphans),
+        'auto_mining': mining_jobs.auto_enabled.is_set(),
+        'snapshot_height': blockchain.snapshot['height'] if blockchain.snapshot else None,
+        'history_missing_blocks': max(blockchain.history_start - 1 - blockchain.history_fetched, 0) if blockchain.history_start else 0
+    }
+    return jsonify(response), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """노드 내부 지표 (Prometheus 텍스트 형식)"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/debug/profile/<target>', methods=['GET', 'POST'])
+def debug_profile(target):
+    """
+    POST: target(mine, resolve_conflicts)의 다음 실행 한 번을 cProfile로 기록하도록 예약합니다. (--profiling 필요)
+    GET: 마지막으로 기록한 결과 (누적 시간 순 pstats 보고서)
+    """
+    if request.method == 'POST':
+        try:
+            profiler.arm(target)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify({'message': f'다음 {target} 실행을 기록합니다.', 'result_url': f'/debug/profile/{target}'}), 202
+    result = profiler.result(target)
+    if result is None:
+        return jsonify({'message': f'{target}의 기록이 아직 없습니다.'}), 404
+    if request.args.get('format') == 'json':
+        return jsonify(result), 200
+    return Response(result['report'], mimetype='text/plain')
+
+@app.route('/chain/tip', methods=['GET'])
+def chain_tip():
+    chain = blockchain.chain
+    last_block = chain[-1]
+    response = {
+        'index': last_block['index'],
+        'hash': blockchain.hash(last_block),
+        'length': len(chain),
+        'work': format(blockchain.chain_work(chain), 'x')  # 누적 작업량 (16진수)
+    }
+    return jsonify(response), 200
+
+@app.route('/chain/headers', methods=['GET'])
+def chain_headers():
+    """블록 번호 from부터 limit개의 헤더(거래 내역 제외)와 각 블록의 해시를 반환합니다."""
+    start = request.args.get('from', 1, type=int)
+    limit = min(max(request.args.get('limit', MAX_HEADERS_PER_REQUEST, type=int), 1), MAX_HEADERS_PER_REQUEST)
+    chain = blockchain.chain
+    headers = [header_with_hash(block) for block in chain[max(start, 1) - 1:max(start, 1) - 1 + limit]]
+    response = {'headers': headers, 'length': len(chain)}
+    return jsonify(response), 200
+
+@app.route('/chain/blocks', methods=['GET'])
+@retry_stale_reads
+def chain_blocks():
+    """
+    블록 번호 from부터(또는 해시가 after인 블록의 다음부터) limit개의 블록을 반환합니다.
+    """
+    chain = blockchain.chain
+    after_hash = request.args.get('after')
+    if after_hash:
+        position = blockchain.block_position(after_hash)
+        if position is None:
+            return "오류: 해당 해시의 블록을 찾을 수 없습니다.", 404
+        start = position + 1
+    else:
+        start = max(request.args.get('from', 1, type=int), 1) - 1
+    limit = min(max(request.args.get('limit', MAX_BLOCKS_PER_REQUEST, type=int), 1), MAX_BLOCKS_PER_REQUEST)
+    if not blockchain.has_bodies(start, start + limit):
+        return history_pending_response()
+    blocks = chain[start:start + limit]
+    # Accept 헤더로 바이너리를 요청한 이웃에게는 바이너리로, 그 밖에는 JSON으로 응답합니다.
+    if request.accept_mimetypes.best_match(['application/json', codec.BATCH_CONTENT_TYPE]) == codec.BATCH_CONTENT_TYPE:
+        return Response(codec.encode_blocks(blocks), mimetype=codec.BATCH_CONTENT_TYPE, headers={'X-Chain-Length': str(len(chain))})
+    response = {'blocks': [block.to_dict() for block in blocks], 'length': len(chain)}
+    return jsonify(response), 200
+
+@app.route('/transactions/<txid>/proof', methods=['GET'])
+@retry_stale_reads
+def transaction_proof(txid):
+    """거래가 어느 블록에 포함되어 있는지와, 그 블록 merkle_root까지의 포함 증명을 반환합니다."""
+    location = blockchain.transaction_location(txid)
+    if location is None:
+        return "오류: 체인에서 해당 거래를 찾을 수 없습니다.", 404
+
+    block = location[0]
+    if block_version(block) < MERKLE_VERSION:
+        return "오류: 예전 형식(버전 1) 블록은 머클 트리가 없어 포함 증명을 만들 수 없습니다.", 409
+    tree = blockchain.merkle_tree(block)
+    response = {
+        'txid': txid,
+        'block_index': block['index'],
+        'block_hash': blockchain.hash(block),
+        'merkle_root': block['merkle_root'],
+        'position': tree.positions[txid],
+        'proof': tree.proof(txid)
+    }
+    return jsonify(response), 200
+
+@app.route('/blocks/<block_hash>', methods=['GET'])
+@retry_stale_reads
+def block_by_hash(block_hash):
+    position = blockchain.block_position(block_hash)
+    if position is None:
+        return "오류: 해당 해시의 블록을 찾을 수 없습니다.", 404
+    if not blockchain.has_bodies(position, position + 1):
+        return history_pending_response()
+    return jsonify(blockchain.chain[position].to_dict()), 200
+
+@app.route('/tx/<txid>', methods=['GET'])
+@retry_stale_reads
+def transaction_by_id(txid):
+    """거래 ID로 거래를 조회합니다. 아직 블록에 담기지 않았다면 대기 거래 목록에서 찾습니다."""
+    location = blockchain.transaction_location(txid)
+    if location is not None:
+        block, position = location
+        response = {
+            'txid': txid,
+            'status': 'confirmed',
+            'transaction': block['transactions'][position],
+            'block_index': block['index'],
+            'block_hash': blockchain.hash(block),
+            'position': position,
+            'confirmations': len(blockchain.chain) - block['index'] + 1
+        }
+        return jsonify(response), 200
+    pending = blockchain.mempool.get(txid)
+    if pending is not None:
+        return jsonify({'txid': txid, 'status': 'pending', 'transaction': pending}), 200
+    return "오류: 해당 거래를 찾을 수 없습니다.", 404
+
+@app.route('/address/<address>/history', methods=['GET'])
+@retry_stale_reads
+def address_history(address):
+    """주소가 보내거나 받은 거래 목록 (최신순, ?offset=&limit= 페이지 단위)"""
+    if blockchain.index is None:
+        return "오류: 조회용 색인이 준비되지 않았습니다.", 503
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    total, entries = blockchain.index.address_history(address, offset, limit)
+    chain = blockchain.chain
+    for entry in entries:
+        if entry['block_index'] <= len(chain):
+            entry['transaction'] = chain[entry['block_index'] - 1]['transactions'][entry['position']]
+    response = {'address': address, 'total': total, 'offset': offset, 'limit': limit, 'history': entries}
+    return jsonify(response), 200
+
+@app.route('/balance/<address>', methods=['GET'])
+def balance(address):
+    """주소의 잔액. 블록마다 갱신되는 잔액 상태에서 바로 읽으므로 체인을 훑지 않습니다."""
+    confirmed = blockchain.state.balance(address)
+    pending_spent = blockchain.mempool.spent_by(address)
+    response = {
+        'address': address,
+        'balance': confirmed,
+        'pending_spent': pending_spent,
+        'available': confirmed - pending_spent,
+        'block_index': blockchain.state.height
+    }
     return jsonify(response), 200
 
 @app.route('/transactions/pending', methods=['GET'])
@@ -315,60 +1559,166 @@ def get_pending_transactions():
 def consensus():
     replaced = blockchain.resolve_conflicts()
     if replaced:
-        response = {'message': '체인이 교체되었습니다. (더 긴 체인 발견)', 'new_chain': blockchain.chain}
+        mining_jobs.cancel_stale(len(blockchain.chain))
+        # 바뀐 체인의 끝 블록을 이웃에게 알립니다. (부모를 모르는 이웃은 이 노드에게서 부족한 블록을 받아감)
+        broadcast_block(blockchain.last_block)
+        message = '체인이 교체되었습니다. (누적 작업량이 더 큰 체인 발견)'
     else:
-        response = {'message': '현재 체인이 가장 최신입니다.', 'chain': blockchain.chain}
+        message = '현재 체인이 가장 최신입니다.'
+    # 체인 전체 대신 길이와 팁 해시만 돌려줍니다. (블록은 /chain?from=&limit= 으로 조회)
+    response = {'message': message, 'replaced': replaced, 'length': len(blockchain.chain), 'tip_hash': blockchain.hash(blockchain.last_block)}
     return jsonify(response), 200
 
 @app.route('/add_peer', methods=['POST'])
 def add_peer():
+    """
+    이웃 추가 요청 (관제실의 소개 또는 다른 노드의 이웃 교환).
+    이웃 자리가 남아 있으면 201, 가득 찼으면 주소록에만 넣고 200을 반환합니다. (요청한 쪽은 201일 때만 연결)
+    """
     values = request.get_json()
     peer_url = values.get('peer_url')
     if not peer_url:
         return "오류: 'peer_url'이 누락되었습니다.", 400
-        
-    parsed_url = urlparse(peer_url)
-    blockchain.register_node(peer_url)
-    print(f"[{app.config['PORT']}번 노드] 관제실로부터 새 이웃 {parsed_url.netloc} 을(를) 소개받았습니다.")
+    try:
+        added = blockchain.register_node(peer_url)
+    except ValueError as e:
+        return f"오류: {e}", 400
+    address = peer_address(peer_url)
+    if address == blockchain.nodes.me:
+        return "오류: 자기 자신은 이웃으로 추가할 수 없습니다.", 400
+    if not added:
+        return f"이웃이 가득 찼습니다. (최대 {blockchain.nodes.max_peers}개)", 200
+    print(f"[{app.config['PORT']}번 노드] 새 이웃 {address} 을(를) 소개받았습니다. (이웃 {len(blockchain.nodes)}개)")
     return "이웃 추가 완료", 201
 
+@app.route('/snapshot', methods=['GET', 'POST'])
+def snapshot_file():
+    """
+    GET: 이 노드의 최근 상태 스냅샷 (헤더 체인 + 잔액 + commitment, 새 노드의 빠른 동기화용)
+    POST: 지금 체인으로 스냅샷을 새로 만듭니다.
+    """
+    if request.method == 'POST':
+        info = blockchain.write_snapshot()
+        if info is None:
+            return "오류: 스냅샷을 만들 블록이 없습니다.", 409
+        return jsonify(info), 201
+    info = blockchain.snapshot
+    if info is None or not blockchain.snapshot_path or not os.path.exists(blockchain.snapshot_path):
+        return "오류: 제공할 스냅샷이 없습니다.", 404
+    return send_file(os.path.abspath(blockchain.snapshot_path), mimetype='application/json')
+
+@app.route('/snapshot/info', methods=['GET'])
+def snapshot_summary():
+    """제공하는 스냅샷의 높이, 마지막 블록 해시, commitment (마지막 블록이 메인 체인에서 밀려났으면 404)"""
+    info = blockchain.snapshot
+    if info is None or blockchain.block_position(info['tip_hash']) is None:
+        return "오류: 제공할 스냅샷이 없습니다.", 404
+    return jsonify(info), 200
+
+@app.route('/nodes/peers', methods=['GET'])
+def list_peers():
+    """이 노드의 이웃 목록 (이웃 교환용)"""
+    response = {
+        'peers': [f'http://{node}' for node in blockchain.nodes],
+        'max_peers': blockchain.nodes.max_peers,
+        'known': len(blockchain.nodes.known)
+    }
+    return jsonify(response), 200
+
 # --- 서버 실행 ---
 if __name__ == '__main__':
     from argparse import ArgumentParser
     
     parser = ArgumentParser()
     parser.add_argument('-p', '--port', default=5000, type=int, help='서버가 실행될 포트 번호')
+    parser.add_argument('--full-verify', action='store_true', help='체크포인트를 무시하고 체인 전체를 제네시스부터 검증')
+    parser.add_argument('--peer-timeout', default=5.0, type=float, help='이웃 노드 요청의 응답 대기 시간(초)')
+    parser.add_argument('--peer-retries', default=2, type=int, help='이웃 노드 연결 실패 시 재시도 횟수')
+    parser.add_argument('--gossip-workers', default=8, type=int, help='이웃에게 동시에 요청을 보내는 작업자 수')
+    parser.add_argument('--tx-relay-window', default=0.05, type=float, help='거래를 모아서 전파하는 간격(초). 0이면 예전처럼 거래마다 바로 전파')
+    parser.add_argument('--max-peers', default=DEFAULT_MAX_PEERS, type=int, help='최대 이웃 수 (넘치는 노드는 주소록에만 보관)')
+    parser.add_argument('--gossip-ttl', default=DEFAULT_GOSSIP_TTL, type=int, help='이 노드에서 처음 전파하는 블록/거래가 전달될 수 있는 최대 단계(hop) 수')
+    parser.add_argument('--peer-exchange-interval', default=30.0, type=float, help='이웃과 이웃 목록을 교환하고 빈 이웃 자리를 채우는 주기(초). 0이면 끔')
+    parser.add_argument('--difficulty', default=DEFAULT_DIFFICULTY, type=int, help='작업 증명 난이도 (해시 앞자리 16진수 0의 개수)')
+    parser.add_argument('--target', help='작업 증명 목표값을 16진수로 직접 지정 (--difficulty 대신 사용)')
+    parser.add_argument('--mining-workers', default=None, type=int, help='채굴에 사용할 프로세스 수 (기본: CPU 코어 수)')
+    parser.add_argument('--mempool-size', default=10000, type=int, help='대기 거래 목록의 최대 크기 (넘치면 우선순위가 낮은 거래부터 제거)')
+    parser.add_argument('--max-txs-per-block', default=DEFAULT_MAX_TXS_PER_BLOCK, type=int, help='블록 하나에 담을 최대 거래 수')
+    parser.add_argument('--block-version', default=CURRENT_BLOCK_VERSION, type=int, choices=[1, 2, 3], help='새로 만드는 블록의 버전 (1: 예전 merkle_root 형식, 2: 머클 트리, 3: 머클 트리 + 바이너리 헤더 해시)')
+    parser.add_argument('--wire-format', default='binary', choices=['binary', 'json'], help='이웃에게 블록을 보낼 때 쓰는 형식 (예전 노드와 함께 쓰려면 json)')
+    parser.add_argument('--store-format', default='binary', choices=['binary', 'json'], help='블록 로그에 새 블록을 기록하는 형식')
+    parser.add_argument('--block-cache-size', default=DEFAULT_CACHE_SIZE, type=int, help='거래 내역을 메모리에 보관해 두는 최근 블록 수 (나머지는 필요할 때 블록 로그에서 읽음)')
+    parser.add_argument('--no-balance-check', action='store_true', help='잔액 검사 없이 모든 거래를 받음 (이중 지불 검사 끔)')
+    parser.add_argument('--miner-address', help='채굴 보상을 받을 주소 (기본: 실행할 때마다 새로 만드는 노드 ID)')
+    parser.add_argument('--auto-mine', action='store_true', help='대기 거래가 있으면 계속 블록을 채굴하는 연속 채굴 모드로 시작')
+    parser.add_argument('--dashboard', default=DASHBOARD_URL, help='등록할 관제실 주소')
+    parser.add_argument('--profiling', action='store_true', help='/debug/profile/<작업> 으로 채굴, 동기화를 cProfile로 기록할 수 있게 함')
+    parser.add_argument('--snapshot', help='체인이 비어 있을 때 이 스냅샷 파일로 시작 (기본: 로컬 스냅샷, 그다음 이웃의 스냅샷)')
+    parser.add_argument('--snapshot-hash', help='믿을 수 있는 스냅샷 commitment. 지정하면 commitment가 이 값인 스냅샷만 받음')
+    parser.add_argument('--snapshot-interval', default=SNAPSHOT_INTERVAL, type=int, help='상태 스냅샷을 만드는 주기(블록 수). 0이면 만들지 않음')
+    parser.add_argument('--no-fast-sync', action='store_true', help='스냅샷을 쓰지 않고 제네시스부터 모든 블록을 받아 검증 (--full-verify도 마찬가지)')
     args = parser.parse_args()
     port = args.port
     
     app.config['PORT'] = port 
+    blockchain.full_verify = args.full_verify
+    blockchain.mempool.max_size = args.mempool_size
+    blockchain.max_txs_per_block = args.max_txs_per_block
+    blockchain.block_version = args.block_version
+    blockchain.enforce_balances = not args.no_balance_check
+    blockchain.binary_store = args.store_format == 'binary'
+    blockchain.block_cache_size = args.block_cache_size
+    blockchain.snapshot_interval = args.snapshot_interval
+    app.config['WIRE_FORMAT'] = args.wire_format
+    profiler.enabled = args.profiling
+    if args.miner_address:
+        node_identifier = args.miner_address
+    blockchain.set_pow_target(parse_target(args.target) if args.target else difficulty_to_target(args.difficulty), args.mining_workers)
+    atexit.register(blockchain.miner.shutdown)
+    peers = instrument_peers(PeerClient(max_workers=args.gossip_workers, timeout=(1.0, args.peer_timeout), retries=args.peer_retries))
+    relay.peers = peers
+    relay.window = args.tx_relay_window
+    app.config['GOSSIP_TTL'] = args.gossip_ttl
+    blockchain.nodes.max_peers = args.max_peers
+    blockchain.nodes.me = f"127.0.0.1:{port}"
     
     my_url = f"http://127.0.0.1:{port}" 
+    dashboard_url = args.dashboard.rstrip('/')
     
-    blockchain.load_chain_from_json(port) 
+    blockchain.load_chain(port) 
+    blockchain.open_index(port)
+    blockchain.open_state(port)
+    blockchain.open_snapshot(port)
+    atexit.register(blockchain.store.close)
+    atexit.register(blockchain.index.close)
+    atexit.register(blockchain.save_state)
     
     @atexit.register
     def unregister_from_dashboard():
         print(f"[{port}번 노드] 종료 중... 관제실에 등록 해제를 요청합니다.")
         try:
-            requests.post(f"{DASHBOARD_URL}/unregister", json={'port': port}, timeout=1)
+            requests.post(f"{dashboard_url}/unregister", json={'port': port}, timeout=1)
         except requests.exceptions.RequestException:
             pass 
 
     try:
-        print(f"[{port}번 노드] 관제실({DASHBOARD_URL})에 등록을 시도합니다...")
-        response = requests.post(f"{DASHBOARD_URL}/register", json={'port': port}, timeout=2)
+        print(f"[{port}번 노드] 관제실({dashboard_url})에 등록을 시도합니다...")
+        response = requests.post(f"{dashboard_url}/register", json={'port': port}, timeout=2)
         
         if response.status_code == 200:
             peer_list = response.json().get('peers', [])
-            print(f"[{port}번 노드] 관제실 등록 성공. {len(peer_list)}명의 기존 이웃 목록을 받았습니다.")
+            print(f"[{port}번 노드] 관제실 등록 성공. 관제실이 이웃 {len(peer_list)}개를 소개해 주었습니다.")
             for peer_url in peer_list:
                 blockchain.register_node(peer_url)
         else:
             print(f"[{port}번 노드] 관제실 등록 실패. (관제실이 아직 실행되지 않았을 수 있습니다)")
 
     except requests.exceptions.RequestException:
-        print(f"[{port}번 노드] 관제실({DASHBOARD_URL})에 연결할 수 없습니다. 독립 모드로 실행합니다.")
+        print(f"[{port}번 노드] 관제실({dashboard_url})에 연결할 수 없습니다. 독립 모드로 실행합니다.")
+
+    if not (args.no_fast_sync or args.full_verify) and len(blockchain.chain) == 1:
+        # 빈 노드는 스냅샷으로 헤더 체인과 잔액을 받고, 아래 동기화에서는 스냅샷 이후 블록만 받습니다.
+        blockchain.fast_sync(args.snapshot, args.snapshot_hash)
 
     if blockchain.nodes:
         print(f"[{port}번 노드] 서버 시작 전, 네트워크 동기화를 시도합니다...")
@@ -378,5 +1728,19 @@ if __name__ == '__main__':
         else:
             print(f"[{port}번 노드] 동기화 완료: 이미 최신 체인을 가지고 있습니다.")
 
+    if blockchain.history_start:
+        print(f"[{port}번 노드] 스냅샷 이전 블록 {blockchain.history_start - 1}개를 백그라운드에서 받아 검증합니다.")
+        threading.Thread(target=blockchain.backfill_history, name='history-backfill', daemon=True).start()
+
+    peer_exchange = PeerExchange(
+        blockchain.nodes, peers, my_url, interval=args.peer_exchange_interval,
+        on_connect=lambda node: print(f"[{port}번 노드] 이웃 교환으로 새 이웃 {node}와(과) 연결했습니다.")
+    )
+    peer_exchange.start()
+
+    if args.auto_mine:
+        mining_jobs.set_auto(True, lambda: len(blockchain.chain) + 1)
+        print(f"[{port}번 노드] 연속 채굴 모드로 실행합니다.")
+
     print(f"[{port}번 노드] http://127.0.0.1:{port} 에서 서버를 시작합니다.")
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+
+from mempool import transaction_id
+from state import InvalidTransactionError, is_coinbase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    hash TEXT PRIMARY KEY,
+    height INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_height ON blocks (height);
+CREATE TABLE IF NOT EXISTS txs (
+    txid TEXT PRIMARY KEY,
+    height INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS txs_height ON txs (height);
+CREATE TABLE IF NOT EXISTS address_txs (
+    address TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    txid TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS address_txs_lookup ON address_txs (address, height, position);
+CREATE INDEX IF NOT EXISTS address_txs_height ON address_txs (height);
+"""
+
+
+class ChainIndex:
+    """
+    SQLite 파일에 저장되는 체인 조회용 색인.
+    - 거래 ID -> (블록 번호, 블록 내 위치)
+    - 블록 해시 -> 블록 번호
+    - 주소 -> 거래 참조 목록 (보낸/받은 거래)
+    블록이 추가될 때마다 해당 블록만 색인하고, 체인이 교체되면 fork 지점 이후만 지웁니다.
+    거래 ID와 블록 해시는 체인 전체에서 하나뿐이어야 하므로, 이미 색인된 값은 덮어쓰지 않고 거부합니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    def tip(self):
+        """색인된 마지막 블록의 (번호, 해시). 비어 있으면 (0, None)"""
+        with self.lock:
+            row = self.db.execute('SELECT height, hash FROM blocks ORDER BY height DESC LIMIT 1').fetchone()
+        return row if row else (0, None)
+
+    def add_block(self, block, block_hash):
+        """블록 하나를 색인합니다. 이미 색인된 거래 ID나 블록 해시가 있으면 아무것도 바꾸지 않고 InvalidTransactionError."""
+        height = block['index']
+        tx_rows = []
+        address_rows = []
+        for position, tx in enumerate(block['transactions']):
+            txid = transaction_id(tx)
+            tx_rows.append((txid, height, position))
+            sender, recipient = tx.get('sender'), tx.get('recipient')
+            # 채굴 보상 거래의 sender('0')는 주소 색인에 넣지 않습니다.
+            if sender is not None and not is_coinbase(tx):
+                address_rows.append((str(sender), height, position, txid, 'sent'))
+            if recipient is not None:
+                address_rows.append((str(recipient), height, position, txid, 'received'))
+        try:
+            with self.lock, self.db:
+                self.db.execute('INSERT INTO blocks (hash, height) VALUES (?, ?)', (block_hash, height))
+                self.db.executemany('INSERT INTO txs (txid, height, position) VALUES (?, ?, ?)', tx_rows)
+                self.db.executemany('INSERT INTO address_txs (address, height, position, txid, role) VALUES (?, ?, ?, ?, ?)', address_rows)
+        except sqlite3.IntegrityError as e:
+            raise InvalidTransactionError(f"블록 #{height}: 이미 체인에 있는 거래 또는 블록입니다. ({e})") from e
+
+    def rollback_to(self, length):
+        """블록 번호가 length보다 큰 블록의 색인을 모두 지웁니다."""
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM blocks WHERE height > ?', (length,))
+            self.db.execute('DELETE FROM txs WHERE height > ?', (length,))
+            self.db.execute('DELETE FROM address_txs WHERE height > ?', (length,))
+
+    def sync(self, chain, hash_fn):
+        """
+        노드 시작 시 색인을 체인에 맞춥니다. 색인의 마지막 블록이 체인에 그대로 있으면
+        그 뒤의 블록만 색인하고, 그렇지 않으면 처음부터 다시 만듭니다. 새로 색인한 블록 수를 반환합니다.
+        """
+        height, tip_hash = self.tip()
+        if not (0 < height <= len(chain) and hash_fn(chain[height - 1]) == tip_hash):
+            height = 0
+        self.rollback_to(height)
+        for block in chain[height:]:
+            self.add_block(block, hash_fn(block))
+        return len(chain) - height
+
+    def block_height(self, block_hash):
+        with self.lock:
+            row = self.db.execute('SELECT height FROM blocks WHERE hash = ?', (block_hash,)).fetchone()
+        return row[0] if row else None
+
+    def transaction_location(self, txid):
+        """거래가 담긴 (블록 번호, 블록 내 위치). 없으면 None"""
+        with self.lock:
+            return self.db.execute('SELECT height, position FROM txs WHERE txid = ?', (txid,)).fetchone()
+
+    def confirmed(self, txids, max_height):
+        """txids 중 블록 번호 max_height 이하의 블록에 담긴 거래 ID의 집합"""
+        txids = list(txids)
+        found = set()
+        with self.lock:
+            # SQLite 쿼리 변수 개수 제한(999)을 넘지 않도록 나누어 조회합니다.
+            for start in range(0, len(txids), 500):
+                chunk = txids[start:start + 500]
+                rows = self.db.execute(
+                    f"SELECT txid FROM txs WHERE height <= ? AND txid IN ({','.join('?' * len(chunk))})",
+                    (max_height, *chunk)
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def address_history(self, address, offset=0, limit=50):
+        """주소의 거래 참조를 최신 블록부터 offset/limit으로 잘라 반환합니다. (전체 개수 포함)"""
+        with self.lock:
+            total = self.db.execute('SELECT COUNT(*) FROM address_txs WHERE address = ?', (address,)).fetchone()[0]
+            rows = self.db.execute(
+                'SELECT height, position, txid, role FROM address_txs WHERE address = ? '
+                'ORDER BY height DESC, position DESC LIMIT ? OFFSET ?',
+                (address, limit, offset)
+            ).fetchall()
+        return total, [{'block_index': h, 'position': p, 'txid': t, 'role': r} for h, p, t, r in rows]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
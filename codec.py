@@ -0,0 +1,294 @@
+"""
+블록/거래의 간결한 바이너리 인코딩.
+
+- 버전 3 이상 블록의 헤더는 고정 길이(90바이트) 바이트열로 인코딩하고, 블록 해시는 이 바이트열의 sha256입니다.
+  (dict를 JSON으로 다시 직렬화하지 않고 해시를 계산)
+- 거래 목록 등 나머지 값은 태그 + 길이 접두어 방식(msgpack과 비슷한)으로 인코딩합니다.
+  정수와 길이는 가변 길이(varint)로, 거래는 키 이름 없이 필드 순서대로 기록합니다.
+  dict는 키를 정렬해 기록하므로 같은 값은 항상 같은 바이트열이 됩니다.
+- 인코딩된 블록의 첫 바이트는 MAGIC_* 값이므로, '{'로 시작하는 JSON과 구별할 수 있습니다.
+"""
+import hashlib
+import struct
+
+from merkle import BINARY_HEADER_VERSION, block_version
+
+# HTTP Content-Type
+CONTENT_TYPE = 'application/x-block'              # 블록 하나
+BATCH_CONTENT_TYPE = 'application/x-block-batch'  # 블록 여러 개 (동기화용)
+
+MAGIC_HEADER = b'\xb3'  # 고정 길이 헤더 + 거래 목록 (버전 3 이상 블록)
+MAGIC_VALUE = b'\xb0'   # 블록 dict 전체를 태그 방식으로 인코딩 (예전 버전 블록)
+
+# (version, index, timestamp, proof, previous_hash, merkle_root)
+HEADER = struct.Struct('>HQdQ32s32s')
+HEADER_FIELDS = ('index', 'timestamp', 'transactions', 'proof', 'previous_hash', 'merkle_root', 'version')
+
+LENGTH = struct.Struct('>I')
+FLOAT64 = struct.Struct('>d')
+
+# 거래 dict의 키가 모두 이 안에 있으면 키 이름 없이 [태그 'x' + 어떤 필드가 있는지 나타내는 비트 1바이트 + 값들]로 기록합니다.
+TX_FIELDS = ('sender', 'recipient', 'amount', 'time', 'fee')
+TX_FIELD_SET = frozenset(TX_FIELDS)
+# 그 밖의 dict에서 자주 쓰는 키는 문자열 대신 번호 1바이트로 기록합니다. (순서를 바꾸면 호환이 깨짐)
+KNOWN_KEYS = ('index', 'timestamp', 'transactions', 'proof', 'previous_hash', 'merkle_root', 'version') + TX_FIELDS
+KNOWN_KEY_IDS = {key: i for i, key in enumerate(KNOWN_KEYS)}
+
+
+class CodecError(ValueError):
+    pass
+
+
+def header_bytes(block):
+    """버전 3 이상 블록 헤더의 정규 바이트열. 필드가 고정 길이 형식에 맞지 않으면 CodecError."""
+    try:
+        fields = (block['version'], block['index'], block['timestamp'], block['proof'], block['previous_hash'], block['merkle_root'])
+    except KeyError as e:
+        raise CodecError(f"블록 헤더를 인코딩할 수 없습니다: {e}") from e
+    return pack_header(*fields)
+
+
+def pack_header(version, index, timestamp, proof, previous_hash, merkle_root):
+    try:
+        return HEADER.pack(version, index, timestamp, proof, bytes.fromhex(previous_hash), bytes.fromhex(merkle_root))
+    except (TypeError, ValueError, struct.error) as e:
+        raise CodecError(f"블록 헤더를 인코딩할 수 없습니다: {e}") from e
+
+
+def header_hash(block):
+    return hashlib.sha256(header_bytes(block)).hexdigest()
+
+
+def pack_varint(n):
+    """음이 아닌 정수를 7비트씩 나누어 기록합니다. (127 이하는 1바이트)"""
+    if n < 0x80:
+        return bytes((n,))
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def read_varint(data, pos):
+    byte = data[pos]
+    pos += 1
+    if byte < 0x80:
+        return byte, pos
+    result = byte & 0x7f
+    shift = 7
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_value(value, out):
+    """값 하나를 out(bytearray) 끝에 인코딩합니다."""
+    kind = type(value)
+    if kind is str:
+        raw = value.encode('utf-8')
+        out += b's' + pack_varint(len(raw)) + raw
+    elif kind is int:
+        # 지그재그 인코딩: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ... (작은 음수도 짧게)
+        out += b'i' + pack_varint(value * 2 if value >= 0 else -value * 2 - 1)
+    elif kind is float:
+        out += b'd' + FLOAT64.pack(value)
+    elif value is None:
+        out += b'N'
+    elif value is True:
+        out += b'T'
+    elif value is False:
+        out += b'F'
+    elif isinstance(value, dict):
+        if value.keys() <= TX_FIELD_SET:
+            mask = 0
+            for bit, field in enumerate(TX_FIELDS):
+                if field in value:
+                    mask |= 1 << bit
+            out += b'x' + bytes((mask,))
+            for field in TX_FIELDS:
+                if field in value:
+                    encode_value(value[field], out)
+            return out
+        out += b'm' + pack_varint(len(value))
+        for key in sorted(value):
+            if not isinstance(key, str):
+                raise CodecError(f"dict 키는 문자열이어야 합니다: {key!r}")
+            key_id = KNOWN_KEY_IDS.get(key)
+            if key_id is None:
+                encode_value(key, out)
+            else:
+                out += b'k' + bytes((key_id,))
+            encode_value(value[key], out)
+    elif isinstance(value, (list, tuple)):
+        out += b'l' + pack_varint(len(value))
+        for item in value:
+            encode_value(item, out)
+    elif isinstance(value, int):
+        encode_value(int(value), out)
+    elif isinstance(value, float):
+        encode_value(float(value), out)
+    elif isinstance(value, str):
+        encode_value(str(value), out)
+    else:
+        raise CodecError(f"인코딩할 수 없는 값입니다: {type(value).__name__}")
+    return out
+
+
+def decode_value(data, pos=0):
+    """data[pos]부터 값 하나를 읽어 (값, 다음 위치)를 반환합니다."""
+    tag = data[pos]
+    pos += 1
+    if tag == 0x73:  # 's'
+        length, pos = read_varint(data, pos)
+        end = pos + length
+        if end > len(data):
+            raise CodecError('데이터가 중간에 끝났습니다.')
+        return data[pos:end].decode('utf-8'), end
+    if tag == 0x69:  # 'i'
+        value, pos = read_varint(data, pos)
+        return (value >> 1 if not value & 1 else -((value + 1) >> 1)), pos
+    if tag == 0x64:  # 'd'
+        return FLOAT64.unpack_from(data, pos)[0], pos + FLOAT64.size
+    if tag == 0x78:  # 'x'
+        mask = data[pos]
+        pos += 1
+        tx = {}
+        for bit, field in enumerate(TX_FIELDS):
+            if mask & (1 << bit):
+                tx[field], pos = decode_value(data, pos)
+        return tx, pos
+    if tag == 0x6d:  # 'm'
+        count, pos = read_varint(data, pos)
+        mapping = {}
+        for _ in range(count):
+            if data[pos] == 0x6b:  # 'k'
+                key = KNOWN_KEYS[data[pos + 1]]
+                pos += 2
+            else:
+                key, pos = decode_value(data, pos)
+            mapping[key], pos = decode_value(data, pos)
+        return mapping, pos
+    if tag == 0x6c:  # 'l'
+        count, pos = read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = decode_value(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == 0x4e:  # 'N'
+        return None, pos
+    if tag == 0x54:  # 'T'
+        return True, pos
+    if tag == 0x46:  # 'F'
+        return False, pos
+    raise CodecError(f"알 수 없는 태그입니다: {tag:#x}")
+
+
+def encode_block(block):
+    """
+    블록을 바이트열로 인코딩합니다. 버전 3 이상이면서 표준 필드만 가진 블록은 고정 길이 헤더를 쓰고,
+    그 밖의 블록(예전 버전, 추가 필드가 있는 블록)은 dict 전체를 태그 방식으로 인코딩합니다.
+    """
+    if block_version(block) >= BINARY_HEADER_VERSION and tuple(sorted(block)) == tuple(sorted(HEADER_FIELDS)):
+        try:
+            out = bytearray(MAGIC_HEADER + header_bytes(block))
+        except CodecError:
+            pass
+        else:
+            return bytes(encode_value(block['transactions'], out))
+    return bytes(encode_value(dict(block), bytearray(MAGIC_VALUE)))
+
+
+def decode_block(data):
+    """encode_block으로 만든 바이트열을 블록 dict로 되돌립니다. 형식이 맞지 않으면 CodecError."""
+    data = bytes(data)
+    try:
+        block, end = _decode_block(data)
+    except (struct.error, UnicodeDecodeError, IndexError, TypeError) as e:
+        raise CodecError(f"블록을 디코딩할 수 없습니다: {e}") from e
+    if end != len(data):
+        raise CodecError('블록 뒤에 알 수 없는 데이터가 있습니다.')
+    return block
+
+
+def _decode_block(data, pos=0):
+    magic = data[pos:pos + 1]
+    pos += 1
+    if magic == MAGIC_VALUE:
+        block, pos = decode_value(data, pos)
+        if not isinstance(block, dict):
+            raise CodecError('블록은 dict여야 합니다.')
+        return block, pos
+    if magic != MAGIC_HEADER:
+        raise CodecError(f"바이너리 블록이 아닙니다: {magic!r}")
+    version, index, timestamp, proof, previous_hash, merkle_root = HEADER.unpack_from(data, pos)
+    transactions, pos = decode_value(data, pos + HEADER.size)
+    block = {
+        'index': index,
+        'timestamp': timestamp,
+        'transactions': transactions,
+        'proof': proof,
+        'previous_hash': previous_hash.hex(),
+        'merkle_root': merkle_root.hex(),
+        'version': version
+    }
+    return block, pos
+
+
+def decode_header(data):
+    """
+    블록 바이트열에서 거래 내역을 뺀 헤더 dict만 읽습니다. 고정 길이 헤더 블록은 거래 목록을 디코딩하지 않고,
+    그 밖의 블록은 전체를 디코딩한 뒤 거래 내역을 버립니다. 형식이 맞지 않으면 CodecError.
+    """
+    if data[:1] != MAGIC_HEADER:
+        block = decode_block(data)
+        block.pop('transactions', None)
+        return block
+    try:
+        version, index, timestamp, proof, previous_hash, merkle_root = HEADER.unpack_from(data, 1)
+    except struct.error as e:
+        raise CodecError(f"블록 헤더를 디코딩할 수 없습니다: {e}") from e
+    return {
+        'index': index,
+        'timestamp': timestamp,
+        'proof': proof,
+        'previous_hash': previous_hash.hex(),
+        'merkle_root': merkle_root.hex(),
+        'version': version
+    }
+
+
+def encode_blocks(blocks):
+    """블록 여러 개: [개수] + ([길이] + 블록)..."""
+    out = bytearray(LENGTH.pack(len(blocks)))
+    for block in blocks:
+        encoded = encode_block(block)
+        out += LENGTH.pack(len(encoded)) + encoded
+    return bytes(out)
+
+
+def decode_blocks(data):
+    try:
+        view = memoryview(data)
+        count = LENGTH.unpack_from(view, 0)[0]
+        pos = LENGTH.size
+        blocks = []
+        for _ in range(count):
+            length = LENGTH.unpack_from(view, pos)[0]
+            pos += LENGTH.size
+            blocks.append(decode_block(view[pos:pos + length]))
+            pos += length
+    except struct.error as e:
+        raise CodecError(f"블록 목록을 디코딩할 수 없습니다: {e}") from e
+    return blocks
+
+
+def is_binary(payload):
+    """payload가 바이너리로 인코딩된 블록인지 (JSON이면 '{'로 시작)"""
+    return payload[:1] in (MAGIC_HEADER, MAGIC_VALUE)
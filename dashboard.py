@@ -1,68 +1,71 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
 import requests
 import json
+from argparse import ArgumentParser
 from time import time
 
+from node_monitor import NodeMonitor
+from topology import TOPOLOGIES, order_candidates
+
 app = Flask(__name__)
 # 보안상의 이유로 SECRET_KEY가 필요합니다.
 app.config['SECRET_KEY'] = 'your-very-secret-key' 
+# 새 노드를 기존 노드 몇 개에게, 어떤 방식으로 소개할지 (topology.py 참고)
+app.config['TOPOLOGY'] = 'random'
+app.config['PEERS_PER_NODE'] = 4
+
+# 👈 [핵심] 하드코딩된 리스트 대신, 동적으로 관리되는 노드 목록 사용
+# 'http://127.0.0.1:5000' 와 같은 노드 주소와 마지막으로 수집한 상태가 저장됩니다.
+# 백그라운드 수집기가 모든 노드의 상태를 동시에 모아 두므로, 페이지는 노드에게 직접 요청하지 않습니다.
+monitor = NodeMonitor()
 
-# 👈 [핵심] 하드코딩된 리스트 대신, 동적으로 관리되는 집합(Set) 사용
-# 이 집합에 'http://127.0.0.1:5000' 와 같은 노드 주소가 저장됩니다.
-known_nodes = set()
+@app.before_request
+def start_monitor():
+    # 디버그 모드의 리로더가 프로세스를 두 번 띄우므로, 실제로 요청을 받는 프로세스에서만 수집을 시작합니다.
+    monitor.start()
 
 @app.route('/')
 def index():
     """
     메인 대시보드 페이지.
-    'known_nodes' 목록을 기준으로 모든 노드의 상태를 취합하여 템플릿에 전달합니다.
+    수집기가 캐시해 둔 노드 상태로 바로 그립니다. (이후 변경 사항은 /events 로 실시간 반영)
     """
-    node_states = []
-    offline_nodes = set() # 응답 없는 노드를 찾기 위함
-
-    # 집합을 순회하는 동안 변경할 수 없으므로, 리스트로 복사해서 사용합니다.
-    for node_url in list(known_nodes):
-        state = {
-            'url': node_url,
-            'online': False,
-            'chain_length': 0,
-            'pending_tx_count': 0
-        }
-        try:
-            # 1. 체인 정보 요청
-            response_chain = requests.get(f"{node_url}/chain", timeout=0.5)
-            if response_chain.status_code == 200:
-                state['online'] = True
-                state['chain_length'] = response_chain.json().get('length', 0)
-            
-            # 2. 대기 중인 거래 정보 요청
-            response_pending = requests.get(f"{node_url}/transactions/pending", timeout=0.5)
-            if response_pending.status_code == 200:
-                state['pending_tx_count'] = len(response_pending.json().get('transactions', []))
+    return render_template('dashboard.html', nodes=monitor.snapshot())
 
-        except requests.exceptions.RequestException:
-            state['online'] = False
-            offline_nodes.add(node_url) # 응답 없는 노드를 목록에 추가
-            
-        node_states.append(state)
-        
-    # 응답 없는 노드를 'known_nodes' 목록에서 제거 (자동 복구)
-    if offline_nodes:
-        print(f"관제실: 응답 없음: {offline_nodes} 노드를 목록에서 제거합니다.")
-        known_nodes.difference_update(offline_nodes)
-        
-    return render_template('dashboard.html', nodes=node_states)
+@app.route('/nodes/status')
+def nodes_status():
+    """캐시된 노드 상태 목록 (JSON)"""
+    return jsonify({'nodes': monitor.snapshot(), 'version': monitor.version})
+
+@app.route('/events')
+def events():
+    """
+    노드 상태가 바뀔 때마다 전체 상태 목록을 보내는 Server-Sent Events 피드.
+    바뀐 것이 없으면 15초마다 연결 유지용 주석만 보냅니다.
+    """
+    def generate():
+        version = None
+        while True:
+            current = monitor.wait_for_change(version, timeout=15)
+            if current == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+            yield f"data: {json.dumps({'nodes': monitor.snapshot()})}\n\n"
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 @app.route('/mine/<port>')
 def mine_on_node(port):
     """
     특정 노드에게 채굴 명령을 내리고 결과를 플래시 메시지로 표시합니다.
+    (노드는 백그라운드에서 채굴하므로, 작업이 시작되었는지만 확인합니다.)
     """
     node_url = f"http://127.0.0.1:{port}"
     try:
-        response = requests.get(f"{node_url}/mine")
-        if response.status_code == 200:
-            flash(f"🎉 {port}번 노드 채굴 성공! (블록 전파됨)", "success")
+        response = requests.post(f"{node_url}/mine", timeout=2)
+        if response.status_code == 202:
+            job_id = response.json().get('job_id', '')
+            flash(f"⛏️ {port}번 노드 채굴 시작! (작업 {job_id[:8]}, 완료되면 블록이 전파됩니다)", "success")
         else:
             flash(f"❌ {port}번 노드 채굴 실패. (서버 오류)", "danger")
     except requests.exceptions.RequestException:
@@ -92,8 +95,8 @@ def resolve_on_node(port):
 @app.route('/add_transaction', methods=['POST'])
 def add_transaction():
     """
-    새로운 거래를 'known_nodes' 목록에 있는 모든 노드에게 전파합니다.
-    (노드들이 다시 이웃에게 전파하므로, 모든 노드가 받게 됩니다.)
+    새로운 거래를 온라인 노드 하나에게 보냅니다. (그 노드가 이웃에게 모아서 전파하므로, 모든 노드가 받게 됩니다.)
+    보내지 못하면 다음 노드에게 보냅니다.
     """
     sender = request.form['sender']
     recipient = request.form['recipient']
@@ -110,21 +113,20 @@ def add_transaction():
         'time': time() # 고유성을 위한 타임스탬프
     }
 
-    success_count = 0
-    # 모든 노드에게 이 거래를 전파
-    for node_url in list(known_nodes):
+    # 온라인으로 확인된 노드부터 시도합니다.
+    nodes = sorted(monitor.snapshot(), key=lambda state: not state['online'])
+    for state in nodes:
         try:
-            # 이웃에게 거래를 POST하면, 그 이웃이 다시 자신의 이웃에게 전파합니다. (Gossip)
-            requests.post(f"{node_url}/transactions/new", json=transaction, timeout=0.5)
-            success_count += 1
+            response = requests.post(f"{state['url']}/transactions/new", json=transaction, timeout=0.5)
         except requests.exceptions.RequestException:
-            pass 
-
-    if success_count > 0:
-        flash(f"✅ 거래가 {success_count}개의 노드에 전송되었습니다. (Gossip 시작)", "success")
-    else:
-        flash("❌ 어떤 노드에도 거래를 전송하지 못했습니다. (모든 노드 오프라인?)", "danger")
+            continue
+        if response.status_code in (200, 201):
+            flash(f"✅ 거래가 {state['url']} 노드에 전송되었습니다. (Gossip 시작)", "success")
+        else:
+            flash(f"❌ {state['url']} 노드가 거래를 거부했습니다: {response.text}", "danger")
+        return redirect(url_for('index'))
 
+    flash("❌ 어떤 노드에도 거래를 전송하지 못했습니다. (모든 노드 오프라인?)", "danger")
     return redirect(url_for('index'))
 
 # --- 노드 등록 및 해제 API ---
@@ -133,9 +135,9 @@ def add_transaction():
 def register_new_node():
     """
     새로운 노드가 실행될 때 호출하는 API. (노드가 관제실에 스스로를 등록)
-    1. 기존 노드들에게 새 노드를 소개(add_peer)합니다.
-    2. 새 노드를 'known_nodes'에 추가합니다.
-    3. 새 노드에게 기존 노드 목록을 반환합니다.
+    1. 토폴로지에 따라 고른 기존 노드들에게 새 노드를 소개(add_peer)합니다. (full이면 모든 노드, 아니면 PEERS_PER_NODE개)
+    2. 새 노드를 노드 목록(수집 대상)에 추가합니다.
+    3. 새 노드에게 소개를 받아 준(이웃 자리가 남아 있던) 노드 목록을 반환합니다.
     """
     values = request.get_json()
     port = values.get('port')
@@ -144,20 +146,28 @@ def register_new_node():
     
     new_node_url = f"http://127.0.0.1:{port}"
     
-    # 2. 기존 노드들에게 새 노드를 소개 (5000번에게 5001번을 이웃으로 등록 요청)
-    existing_peers = list(known_nodes) 
-    for peer_url in existing_peers:
+    # 1. 기존 노드들에게 새 노드를 소개 (5000번에게 5001번을 이웃으로 등록 요청)
+    existing_peers = [url for url in monitor.urls() if url != new_node_url]
+    topology = app.config['TOPOLOGY']
+    count = len(existing_peers) if topology == 'full' else app.config['PEERS_PER_NODE']
+    introduced = []
+    for peer_url in order_candidates(existing_peers, topology, count):
+        if len(introduced) >= count:
+            break
         try:
-            requests.post(f"{peer_url}/add_peer", json={'peer_url': new_node_url}, timeout=0.5)
+            response = requests.post(f"{peer_url}/add_peer", json={'peer_url': new_node_url}, timeout=0.5)
         except requests.exceptions.RequestException:
-            pass 
-
-    # 1. 새 노드를 목록에 추가
-    known_nodes.add(new_node_url)
-    print(f"관제실: 새 노드 {new_node_url} 등록 완료. 현재 총 {len(known_nodes)}개 노드.")
+            continue
+        # 이웃이 가득 찬 노드는 200으로 거절하므로 다음 후보에게 소개합니다.
+        if response.status_code == 201:
+            introduced.append(peer_url)
+
+    # 2. 새 노드를 목록에 추가
+    monitor.add(new_node_url)
+    print(f"관제실: 새 노드 {new_node_url} 등록 완료. 현재 총 {len(existing_peers) + 1}개 노드, 이웃 {len(introduced)}개 소개 ({topology}).")
     
-    # 3. 새 노드에게 기존 이웃 목록 반환
-    return jsonify({'peers': existing_peers})
+    # 3. 새 노드에게 이웃 목록 반환
+    return jsonify({'peers': introduced})
 
 @app.route('/unregister', methods=['POST'])
 def unregister_node():
@@ -170,11 +180,26 @@ def unregister_node():
         return "오류: 'port' 값이 누락되었습니다.", 400
         
     node_url = f"http://127.0.0.1:{port}"
-    known_nodes.discard(node_url) 
-    print(f"관제실: {node_url} 노드 등록 해제. 현재 총 {len(known_nodes)}개 노드.")
+    monitor.discard(node_url)
+    print(f"관제실: {node_url} 노드 등록 해제. 현재 총 {len(monitor.urls())}개 노드.")
     
     return "등록 해제 완료", 200
 
 if __name__ == '__main__':
-    print("관제실 서버를 http://127.0.0.1:8000 에서 시작합니다...")
-    app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
+    parser = ArgumentParser()
+    parser.add_argument('--poll-interval', default=1.0, type=float, help='노드 상태 수집 주기 (초)')
+    parser.add_argument('--status-ttl', default=5.0, type=float, help='이 시간(초) 동안 응답이 없으면 오프라인으로 표시')
+    parser.add_argument('--max-failures', default=3, type=int, help='연속으로 이만큼 응답이 없으면 노드를 목록에서 제거')
+    parser.add_argument('-p', '--port', default=8000, type=int, help='관제실 서버 포트 번호')
+    parser.add_argument('--no-debug', action='store_true', help='Flask 디버그 모드(자동 재시작) 없이 실행 (시뮬레이터 등에서 사용)')
+    parser.add_argument('--topology', default='random', choices=TOPOLOGIES, help='새 노드를 기존 노드에게 소개하는 방식 (full: 모든 노드와 연결, 예전 동작)')
+    parser.add_argument('--peers-per-node', default=4, type=int, help='full이 아닐 때 새 노드에게 소개할 기존 노드 수')
+    args = parser.parse_args()
+    app.config['TOPOLOGY'] = args.topology
+    app.config['PEERS_PER_NODE'] = args.peers_per_node
+    monitor.interval = args.poll_interval
+    monitor.ttl = args.status_ttl
+    monitor.max_failures = args.max_failures
+
+    print(f"관제실 서버를 http://127.0.0.1:{args.port} 에서 시작합니다...")
+    app.run(host='0.0.0.0', port=args.port, debug=not args.no_debug)
\ No newline at end of file
@@ -0,0 +1,165 @@
+import hashlib
+import heapq
+import json
+import threading
+from itertools import count
+
+from state import InvalidTransactionError, is_coinbase, is_finite_number, transaction_amount, transaction_cost, transaction_fee
+
+
+def transaction_id(transaction):
+    """거래의 정규화된 JSON(키 정렬)에 대한 sha256 해시. 전파용 'propagated' 표시는 제외합니다."""
+    if 'propagated' in transaction:
+        transaction = {k: v for k, v in transaction.items() if k != 'propagated'}
+    return hashlib.sha256(json.dumps(transaction, sort_keys=True).encode()).hexdigest()
+
+
+def priority(transaction):
+    """블록에 먼저 담을 순서: 수수료(fee)가 높은 거래 -> 먼저 생성된(time) 거래"""
+    return (-transaction.get('fee', 0), transaction.get('time', 0))
+
+
+def check_transaction_fields(transaction):
+    """
+    대기 목록에 넣을 수 있는 거래인지 값의 형식만 확인합니다. (잔액은 AccountState.check_transaction)
+    금액, 시간(time), 수수료(fee)는 유한한 숫자여야 합니다. time과 fee는 우선순위 계산에 쓰이므로,
+    숫자가 아니면 정렬할 때 TypeError가 납니다. 맞지 않으면 InvalidTransactionError.
+    """
+    if transaction_amount(transaction) is None:
+        raise InvalidTransactionError(f"거래 금액이 올바르지 않습니다: {transaction.get('amount')!r}")
+    if not is_finite_number(transaction.get('time', 0)):
+        raise InvalidTransactionError(f"거래 시간(time)이 올바르지 않습니다: {transaction.get('time')!r}")
+    if transaction_fee(transaction) is None:
+        raise InvalidTransactionError(f"거래 수수료가 올바르지 않습니다: {transaction.get('fee')!r}")
+
+
+class MempoolFullError(ValueError):
+    pass
+
+
+class Mempool:
+    """
+    거래 ID(해시)를 키로 하는 대기 거래 저장소.
+    삽입/조회/삭제는 dict 연산 한 번(O(1))이며, 최대 크기를 넘으면 우선순위가 가장 낮은
+    거래(수수료가 가장 낮고 가장 늦게 들어온 거래)를 내보냅니다.
+    변경은 self.lock 안에서만 하고, 조회용 목록(snapshot)은 변경될 때만 다시 만들므로
+    대기 거래 조회는 잠금 없이 이루어집니다.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.transactions = {}   # txid -> 거래 (도착 순서 유지)
+        self._eviction_heap = []  # (fee, -time, 순번, txid): 가장 먼저 내보낼 거래가 맨 앞
+        self._sequence = count()
+        self.pending_spent = {}   # 송신자 -> 대기 중인 거래로 보내기로 한 금액 합계 (수수료 포함)
+        self.lock = threading.RLock()
+        self._snapshot = ()       # 대기 거래 목록의 읽기 전용 사본 (None이면 다시 만들어야 함)
+
+    def add(self, transaction):
+        """
+        거래를 추가하고 거래 ID를 반환합니다. 이미 있는 거래면 None을 반환합니다.
+        값의 형식이 맞지 않으면 InvalidTransactionError(check_transaction_fields),
+        가득 찬 상태에서 새 거래의 우선순위가 가장 낮다면 MempoolFullError를 던집니다.
+        """
+        check_transaction_fields(transaction)
+        tx = transaction.copy()
+        tx.pop('propagated', None)
+        txid = transaction_id(tx)
+        eviction_key = (tx.get('fee', 0), -tx.get('time', 0))
+        with self.lock:
+            if txid in self.transactions:
+                return None
+            if len(self.transactions) >= self.max_size:
+                lowest = self._peek_lowest()
+                if lowest is not None and eviction_key <= lowest[:2]:
+                    raise MempoolFullError('대기 거래 목록이 가득 찼습니다.')
+                self.remove(lowest[3])
+            self.transactions[txid] = tx
+            self._track_spend(tx, 1)
+            heapq.heappush(self._eviction_heap, (*eviction_key, next(self._sequence), txid))
+            self._snapshot = None
+        return txid
+
+    def get(self, txid):
+        return self.transactions.get(txid)
+
+    def remove(self, txid):
+        """거래를 ID로 삭제합니다. 힙에 남은 항목은 꺼낼 때 무시합니다. (지연 삭제)"""
+        with self.lock:
+            tx = self.transactions.pop(txid, None)
+            if tx is not None:
+                self._track_spend(tx, -1)
+                self._snapshot = None
+        return tx
+
+    def remove_transactions(self, transactions):
+        """블록에 포함된 거래들을 대기 목록에서 삭제합니다."""
+        txids = [transaction_id(tx) for tx in transactions]
+        with self.lock:
+            for txid in txids:
+                self.remove(txid)
+            self._compact()
+
+    def spent_by(self, sender):
+        """sender가 대기 중인 거래로 이미 보내기로 한 금액 (수수료 포함)"""
+        return self.pending_spent.get(str(sender), 0)
+
+    def select(self, limit=None):
+        """블록에 담을 거래를 우선순위 순으로 최대 limit개 고릅니다. (목록에서 삭제하지는 않음)"""
+        with self.lock:
+            return [tx for _, tx in self._select_items(limit)]
+
+    def pop_for_block(self, limit=None):
+        """select와 같지만, 고른 거래를 대기 목록에서 삭제합니다."""
+        with self.lock:
+            selected = self._select_items(limit)
+            for txid, _ in selected:
+                self.remove(txid)
+            self._compact()
+        return [tx for _, tx in selected]
+
+    def snapshot(self):
+        """대기 중인 거래의 읽기 전용 목록 (도착 순서). 마지막 변경 이후 처음 호출될 때만 새로 만듭니다."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self.lock:
+                if self._snapshot is None:
+                    self._snapshot = tuple(self.transactions.values())
+                snapshot = self._snapshot
+        return snapshot
+
+    def _select_items(self, limit):
+        key = lambda item: priority(item[1])
+        if limit is None or limit >= len(self.transactions):
+            return sorted(self.transactions.items(), key=key)
+        return heapq.nsmallest(limit, self.transactions.items(), key=key)
+
+    def _track_spend(self, tx, sign):
+        if transaction_amount(tx) is None or is_coinbase(tx):
+            return
+        sender = str(tx.get('sender'))
+        spent = self.pending_spent.get(sender, 0) + sign * transaction_cost(tx)
+        if spent:
+            self.pending_spent[sender] = spent
+        else:
+            self.pending_spent.pop(sender, None)
+
+    def _peek_lowest(self):
+        while self._eviction_heap and self._eviction_heap[0][3] not in self.transactions:
+            heapq.heappop(self._eviction_heap)
+        return self._eviction_heap[0] if self._eviction_heap else None
+
+    def _compact(self):
+        # 지연 삭제된 항목이 너무 많이 쌓이면 힙을 다시 만듭니다.
+        if len(self._eviction_heap) > 2 * len(self.transactions) + 64:
+            self._eviction_heap = [entry for entry in self._eviction_heap if entry[3] in self.transactions]
+            heapq.heapify(self._eviction_heap)
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __contains__(self, txid):
+        return txid in self.transactions
+
+    def __iter__(self):
+        return iter(self.snapshot())
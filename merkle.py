@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from mempool import transaction_id
+
+# 블록 버전별 merkle_root 계산 방식
+LEGACY_VERSION = 1   # sha256(json.dumps(거래 목록 전체))
+MERKLE_VERSION = 2   # 거래 ID(해시)들로 만든 이진 머클 트리의 루트
+BINARY_HEADER_VERSION = 3   # 머클 트리 + 블록 해시를 고정 길이 헤더 바이트열로 계산 (codec.header_bytes)
+CURRENT_BLOCK_VERSION = BINARY_HEADER_VERSION
+
+EMPTY_ROOT = hashlib.sha256(b'').hexdigest()
+# 내부 노드 해시 앞에 붙이는 구분자 (거래 ID와 내부 노드 해시가 섞이지 않도록)
+NODE_PREFIX = b'\x01'
+
+
+def block_version(block):
+    return block.get('version', LEGACY_VERSION)
+
+
+def legacy_root(transactions):
+    return hashlib.sha256(json.dumps(transactions, sort_keys=True).encode()).hexdigest()
+
+
+def hash_pair(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """
+    거래 ID를 잎(leaf)으로 하는 이진 머클 트리. 모든 층(level)을 보관하므로
+    한 번 만들고 나면 포함 증명(inclusion proof)을 O(log n)에 만들 수 있습니다.
+    층의 노드 수가 홀수면 마지막 노드를 복제해 짝을 맞춥니다. 그래서 [a, b, c]와 [a, b, c, c]의 루트가 같으므로
+    (CVE-2012-2459와 같은 블록 변조) 블록을 검증할 때는 거래 ID가 중복된 목록(has_duplicates)을 거부해야 합니다.
+    """
+
+    def __init__(self, txids):
+        self.txids = list(txids)
+        self.positions = {txid: i for i, txid in enumerate(self.txids)}
+        level = [bytes.fromhex(txid) for txid in self.txids]
+        self.levels = [level]
+        while len(level) > 1:
+            if len(level) % 2:
+                level = level + [level[-1]]
+            level = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+            self.levels.append(level)
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        return cls(transaction_id(tx) for tx in transactions)
+
+    @property
+    def has_duplicates(self):
+        return len(self.positions) != len(self.txids)
+
+    @property
+    def root(self):
+        if not self.txids:
+            return EMPTY_ROOT
+        return self.levels[-1][0].hex()
+
+    def proof(self, txid):
+        """
+        txid의 포함 증명을 반환합니다. 잎에서 루트까지 올라가며 짝이 되는 노드의 해시와
+        그 노드가 왼쪽/오른쪽 중 어디에 있는지를 담은 목록입니다. txid가 없으면 None.
+        """
+        position = self.positions.get(txid)
+        if position is None:
+            return None
+        path = []
+        for level in self.levels[:-1]:
+            sibling = position ^ 1
+            if sibling >= len(level):
+                sibling = position  # 홀수 개라 자기 자신이 복제된 경우
+            path.append({'hash': level[sibling].hex(), 'position': 'left' if sibling < position else 'right'})
+            position //= 2
+        return path
+
+
+def verify_proof(txid, proof, merkle_root):
+    """포함 증명을 따라 루트를 다시 계산해 merkle_root와 같은지 확인합니다. (라이트 클라이언트용)"""
+    current = bytes.fromhex(txid)
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        if step['position'] == 'left':
+            current = hash_pair(sibling, current)
+        else:
+            current = hash_pair(current, sibling)
+    return current.hex() == merkle_root
+
+
+def compute_merkle_root(transactions, version=CURRENT_BLOCK_VERSION):
+    if version >= MERKLE_VERSION:
+        return MerkleTree.from_transactions(transactions).root
+    return legacy_root(transactions)
+
+
+class MerkleTreeCache:
+    """블록 해시별로 만들어 둔 머클 트리를 보관하는 LRU 캐시. (여러 요청 스레드에서 함께 사용)"""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.trees = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, block_hash, transactions):
+        with self.lock:
+            tree = self.trees.get(block_hash)
+            if tree is not None:
+                self.trees.move_to_end(block_hash)
+                return tree
+        tree = MerkleTree.from_transactions(transactions)
+        self.put(block_hash, tree)
+        return tree
+
+    def put(self, block_hash, tree):
+        with self.lock:
+            self.trees[block_hash] = tree
+            self.trees.move_to_end(block_hash)
+            while len(self.trees) > self.max_size:
+                self.trees.popitem(last=False)
+
+
+if __name__ == '__main__':
+    # 라이트 클라이언트 검증 도구: 노드에게서 포함 증명과 블록 헤더만 받아 거래의 포함 여부를 확인합니다.
+    #   python merkle.py http://127.0.0.1:5000 <거래 ID>
+    import sys
+    import requests
+
+    node_url, txid = sys.argv[1], sys.argv[2]
+    response = requests.get(f'{node_url}/transactions/{txid}/proof', timeout=5)
+    if response.status_code != 200:
+        print(f"🚨 포함 증명을 받을 수 없습니다: {response.text}")
+        sys.exit(1)
+    proof = response.json()
+    header = requests.get(f'{node_url}/chain/headers', params={'from': proof['block_index'], 'limit': 1}, timeout=5).json()['headers'][0]
+    if verify_proof(txid, proof['proof'], header['merkle_root']):
+        print(f"✅ 거래 {txid}는 블록 #{header['index']}({header['hash']})에 포함되어 있습니다.")
+    else:
+        print(f"🚨 거래 {txid}의 포함 증명이 블록 #{header['index']}의 merkle_root와 일치하지 않습니다.")
+        sys.exit(1)
@@ -0,0 +1,216 @@
+"""
+노드 내부 지표(metrics)와 필요할 때만 켜는 프로파일러.
+
+외부 서비스나 라이브러리 없이 프로세스 안에서 값을 모으고, /metrics 에서 Prometheus 텍스트 형식으로 내보냅니다.
+    counter   : 계속 늘어나기만 하는 값 (요청 수, 실패 수, 해시 수)
+    gauge     : 현재 값 (대기 거래 수, 체인 길이). 함수를 주면 내보낼 때마다 호출해 읽습니다.
+    histogram : 걸린 시간 등의 분포 (버킷별 누적 개수, 합계, 개수)
+"""
+import cProfile
+import io
+import pstats
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter, time
+
+# 걸린 시간(초)용 기본 버킷
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}  # 레이블 값 튜플 -> 값
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}의 레이블은 {self.labelnames}여야 합니다: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            items = sorted(self.values.items())
+        lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f'{self.name}{format_labels(self.labelnames, key)} {format_value(value)}' for key, value in items]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def render(self):
+        if self.function is not None:
+            with self.lock:
+                self.values[()] = self.function()
+        return super().render()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        position = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # [버킷별 개수..., +Inf 개수], 합계, 개수
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][position] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록이 끝날 때까지 걸린 시간(초)을 기록합니다. (예외가 나도 기록)"""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, **labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{format_labels(self.labelnames, key, [("le", format_value(float(bound)))])} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labelnames, key)} {format_value(total)}')
+            lines.append(f'{self.name}_count{format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """지표 목록. 같은 이름으로 다시 만들면 이미 있는 지표를 돌려줍니다."""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=(), function=None):
+        return self._register(Gauge, name, help_text, labelnames, function=function)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self):
+        """모든 지표를 Prometheus 텍스트 형식으로 반환합니다."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, cls, name, help_text, labelnames, **kwargs):
+        name = self.prefix + name
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name}은(는) 이미 다른 종류의 지표입니다.")
+            return metric
+
+
+class Profiler:
+    """
+    요청받은 작업(target)의 다음 실행 한 번을 cProfile로 기록합니다.
+    enabled가 False이면(기본) 아무것도 하지 않으므로, 평소에는 실행 속도에 영향을 주지 않습니다.
+    cProfile은 한 번에 하나만 켤 수 있으므로, 다른 작업을 기록하는 중이면 다음 실행까지 기다립니다.
+    """
+
+    def __init__(self, targets, enabled=False, limit=40):
+        self.targets = tuple(targets)
+        self.enabled = enabled
+        self.limit = limit  # 보고서에 담을 함수 수
+        self.armed = set()
+        self.results = {}   # target -> 마지막 기록 결과
+        self.lock = threading.Lock()
+        self.running = threading.Lock()
+
+    def arm(self, target):
+        if not self.enabled:
+            raise ValueError('프로파일러가 꺼져 있습니다. (노드를 --profiling 옵션으로 실행하세요)')
+        if target not in self.targets:
+            raise ValueError(f"기록할 수 있는 작업은 {', '.join(self.targets)}입니다.")
+        with self.lock:
+            self.armed.add(target)
+
+    def result(self, target):
+        return self.results.get(target)
+
+    @contextmanager
+    def section(self, target):
+        """target이 기록 요청된 상태라면 with 블록 실행을 cProfile로 기록합니다."""
+        if not self.enabled or target not in self.armed or not self.running.acquire(blocking=False):
+            yield
+            return
+        with self.lock:
+            self.armed.discard(target)
+        profile = cProfile.Profile()
+        started = perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = perf_counter() - started
+            self.running.release()
+            report = io.StringIO()
+            pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(self.limit)
+            self.results[target] = {'target': target, 'captured_at': time(), 'elapsed': elapsed, 'report': report.getvalue()}
@@ -0,0 +1,246 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import time
+from uuid import uuid4
+
+# 기존 규칙: sha256(f'{last_proof}{proof}')의 16진수 앞 4자리가 '0000'
+DEFAULT_DIFFICULTY = 4
+
+
+def difficulty_to_target(difficulty):
+    """
+    난이도(16진수 해시 앞에 와야 하는 '0'의 개수)를 32바이트 목표값(target)으로 바꿉니다.
+    해시 digest(바이트)가 target보다 작으면 유효한 작업 증명입니다.
+    """
+    return min(16 ** (64 - difficulty), 2 ** 256 - 1).to_bytes(32, 'big')
+
+
+def parse_target(target_hex):
+    """16진수 문자열로 직접 지정한 목표값을 32바이트로 바꿉니다."""
+    return int(target_hex, 16).to_bytes(32, 'big')
+
+
+def check_proof(last_proof, proof, target):
+    """valid_proof와 같은 규칙이지만, hex 문자열 대신 digest 바이트를 target과 비교합니다."""
+    return hashlib.sha256(f'{last_proof}{proof}'.encode()).digest() < target
+
+
+def search_range(last_proof, start, stop, target):
+    """
+    [start, stop) 범위의 nonce 중 유효한 proof를 찾습니다. (작업자 프로세스에서 실행)
+    last_proof 부분은 한 번만 해시해두고 .copy()로 재사용하며,
+    hexdigest 변환/슬라이싱 없이 digest 바이트를 바로 target과 비교합니다.
+    """
+    prefix = hashlib.sha256(str(last_proof).encode())
+    copy = prefix.copy
+    for proof in range(start, stop):
+        h = copy()
+        h.update(b'%d' % proof)
+        if h.digest() < target:
+            return proof
+    return None
+
+
+class ProofOfWorkMiner:
+    """
+    nonce 공간을 chunk_size 크기의 구간으로 나누어 프로세스 풀에서 병렬로 탐색하는 채굴 엔진.
+    한 작업자가 답을 찾거나 cancel_event가 설정되면, 남은 구간은 더 이상 나눠주지 않고 취소합니다.
+    """
+
+    def __init__(self, target, workers=None, chunk_size=20000):
+        self.target = target
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def search(self, last_proof, cancel_event=None, on_progress=None):
+        """
+        유효한 proof를 반환합니다. 도중에 cancel_event가 설정되면 None을 반환합니다.
+        on_progress가 주어지면 구간 탐색이 끝날 때마다 지금까지 탐색한 nonce 수로 호출합니다.
+        """
+        if self.workers <= 1:
+            return self._search_inline(last_proof, cancel_event, on_progress)
+
+        pool = self._get_pool()
+        next_start = 0
+        scanned = 0
+        in_flight = set()
+        try:
+            while True:
+                while len(in_flight) < self.workers * 2:
+                    in_flight.add(pool.submit(search_range, last_proof, next_start, next_start + self.chunk_size, self.target))
+                    next_start += self.chunk_size
+                done, in_flight = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                scanned += len(done) * self.chunk_size
+                if on_progress:
+                    on_progress(scanned)
+                found = [proof for proof in (future.result() for future in done) if proof is not None]
+                if found:
+                    return min(found)
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def _search_inline(self, last_proof, cancel_event, on_progress):
+        start = 0
+        while cancel_event is None or not cancel_event.is_set():
+            proof = search_range(last_proof, start, start + self.chunk_size, self.target)
+            if proof is not None:
+                return proof
+            start += self.chunk_size
+            if on_progress:
+                on_progress(start)
+        return None
+
+    def _get_pool(self):
+        # 채굴 작업 스레드와 /mine_fork 요청이 동시에 처음 호출해도 풀은 하나만 만듭니다.
+        with self._pool_lock:
+            if self._pool is None:
+                # Flask 작업 스레드가 있는 상태에서 fork 하지 않도록 spawn 방식을 사용합니다.
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class MiningJob:
+    """백그라운드에서 실행되는 채굴 작업 하나의 상태."""
+
+    def __init__(self, height):
+        self.id = uuid4().hex
+        self.height = height          # 채굴하려는 블록 번호
+        self.status = 'queued'        # queued -> running -> done / cancelled / stale / failed
+        self.message = ''
+        self.block = None
+        self.hashes = 0
+        self.created_at = time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.finished = threading.Event()
+
+    def on_progress(self, hashes):
+        self.hashes = hashes
+
+    def to_dict(self):
+        end = self.finished_at or time()
+        elapsed = end - self.started_at if self.started_at else 0
+        return {
+            'job_id': self.id,
+            'height': self.height,
+            'status': self.status,
+            'message': self.message,
+            'hashes': self.hashes,
+            'hash_rate': self.hashes / elapsed if elapsed else 0,
+            'elapsed': elapsed,
+            'block': self.block
+        }
+
+
+class MiningJobManager:
+    """
+    채굴 작업을 웹 요청 스레드 밖(전용 스레드)에서 실행하고 상태를 관리합니다.
+    work(job)은 블록을 만들어 반환하거나, 취소/무효화되었으면 None을 반환해야 합니다.
+    한 번에 하나의 작업만 실행하며, 실행 중에 또 요청이 오면 실행 중인 작업을 그대로 돌려줍니다.
+    """
+
+    MAX_HISTORY = 50
+
+    def __init__(self, work, has_pending_work=None):
+        self.work = work
+        self.has_pending_work = has_pending_work or (lambda: True)
+        self.jobs = OrderedDict()
+        self.current = None
+        self.lock = threading.Lock()
+        self.auto_enabled = threading.Event()
+        self.auto_thread = None
+        self.wakeup = threading.Event()
+
+    def notify_pending(self):
+        """새 거래가 들어왔음을 연속 채굴 스레드에 알립니다."""
+        self.wakeup.set()
+
+    def submit(self, height):
+        with self.lock:
+            if self.current is not None and not self.current.finished.is_set():
+                return self.current
+            job = MiningJob(height)
+            self.current = job
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.MAX_HISTORY:
+                self.jobs.popitem(last=False)
+        threading.Thread(target=self._run, args=(job,), name=f'mining-{job.id[:8]}', daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None and not job.finished.is_set():
+            job.cancel_event.set()
+        return job
+
+    def cancel_stale(self, chain_length):
+        """체인 길이가 chain_length가 되었으므로, 그 높이 이하를 채굴 중인 작업을 취소합니다."""
+        job = self.current
+        if job is not None and not job.finished.is_set() and job.height <= chain_length:
+            job.message = f'블록 #{job.height}을(를) 다른 노드가 먼저 채굴했습니다.'
+            job.cancel_event.set()
+
+    def _run(self, job):
+        job.status = 'running'
+        job.started_at = time()
+        try:
+            job.block = self.work(job)
+            if job.block is not None:
+                job.status = 'done'
+            elif job.cancel_event.is_set():
+                job.status = 'cancelled'
+            else:
+                job.status = 'stale'
+        except Exception as e:
+            job.status = 'failed'
+            job.message = str(e)
+        finally:
+            job.finished_at = time()
+            job.finished.set()
+
+    def set_auto(self, enabled, next_height):
+        """
+        연속 채굴 모드를 켜거나 끕니다. 켜져 있는 동안 대기 거래가 있으면 계속해서 블록을 채굴합니다.
+        next_height()는 다음에 채굴할 블록 번호를 반환하는 함수입니다.
+        """
+        if not enabled:
+            self.auto_enabled.clear()
+            if self.current is not None:
+                self.cancel(self.current.id)
+            return
+        self.auto_enabled.set()
+        self.wakeup.set()
+        if self.auto_thread is None or not self.auto_thread.is_alive():
+            self.auto_thread = threading.Thread(target=self._auto_loop, args=(next_height,), name='mining-auto', daemon=True)
+            self.auto_thread.start()
+
+    def _auto_loop(self, next_height):
+        while self.auto_enabled.is_set():
+            if not self.has_pending_work():
+                self.wakeup.wait(1.0)
+                self.wakeup.clear()
+                continue
+            self.submit(next_height()).finished.wait()
@@ -0,0 +1,232 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 블록/거래 전파 요청에 붙이는 헤더. (본문 형식과 관계없이 쓸 수 있도록 헤더로 보냄)
+GOSSIP_TTL_HEADER = 'X-Gossip-TTL'    # 이 메시지를 앞으로 몇 단계 더 전달할 수 있는지
+GOSSIP_FROM_HEADER = 'X-Gossip-From'  # 보낸 노드의 주소 (그 노드에게는 되돌려 보내지 않음)
+DEFAULT_GOSSIP_TTL = 8
+
+
+def forward_ttl(ttl, initial=DEFAULT_GOSSIP_TTL):
+    """
+    받은 메시지를 이웃에게 다시 보낼 때 붙일 TTL. 0이면 더 전달하지 않습니다.
+    ttl이 None이면(클라이언트가 직접 보낸 메시지) 이 노드에서 처음 전파하므로 initial을 씁니다.
+    """
+    if ttl is None:
+        return initial
+    try:
+        return max(int(ttl) - 1, 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class PeerClient:
+    """
+    이웃 노드와의 HTTP 통신을 담당하는 공용 네트워크 계층.
+    - 연결을 재사용하는 requests.Session (이웃별 keep-alive 커넥션 풀)
+    - 동시에 여러 이웃에게 요청을 보내는 제한된 크기의 작업자 풀
+    - 요청마다 타임아웃, 연결 실패 시 지수 백오프 재시도
+    on_request(node, path, 걸린 시간, 예외 또는 None)와 on_broadcast(path, 걸린 시간, 실패한 이웃 수)를 지정하면
+    요청이나 전파가 끝날 때마다 호출합니다. (지표 수집용)
+    """
+
+    def __init__(self, max_workers=8, timeout=(1.0, 5.0), retries=2, backoff=0.2):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='peer')
+        self.on_request = None
+        self.on_broadcast = None
+
+    def request(self, method, node, path, timeout=None, retries=None, **kwargs):
+        """
+        이웃 하나에게 요청을 보냅니다. 연결 오류/타임아웃이면 backoff, 2*backoff, ... 만큼 쉬었다가 재시도하고,
+        끝까지 실패하면 마지막 예외를 그대로 던집니다.
+        """
+        retries = self.retries if retries is None else retries
+        url = f'http://{node}{path}'
+        started = time.perf_counter()
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if attempt == retries:
+                    if self.on_request:
+                        self.on_request(node, path, time.perf_counter() - started, e)
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+            else:
+                if self.on_request:
+                    self.on_request(node, path, time.perf_counter() - started, None)
+                return response
+
+    def get(self, node, path, **kwargs):
+        return self.request('GET', node, path, **kwargs)
+
+    def post(self, node, path, **kwargs):
+        return self.request('POST', node, path, **kwargs)
+
+    def gather(self, method, path, nodes, **kwargs):
+        """
+        여러 이웃에게 같은 요청을 동시에 보내고, {이웃: 응답 또는 예외}를 반환합니다.
+        가장 느린 이웃도 타임아웃 이상 기다리지 않습니다.
+        """
+        futures = {self.executor.submit(self.request, method, node, path, **kwargs): node for node in nodes}
+        results = {}
+        for future in as_completed(futures):
+            node = futures[future]
+            try:
+                results[node] = future.result()
+            except requests.exceptions.RequestException as e:
+                results[node] = e
+        return results
+
+    def broadcast(self, path, payload, nodes, on_error=None, content_type=None, headers=None):
+        """
+        모든 이웃에게 payload를 POST 하되, 결과를 기다리지 않고 바로 반환합니다. (fire-and-forget)
+        content_type이 주어지면 payload(bytes)를 그 형식 그대로 보내고, 아니면 JSON으로 보냅니다.
+        전송에 실패하면 on_error(node, error)를 호출합니다.
+        """
+        headers = dict(headers or {})
+        if content_type:
+            headers['Content-Type'] = content_type
+            kwargs = {'data': payload, 'headers': headers}
+        else:
+            kwargs = {'json': payload, 'headers': headers}
+        nodes = list(nodes)
+        # 마지막 이웃까지 전송이 끝났을 때 전체 걸린 시간(fan-out 지연)을 알립니다.
+        fanout = {'remaining': len(nodes), 'failures': 0, 'started': time.perf_counter(), 'lock': threading.Lock()}
+        for node in nodes:
+            self.executor.submit(self._post_quietly, node, path, kwargs, on_error, fanout)
+
+    def _post_quietly(self, node, path, kwargs, on_error, fanout=None):
+        failed = False
+        try:
+            self.post(node, path, **kwargs)
+        except requests.exceptions.RequestException as e:
+            failed = True
+            if on_error:
+                on_error(node, e)
+        if fanout is not None:
+            with fanout['lock']:
+                fanout['remaining'] -= 1
+                fanout['failures'] += failed
+                finished = fanout['remaining'] == 0
+            if finished and self.on_broadcast:
+                self.on_broadcast(path, time.perf_counter() - fanout['started'], fanout['failures'])
+
+
+class TransactionRelay:
+    """
+    거래 전파를 모아서 보내는 inv/getdata 방식의 전파기.
+    새로 받은 거래의 ID를 window초 동안 모았다가, 이웃마다 ID 목록(inv)을 한 번 보내고(/transactions/inv),
+    이웃이 가지고 있지 않다고 답한 거래만 /transactions/batch로 한 번에 보냅니다.
+    거래 N개, 이웃 P개일 때 요청 수가 N×P개에서 (N / max_batch)×P×2개 정도로 줄어듭니다.
+    window가 0 이하이면 예전처럼 거래마다 바로 /transactions/new로 전파합니다.
+    거래마다 TTL(앞으로 더 전달할 수 있는 단계 수)을 함께 기억해 GOSSIP_TTL_HEADER로 보내므로,
+    이웃이 모두에게 연결되어 있지 않아도 한 단계씩 퍼지고, TTL이 0이 되면 더 전달되지 않습니다.
+    """
+
+    def __init__(self, peers, nodes, lookup, window=0.05, max_batch=1000, seen_size=100000, on_error=None, confirmed=None):
+        self.peers = peers
+        self.nodes = nodes          # 현재 이웃 목록을 반환하는 함수
+        self.lookup = lookup        # 거래 ID -> 대기 중인 거래 (없으면 None)
+        self.confirmed = confirmed  # 거래 ID 목록 -> 그중 이미 블록에 담긴 거래 ID의 집합 (없으면 확인하지 않음)
+        self.window = window
+        self.max_batch = max_batch
+        self.seen_size = seen_size
+        self.on_error = on_error
+        self.lock = threading.Lock()
+        self.pending = OrderedDict()  # 다음에 알릴 거래 ID -> TTL (순서 유지)
+        self.seen = OrderedDict()     # 최근에 받은 거래 ID (블록에 담겨 대기 목록에서 빠진 뒤에도 다시 요청하지 않도록)
+        self.wakeup = threading.Event()
+        self._thread = None
+
+    def announce(self, txids, ttl=DEFAULT_GOSSIP_TTL):
+        """새로 받은 거래들을 이웃에게 알리도록 예약합니다. ttl은 이웃에게 보낼 때 붙일 TTL이며, 0이면 알리지 않습니다."""
+        if ttl <= 0:
+            with self.lock:
+                for txid in txids:
+                    self._mark_seen(txid)
+            return
+        if self.window <= 0:
+            # propagated 표시는 TTL 헤더를 모르는 예전 노드가 다시 전파하지 않도록 남겨 둡니다.
+            headers = {GOSSIP_TTL_HEADER: str(ttl)}
+            for txid in txids:
+                transaction = self.lookup(txid)
+                if transaction is not None:
+                    self.peers.broadcast('/transactions/new', dict(transaction, propagated=True), self.nodes(), on_error=self.on_error, headers=headers)
+            return
+        with self.lock:
+            for txid in txids:
+                self.pending[txid] = max(ttl, self.pending.get(txid, 0))
+                self._mark_seen(txid)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='tx-relay', daemon=True)
+                self._thread.start()
+        self.wakeup.set()
+
+    def missing(self, txids):
+        """이웃이 알려준 거래 ID 중 이 노드가 모르는 것 (이미 블록에 담긴 거래는 다시 받지 않음)"""
+        with self.lock:
+            missing = [txid for txid in txids if isinstance(txid, str) and txid not in self.seen and self.lookup(txid) is None]
+        if missing and self.confirmed:
+            confirmed = self.confirmed(missing)
+            missing = [txid for txid in missing if txid not in confirmed]
+        return missing
+
+    def flush(self):
+        """모아 둔 거래를 모든 이웃에게 알립니다."""
+        with self.lock:
+            pending, self.pending = self.pending, OrderedDict()
+        groups = {}  # TTL -> [(거래 ID, 거래)]
+        for txid, ttl in pending.items():
+            transaction = self.lookup(txid)
+            if transaction is not None:  # 그 사이 블록에 담긴 거래는 블록 전파로 전달됩니다.
+                groups.setdefault(ttl, []).append((txid, transaction))
+        nodes = list(self.nodes())
+        for ttl, items in groups.items():
+            for start in range(0, len(items), self.max_batch):
+                chunk = items[start:start + self.max_batch]
+                for node in nodes:
+                    self.peers.executor.submit(self._relay, node, chunk, ttl)
+
+    def _relay(self, node, items, ttl):
+        try:
+            response = self.peers.post(node, '/transactions/inv', json={'txids': [txid for txid, _ in items]})
+            if response.status_code == 404:
+                # 일괄 전파를 모르는 예전 노드에게는 거래마다 보냅니다.
+                for _, transaction in items:
+                    self.peers.post(node, '/transactions/new', json=dict(transaction, propagated=True))
+                return
+            response.raise_for_status()
+            missing = set(response.json().get('missing', []))
+            batch = [transaction for txid, transaction in items if txid in missing]
+            if batch:
+                self.peers.post(node, '/transactions/batch', json={'transactions': batch}, headers={GOSSIP_TTL_HEADER: str(ttl)})
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if self.on_error:
+                self.on_error(node, e)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(self.window)  # 창(window) 동안 들어오는 거래를 모읍니다.
+            self.wakeup.clear()
+            self.flush()
+
+    def _mark_seen(self, txid):
+        # self.lock을 잡은 상태에서 호출
+        self.seen[txid] = None
+        self.seen.move_to_end(txid)
+        while len(self.seen) > self.seen_size:
+            self.seen.popitem(last=False)
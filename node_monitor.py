@@ -0,0 +1,125 @@
+import threading
+import time
+
+import requests
+
+from network import PeerClient
+
+
+class NodeMonitor:
+    """
+    관제실용 노드 상태 수집기.
+    백그라운드 스레드가 interval초마다 모든 노드의 /status를 동시에 요청해 결과를 캐시에 담아 두고,
+    페이지와 실시간 피드(SSE)는 이 캐시만 읽습니다. 마지막 성공 응답이 ttl초보다 오래되면 오프라인으로 표시하고,
+    연속 실패가 max_failures번에 이르러야 노드를 목록에서 제거합니다. (한 번의 지연으로 빠지지 않도록)
+    """
+
+    def __init__(self, interval=1.0, ttl=5.0, max_failures=3, timeout=0.5, max_workers=16):
+        self.interval = interval
+        self.ttl = ttl
+        self.max_failures = max_failures
+        self.peers = PeerClient(max_workers=max_workers, timeout=timeout, retries=0)
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.states = {}    # 노드 URL -> 마지막으로 수집한 상태
+        self.version = 0    # 목록이나 상태가 바뀔 때마다 1씩 증가
+        self.wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self.lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='node-monitor', daemon=True)
+                self._thread.start()
+
+    def add(self, node_url):
+        with self.lock:
+            if node_url not in self.states:
+                self.states[node_url] = {
+                    'url': node_url,
+                    'online': False,
+                    'chain_length': 0,
+                    'pending_tx_count': 0,
+                    'tip_hash': None,
+                    'failures': 0,
+                    'last_seen': None
+                }
+                self._bump()
+        self.wakeup.set()  # 새 노드의 상태를 바로 수집
+
+    def discard(self, node_url):
+        with self.lock:
+            if self.states.pop(node_url, None) is not None:
+                self._bump()
+
+    def urls(self):
+        with self.lock:
+            return list(self.states)
+
+    def snapshot(self):
+        """현재 캐시된 노드 상태 목록 (URL 순). ttl이 지난 상태는 오프라인으로 표시합니다."""
+        now = time.time()
+        with self.lock:
+            states = [dict(state) for _, state in sorted(self.states.items())]
+        for state in states:
+            state['online'] = state['online'] and state['last_seen'] is not None and now - state['last_seen'] <= self.ttl
+        return states
+
+    def wait_for_change(self, version, timeout=None):
+        """version 이후로 상태가 바뀔 때까지(최대 timeout초) 기다린 뒤 현재 version을 반환합니다."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def poll_once(self):
+        """모든 노드에게 동시에 /status를 요청해 캐시를 갱신합니다."""
+        urls = self.urls()
+        netlocs = {url.split('://', 1)[-1]: url for url in urls}
+        results = self.peers.gather('GET', '/status', netlocs)
+        now = time.time()
+        removed = []
+        with self.lock:
+            changed = False
+            for netloc, result in results.items():
+                state = self.states.get(netlocs[netloc])
+                if state is None:  # 수집하는 동안 등록 해제된 노드
+                    continue
+                before = (state['online'], state['chain_length'], state['pending_tx_count'], state['tip_hash'], state['failures'])
+                if isinstance(result, requests.Response) and result.status_code == 200:
+                    status = result.json()
+                    state.update(
+                        online=True,
+                        chain_length=status.get('length', 0),
+                        pending_tx_count=status.get('mempool_size', 0),
+                        tip_hash=status.get('tip_hash'),
+                        failures=0,
+                        last_seen=now
+                    )
+                else:
+                    state['failures'] += 1
+                    state['online'] = False
+                    if state['failures'] >= self.max_failures:
+                        del self.states[state['url']]
+                        removed.append(state['url'])
+                        changed = True
+                        continue
+                if before != (state['online'], state['chain_length'], state['pending_tx_count'], state['tip_hash'], state['failures']):
+                    changed = True
+            if changed:
+                self._bump()
+        if removed:
+            print(f"관제실: {self.max_failures}번 연속 응답 없음: {removed} 노드를 목록에서 제거합니다.")
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:  # 수집 스레드가 죽으면 대시보드가 멈추므로 다음 주기에 다시 시도
+                print(f"관제실: 노드 상태 수집 실패: {e}")
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def _bump(self):
+        # self.lock을 잡은 상태에서 호출
+        self.version += 1
+        self.changed.notify_all()
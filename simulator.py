@@ -0,0 +1,501 @@
+"""
+노드 여러 개로 이루어진 네트워크를 띄워 시나리오를 실행하고, 결과를 JSON으로 저장하는 시뮬레이터.
+
+    python simulator.py [--nodes 4] [--scenarios tx-flood,mining,double-spend] [--output simulation_results.json]
+
+관제실(dashboard.py)과 노드(blockchain_node_v3.py)는 각각 별도 프로세스로 임시 폴더에서 실행합니다.
+(노드 모듈은 프로세스마다 체인 하나를 전역으로 가지므로 한 프로세스 안에 여러 노드를 둘 수 없습니다)
+노드는 하나씩 띄우면서 관제실의 /register -> /add_peer 흐름으로 서로 연결합니다. (--no-dashboard 면 직접 /add_peer)
+연결 방식은 --topology, --peers-per-node, --max-peers 로 정하며(topology.py), 시작할 때 모든 노드가 이어져 있는지 확인합니다.
+
+시나리오
+    tx-flood     : 거래 N개를 여러 노드에 나누어 보내고, 모든 노드의 대기 목록에 전파될 때까지의 처리량
+    mining       : 모든 노드가 동시에 채굴할 때 블록 전파 지연, 버려진(고아) 블록 비율, 수렴 시간
+    double-spend : /mine_fork 로 비밀 체인을 만든 공격자가 이미 확인된 지불을 되돌리는 이중 지불 공격
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep, time
+
+import requests
+
+from mempool import transaction_id
+from topology import DEFAULT_MAX_PEERS, TOPOLOGIES, order_candidates
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+NODE_SCRIPT = os.path.join(ROOT, 'blockchain_node_v3.py')
+DASHBOARD_SCRIPT = os.path.join(ROOT, 'dashboard.py')
+
+SCENARIOS = ('tx-flood', 'mining', 'double-spend')
+
+
+class SimulationError(RuntimeError):
+    pass
+
+
+class SimulatedNetwork:
+    """
+    관제실 하나와 노드 여러 개를 프로세스로 띄우고 HTTP로 조작합니다. with 문을 벗어나면 모두 종료합니다.
+    i번 노드의 포트는 base_port + i, 채굴 보상 주소는 sim-node-<i> 입니다.
+    """
+
+    def __init__(self, nodes=4, base_port=5700, dashboard_port=5799, use_dashboard=True, node_args=(), logs=False,
+                 topology='full', peers_per_node=4, max_peers=DEFAULT_MAX_PEERS):
+        self.count = nodes
+        self.topology = topology
+        self.peers_per_node = peers_per_node
+        self.max_peers = max_peers
+        self.ports = [base_port + i for i in range(nodes)]
+        self.dashboard_port = dashboard_port
+        self.use_dashboard = use_dashboard
+        self.node_args = list(node_args)
+        self.logs = logs  # True면 임시 폴더에 프로세스별 로그 파일을 남김
+        self.session = requests.Session()
+        self.processes = []
+        self.workdir = None
+        self._tempdir = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def url(self, i):
+        return f'http://127.0.0.1:{self.ports[i]}'
+
+    def miner_address(self, i):
+        return f'sim-node-{i}'
+
+    def start(self):
+        self._tempdir = tempfile.TemporaryDirectory(prefix='blockchain-sim-')
+        self.workdir = self._tempdir.name
+        dashboard_url = f'http://127.0.0.1:{self.dashboard_port}'
+        if self.use_dashboard:
+            self._spawn('dashboard', [
+                DASHBOARD_SCRIPT, '--port', str(self.dashboard_port), '--no-debug', '--poll-interval', '0.5',
+                '--topology', self.topology, '--peers-per-node', str(self.peers_per_node)
+            ])
+            self._wait_ready(f'{dashboard_url}/nodes/status')
+        for i in range(self.count):
+            # 먼저 띄운 노드가 응답한 뒤에 다음 노드를 띄워야 관제실이 새 노드를 기존 노드에게 소개할 수 있습니다.
+            self._start_node(i)
+        unreachable = self.count - len(self.reachable(0))
+        if unreachable:
+            raise SimulationError(f'0번 노드에서 닿지 않는 노드가 {unreachable}개 있습니다. (--peers-per-node, --max-peers 확인)')
+
+    def add_node(self, extra_args=(), timeout=300):
+        """
+        네트워크가 돌아가는 중에 노드를 하나 더 띄우고(늦게 합류하는 노드) 번호를 반환합니다.
+        노드는 시작 전에 동기화를 마친 뒤 응답하므로, 이 함수가 끝나면 새 노드는 네트워크의 체인을 따라잡은 상태입니다.
+        (관제실 없이 실행하면 이웃을 시작한 뒤에 소개하므로, 시작할 때 동기화하지 않습니다)
+        """
+        i = self.count
+        self.ports.append(self.ports[0] + i)
+        self.count += 1
+        self._start_node(i, extra_args, timeout)
+        return i
+
+    def _start_node(self, i, extra_args=(), timeout=30):
+        args = [
+            NODE_SCRIPT, '--port', str(self.ports[i]), '--miner-address', self.miner_address(i),
+            '--dashboard', f'http://127.0.0.1:{self.dashboard_port}', '--max-peers', str(self.max_peers)
+        ] + self.node_args + list(extra_args)
+        self._spawn(f'node-{self.ports[i]}', args)
+        self._wait_ready(f'{self.url(i)}/status', timeout)
+        if not self.use_dashboard:
+            self._introduce(i)
+
+    def _introduce(self, i):
+        """관제실 없이 관제실과 같은 방식으로 i번 노드를 기존 노드들과 연결합니다."""
+        count = i if self.topology == 'full' else self.peers_per_node
+        connected = 0
+        for j in order_candidates(range(i), self.topology, count):
+            if connected >= count:
+                break
+            if self.post(j, '/add_peer', json={'peer_url': self.url(i)}).status_code == 201:
+                self.post(i, '/add_peer', json={'peer_url': self.url(j)})
+                connected += 1
+
+    def peer_graph(self):
+        """노드 번호 -> 이웃 노드 번호 목록"""
+        index = {self.url(i): i for i in range(self.count)}
+        graph = {}
+        for i in range(self.count):
+            graph[i] = [index[url] for url in self.get(i, '/nodes/peers').json()['peers'] if url in index]
+        return graph
+
+    def reachable(self, start, graph=None):
+        """start번 노드에서 이웃을 따라 닿는 노드 번호 -> 거리(단계 수)"""
+        graph = self.peer_graph() if graph is None else graph
+        distances = {start: 0}
+        frontier = [start]
+        while frontier:
+            following = []
+            for i in frontier:
+                for j in graph[i]:
+                    if j not in distances:
+                        distances[j] = distances[i] + 1
+                        following.append(j)
+            frontier = following
+        return distances
+
+    def describe_topology(self):
+        """이웃 수와 가장 먼 두 노드 사이의 단계 수(지름)"""
+        graph = self.peer_graph()
+        degrees = [len(peers) for peers in graph.values()]
+        return {
+            'topology': self.topology if self.count > 1 else 'single',
+            'links': sum(degrees) // 2,
+            'mean_peers': statistics.mean(degrees),
+            'max_peers': max(degrees),
+            'diameter': max(max(self.reachable(i, graph).values()) for i in range(self.count))
+        }
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+        if self._tempdir is not None:
+            self._tempdir.cleanup()
+            self._tempdir = None
+
+    def get(self, i, path, timeout=30, **kwargs):
+        return self.session.get(self.url(i) + path, timeout=timeout, **kwargs)
+
+    def post(self, i, path, timeout=30, **kwargs):
+        return self.session.post(self.url(i) + path, timeout=timeout, **kwargs)
+
+    def statuses(self):
+        """모든 노드의 /status (동시에 조회)"""
+        return [status for status, _ in self.timed_statuses()]
+
+    def timed_statuses(self):
+        """모든 노드의 (/status, 응답을 받은 시각)"""
+        def fetch(i):
+            status = self.get(i, '/status', timeout=5).json()
+            return status, perf_counter()
+        with ThreadPoolExecutor(max_workers=self.count) as pool:
+            return list(pool.map(fetch, range(self.count)))
+
+    def wait_until(self, predicate, timeout, interval=0.05):
+        """predicate(상태 목록)가 참이 될 때까지 기다린 시간(초). timeout까지 안 되면 None"""
+        started = perf_counter()
+        while perf_counter() - started < timeout:
+            if predicate(self.statuses()):
+                return perf_counter() - started
+            sleep(interval)
+        return None
+
+    def wait_for_convergence(self, timeout=30):
+        """모든 노드의 마지막 블록 해시가 같아질 때까지 기다린 시간(초)"""
+        return self.wait_until(lambda statuses: len({status['tip_hash'] for status in statuses}) == 1, timeout)
+
+    def metric(self, i, name, **labels):
+        """i번 노드 /metrics 에서 이름이 같고 주어진 레이블이 모두 일치하는 값의 합 (없으면 0)"""
+        wanted = [f'{key}="{value}"' for key, value in labels.items()]
+        total = 0.0
+        for line in self.get(i, '/metrics').text.splitlines():
+            if line.startswith('#'):
+                continue
+            sample, _, value = line.rpartition(' ')
+            sample_name, _, sample_labels = sample.partition('{')
+            if sample_name == name and all(label in sample_labels.rstrip('}').split(',') for label in wanted):
+                total += float(value)
+        return total
+
+    def metric_total(self, name, **labels):
+        return sum(self.metric(i, name, **labels) for i in range(self.count))
+
+    def _spawn(self, name, args):
+        output = open(os.path.join(self.workdir, f'{name}.log'), 'w') if self.logs else subprocess.DEVNULL
+        self.processes.append(subprocess.Popen([sys.executable] + args, cwd=self.workdir, stdout=output, stderr=subprocess.STDOUT))
+
+    def _wait_ready(self, url, timeout=30):
+        started = perf_counter()
+        while perf_counter() - started < timeout:
+            try:
+                self.session.get(url, timeout=1)
+                return
+            except requests.exceptions.RequestException:
+                sleep(0.1)
+        self.stop()
+        raise SimulationError(f'{url} 이(가) {timeout}초 안에 시작되지 않았습니다.')
+
+
+def summarize(values):
+    """지연 시간 목록(초)의 요약 (밀리초)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        'samples': len(ordered),
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000
+    }
+
+
+def mine_blocks(network, i, count):
+    for _ in range(count):
+        response = network.get(i, '/mine', timeout=300)
+        if response.status_code != 200:
+            raise SimulationError(f'{i}번 노드 채굴 실패: HTTP {response.status_code} {response.text}')
+
+
+def scenario_tx_flood(network, args):
+    """0번 노드의 채굴 보상으로 거래 N개를 만들어 모든 노드에 나누어 보내고, 모두에게 전파될 때까지 잽니다."""
+    funder = network.miner_address(0)
+    mine_blocks(network, 0, args.funding_blocks)
+    network.wait_for_convergence()
+
+    stamp = time()
+    amount = args.funding_blocks / (args.txs * 2)  # 잔액 안에서 보낼 수 있도록
+    transactions = [{'sender': funder, 'recipient': f'sim-user-{i % 50}', 'amount': amount, 'time': stamp + i * 1e-6} for i in range(args.txs)]
+    if args.batch_size > 1:
+        requests_to_send = [
+            (n % network.count, '/transactions/batch', {'transactions': transactions[start:start + args.batch_size]})
+            for n, start in enumerate(range(0, len(transactions), args.batch_size))
+        ]
+    else:
+        requests_to_send = [(n % network.count, '/transactions/new', tx) for n, tx in enumerate(transactions)]
+
+    baseline = min(status['mempool_size'] for status in network.statuses())
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        responses = list(pool.map(lambda item: network.post(item[0], item[1], json=item[2]), requests_to_send))
+    submitted = perf_counter() - started
+    rejected = 0
+    for (_, path, payload), response in zip(requests_to_send, responses):
+        if response.status_code >= 400:
+            rejected += len(payload['transactions']) if path == '/transactions/batch' else 1
+        elif path == '/transactions/batch':
+            rejected += len(response.json()['rejected'])
+    expected = baseline + args.txs - rejected
+    propagated = network.wait_until(lambda statuses: all(status['mempool_size'] >= expected for status in statuses), args.timeout)
+    elapsed = perf_counter() - started
+    return {
+        'transactions': args.txs,
+        'batch_size': args.batch_size,
+        'rejected': rejected,
+        'submit_seconds': submitted,
+        'submit_tps': args.txs / submitted,
+        'propagation_seconds': elapsed if propagated is not None else None,
+        'propagated_tps': (args.txs - rejected) / elapsed if propagated is not None else None,
+    }
+
+
+def scenario_mining(network, args):
+    """모든 노드가 동시에 채굴하는 동안 마지막 블록 해시를 계속 조회해, 블록이 모든 노드에 퍼지는 시간을 잽니다."""
+    start_length = network.statuses()[0]['length']
+    mined_before = network.metric_total('blockchain_blocks_mined_total', kind='mine')
+    reorgs_before = network.metric_total('blockchain_chain_reorgs_total')
+    stop = threading.Event()
+
+    def keep_mining(i):
+        while not stop.is_set():
+            try:
+                network.get(i, '/mine', timeout=300)
+            except requests.exceptions.RequestException:
+                sleep(0.1)
+
+    first_seen = {}  # 블록 해시 -> {노드 번호: 처음 마지막 블록으로 보인 시각}
+    miners = [threading.Thread(target=keep_mining, args=(i,), daemon=True) for i in range(network.count)]
+    for thread in miners:
+        thread.start()
+    started = perf_counter()
+    while perf_counter() - started < args.duration:
+        for i, (status, seen_at) in enumerate(network.timed_statuses()):
+            first_seen.setdefault(status['tip_hash'], {}).setdefault(i, seen_at)
+        sleep(args.poll_interval)
+    stop.set()
+    for thread in miners:
+        thread.join(timeout=args.timeout)
+
+    # 채굴을 멈춘 뒤 모든 노드가 같은 체인에 도달하는 시간.
+    # 전파만으로 안 되면 resolve_conflicts를 실행하고, 작업량이 같은 가지끼리 남았다면 블록 하나를 더 채굴해 승부를 냅니다.
+    stopped = perf_counter()
+    converged = network.wait_for_convergence(timeout=5)
+    resolved = False
+    tiebreak = False
+    if converged is None:
+        resolved = True
+        with ThreadPoolExecutor(max_workers=network.count) as pool:
+            list(pool.map(lambda i: network.get(i, '/nodes/resolve', timeout=60), range(network.count)))
+        converged = network.wait_for_convergence(timeout=2)
+    if converged is None:
+        tiebreak = True
+        mine_blocks(network, 0, 1)
+        converged = network.wait_for_convergence(timeout=args.timeout)
+    convergence = perf_counter() - stopped if converged is not None else None
+
+    final_length = network.statuses()[0]['length'] - tiebreak
+    final_hashes = {header['hash'] for header in network.get(0, '/chain', params={'from': start_length + 1, 'headers': 1}).json()['chain']}
+    mined = network.metric_total('blockchain_blocks_mined_total', kind='mine') - mined_before - tiebreak
+    in_chain = final_length - start_length
+    latencies = [max(seen.values()) - min(seen.values()) for block_hash, seen in first_seen.items() if block_hash in final_hashes and len(seen) == network.count]
+    return {
+        'duration_seconds': args.duration,
+        'blocks_mined': int(mined),
+        'blocks_in_chain': in_chain,
+        'orphan_rate': 1 - in_chain / mined if mined else None,
+        'reorgs': int(network.metric_total('blockchain_chain_reorgs_total') - reorgs_before),
+        'block_propagation': summarize(latencies),
+        'convergence_seconds': convergence,
+        'needed_resolve': resolved,
+        'needed_tiebreak_block': tiebreak,
+        'poll_interval_ms': args.poll_interval * 1000
+    }
+
+
+def scenario_double_spend(network, args):
+    """
+    마지막 노드가 공격자입니다.
+    1. 공격자가 공개적으로 채굴해 잔액을 모읍니다.
+    2. 공격자는 같은 돈을 자기 다른 주소로 보내는 거래를 담아 /mine_fork 로 비밀 체인을 만듭니다. (전파하지 않음)
+    3. 0번 노드에 상점(merchant)으로 지불하는 거래를 보내고, 0번 노드가 confirmations개 블록으로 확인합니다.
+    4. 정직한 노드들이 resolve_conflicts를 실행하면, 더 긴 공격자 체인으로 재구성되며 지불이 사라집니다.
+    """
+    attacker = network.count - 1
+    address = network.miner_address(attacker)
+    mine_blocks(network, attacker, args.funding_blocks)
+    network.wait_for_convergence()
+    amount = network.get(attacker, f'/balance/{address}').json()['balance']
+
+    conflict = {'sender': address, 'recipient': 'sim-attacker-vault', 'amount': amount, 'time': time()}
+    for n in range(args.attack_blocks):
+        response = network.post(attacker, '/mine_fork', json={'transactions': [conflict] if n == 0 else []}, timeout=300)
+        if response.status_code != 200:
+            raise SimulationError(f'공격용 블록 채굴 실패: HTTP {response.status_code} {response.text}')
+
+    payment = {'sender': address, 'recipient': 'sim-merchant', 'amount': amount, 'time': time()}
+    payment_id = transaction_id(payment)
+    network.post(0, '/transactions/new', json=payment)
+    mine_blocks(network, 0, args.confirmations)
+    honest = list(range(attacker))
+    network.wait_until(lambda statuses: len({statuses[i]['tip_hash'] for i in honest}) == 1, args.timeout)
+    before = network.get(0, f'/tx/{payment_id}')
+    confirmed_before = before.status_code == 200 and before.json()['status'] == 'confirmed'
+
+    reorgs_before = network.metric_total('blockchain_chain_reorgs_total')
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=len(honest)) as pool:
+        list(pool.map(lambda i: network.get(i, '/nodes/resolve', timeout=60), honest))
+    converged = network.wait_for_convergence(timeout=args.timeout)
+    convergence = perf_counter() - started if converged is not None else None
+
+    after = network.get(0, f'/tx/{payment_id}')
+    payment_status = after.json()['status'] if after.status_code == 200 else 'dropped'
+    return {
+        'attack_blocks': args.attack_blocks,
+        'confirmations': args.confirmations,
+        'amount': amount,
+        'payment_confirmed_before_reveal': confirmed_before,
+        'payment_status_after_reveal': payment_status,
+        'double_spend_succeeded': confirmed_before and payment_status != 'confirmed',
+        'merchant_balance': network.get(0, '/balance/sim-merchant').json()['balance'],
+        'attacker_vault_balance': network.get(0, '/balance/sim-attacker-vault').json()['balance'],
+        'reorgs': int(network.metric_total('blockchain_chain_reorgs_total') - reorgs_before),
+        'convergence_seconds': convergence
+    }
+
+
+SCENARIO_FUNCTIONS = {
+    'tx-flood': scenario_tx_flood,
+    'mining': scenario_mining,
+    'double-spend': scenario_double_spend,
+}
+
+
+def run(args):
+    """시나리오마다 새 네트워크를 띄워 실행하고 결과 dict를 반환합니다."""
+    node_args = ['--difficulty', str(args.difficulty), '--mining-workers', str(args.mining_workers)] + args.node_args
+    results = {
+        'started_at': time(),
+        'config': {
+            'nodes': args.nodes,
+            'difficulty': args.difficulty,
+            'mining_workers': args.mining_workers,
+            'dashboard': not args.no_dashboard,
+            'topology': args.topology,
+            'peers_per_node': args.peers_per_node,
+            'max_peers': args.max_peers,
+            'node_args': args.node_args
+        },
+        'scenarios': {}
+    }
+    for name in args.scenarios:
+        print(f"시나리오 {name} 실행 중... (노드 {args.nodes}개)")
+        with SimulatedNetwork(args.nodes, args.base_port, args.dashboard_port, not args.no_dashboard, node_args, args.keep_logs,
+                              args.topology, args.peers_per_node, args.max_peers) as network:
+            started = perf_counter()
+            try:
+                network_info = network.describe_topology()
+                requests_before = network.metric_total('blockchain_peer_requests_total')
+                result = SCENARIO_FUNCTIONS[name](network, args)
+                # 노드끼리 주고받은 요청 수 (전파 메시지가 노드 수에 따라 얼마나 늘어나는지 비교)
+                result['peer_requests'] = int(network.metric_total('blockchain_peer_requests_total') - requests_before)
+                result['network'] = network_info
+            except (SimulationError, requests.exceptions.RequestException, ValueError, KeyError) as e:
+                result = {'error': str(e)}
+            result['elapsed_seconds'] = perf_counter() - started
+        results['scenarios'][name] = result
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    return results
+
+
+def parse_scenarios(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"알 수 없는 시나리오: {', '.join(unknown)} (가능: {', '.join(SCENARIOS)})")
+    return names
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='블록체인 네트워크 시뮬레이터')
+    parser.add_argument('--nodes', default=4, type=int, help='노드 수')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), type=parse_scenarios, help=f"실행할 시나리오 (쉼표로 구분: {', '.join(SCENARIOS)})")
+    parser.add_argument('--output', default='simulation_results.json', help='결과를 저장할 JSON 파일')
+    parser.add_argument('--difficulty', default=5, type=int, help='노드의 작업 증명 난이도')
+    parser.add_argument('--mining-workers', default=1, type=int, help='노드마다 채굴에 쓰는 프로세스 수')
+    parser.add_argument('--base-port', default=5700, type=int, help='첫 노드의 포트 (i번 노드는 base-port + i)')
+    parser.add_argument('--dashboard-port', default=5799, type=int)
+    parser.add_argument('--no-dashboard', action='store_true', help='관제실 없이 노드끼리 직접 /add_peer 로 연결')
+    parser.add_argument('--topology', default='random', choices=TOPOLOGIES, help='노드 연결 방식 (full: 모든 노드끼리 연결)')
+    parser.add_argument('--peers-per-node', default=4, type=int, help='새 노드마다 연결할 기존 노드 수 (full이 아닐 때)')
+    parser.add_argument('--max-peers', default=DEFAULT_MAX_PEERS, type=int, help='노드마다 최대 이웃 수')
+    parser.add_argument('--keep-logs', action='store_true', help='임시 폴더에 프로세스 로그를 남김 (종료 시 폴더째 삭제)')
+    parser.add_argument('--node-args', default=[], type=str.split, help='노드에 그대로 넘길 추가 옵션 (예: "--tx-relay-window 0")')
+    parser.add_argument('--timeout', default=60.0, type=float, help='전파/수렴을 기다리는 최대 시간(초)')
+    # tx-flood
+    parser.add_argument('--txs', default=2000, type=int, help='tx-flood: 보낼 거래 수')
+    parser.add_argument('--batch-size', default=100, type=int, help='tx-flood: /transactions/batch 요청 하나의 거래 수 (1이면 거래마다 /transactions/new)')
+    parser.add_argument('--clients', default=8, type=int, help='tx-flood: 동시에 거래를 보내는 스레드 수')
+    parser.add_argument('--funding-blocks', default=3, type=int, help='tx-flood, double-spend: 먼저 채굴해 잔액을 모으는 블록 수')
+    # mining
+    parser.add_argument('--duration', default=20.0, type=float, help='mining: 모든 노드가 동시에 채굴하는 시간(초)')
+    parser.add_argument('--poll-interval', default=0.02, type=float, help='mining: 마지막 블록 해시를 조회하는 간격(초)')
+    # double-spend
+    parser.add_argument('--attack-blocks', default=2, type=int, help='double-spend: 공격자가 비밀 체인에 쌓는 블록 수')
+    parser.add_argument('--confirmations', default=1, type=int, help='double-spend: 상점이 지불을 확인하는 블록 수')
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"결과를 {args.output}에 저장했습니다.")
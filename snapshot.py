@@ -0,0 +1,115 @@
+"""
+상태 스냅샷과 빠른 동기화(fast sync).
+
+스냅샷은 어느 높이에서의 헤더 체인(거래 내역 제외)과 주소별 잔액 상태, 그리고 그 값들의 해시(commitment)입니다.
+새 노드는 제네시스부터 모든 블록을 받아 검증하는 대신 다음 순서로 시작합니다.
+    1. 이웃(또는 파일)의 스냅샷을 받아 헤더의 해시 연결과 작업 증명을 확인하고, 잔액 상태를 그대로 씁니다.
+    2. 스냅샷 높이 이후의 최근 블록만 기존 동기화(resolve_conflicts)로 받아 검증합니다.
+    3. 백그라운드에서 과거 블록의 거래 내역을 받아 제네시스부터 잔액을 다시 계산하고,
+       스냅샷의 잔액과 같은지(commitment) 확인합니다. 이때까지는 스냅샷의 잔액을 믿고 쓰는 셈입니다.
+헤더는 작업 증명으로 위조 비용이 보장되지만 잔액은 그렇지 않으므로, 믿을 수 있는 commitment를 알고 있다면
+--snapshot-hash 로 지정해 다른 스냅샷은 받지 않도록 할 수 있습니다.
+"""
+import hashlib
+import json
+import os
+from time import time
+
+from block import HeaderBlock
+
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def commitment(snapshot):
+    """스냅샷의 높이, 마지막 블록 해시, 잔액 상태에 대한 sha256 (헤더는 마지막 블록 해시로 이어져 있으므로 따로 넣지 않음)"""
+    committed = {
+        'version': snapshot['version'],
+        'height': snapshot['height'],
+        'tip_hash': snapshot['tip_hash'],
+        'balances': snapshot['balances']
+    }
+    return hashlib.sha256(json.dumps(committed, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def make_snapshot(chain, state):
+    """
+    체인의 헤더와 잔액 상태로 스냅샷 dict를 만듭니다. (잔액 상태는 체인 끝까지 적용된 상태여야 함)
+    체인 길이에 비례하는 작업이므로, 노드는 체인 잠금 안에서 잡아 둔 체인의 앞부분과 잔액 사본으로 잠금 밖에서 만듭니다.
+    """
+    if state.height != chain[-1]['index'] or state.tip_hash is None:
+        raise SnapshotError('잔액 상태가 체인 끝과 맞지 않아 스냅샷을 만들 수 없습니다.')
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'height': state.height,
+        'tip_hash': state.tip_hash,
+        # block.items()는 거래 내역까지 읽으므로(StoredBlock은 로그 파일에서) 헤더 필드만 골라 읽습니다.
+        'headers': [{key: block[key] for key in block if key != 'transactions'} for block in chain],
+        'balances': dict(state.balances),
+        'created_at': time()
+    }
+    snapshot['commitment'] = commitment(snapshot)
+    return snapshot
+
+
+def snapshot_info(snapshot):
+    """헤더와 잔액을 뺀 요약 (/snapshot/info)"""
+    return {key: snapshot[key] for key in ('version', 'height', 'tip_hash', 'commitment', 'created_at')}
+
+
+def verify_snapshot(snapshot, genesis, valid_proof, expected_commitment=None):
+    """
+    스냅샷을 검증하고 체인(제네시스 + HeaderBlock 목록)을 반환합니다. 잘못된 스냅샷이면 SnapshotError.
+    - commitment가 높이, 마지막 블록 해시, 잔액과 맞는지 (expected_commitment가 있으면 그 값과도 같은지)
+    - 첫 헤더가 제네시스 블록인지, 블록 번호, 이전 블록 해시, 작업 증명(valid_proof)이 이어지는지
+    - 마지막 헤더의 해시가 tip_hash인지
+    """
+    try:
+        if snapshot['version'] != SNAPSHOT_VERSION:
+            raise SnapshotError(f"지원하지 않는 스냅샷 버전입니다: {snapshot['version']}")
+        if commitment(snapshot) != snapshot['commitment']:
+            raise SnapshotError('스냅샷의 commitment가 내용과 맞지 않습니다.')
+        if expected_commitment is not None and snapshot['commitment'] != expected_commitment:
+            raise SnapshotError(f"스냅샷의 commitment가 지정한 값과 다릅니다: {snapshot['commitment']}")
+        headers = snapshot['headers']
+        if not headers or len(headers) != snapshot['height']:
+            raise SnapshotError('스냅샷의 헤더 수가 높이와 맞지 않습니다.')
+        if HeaderBlock.from_header(headers[0]).hash != genesis.hash:
+            raise SnapshotError('스냅샷의 0번 블록이 제네시스 블록과 다릅니다.')
+        chain = [genesis]
+        for header in headers[1:]:
+            block = HeaderBlock.from_header(header)
+            previous_block = chain[-1]
+            if block.index != previous_block['index'] + 1 or block.previous_hash != previous_block.hash:
+                raise SnapshotError(f'스냅샷의 헤더 #{block.index}이(가) 이전 블록과 이어지지 않습니다.')
+            if not valid_proof(previous_block['proof'], block.proof):
+                raise SnapshotError(f'스냅샷의 헤더 #{block.index}의 작업 증명이 유효하지 않습니다.')
+            chain.append(block)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise SnapshotError(f'스냅샷 형식이 올바르지 않습니다. ({e!r})') from e
+    if chain[-1].hash != snapshot['tip_hash']:
+        raise SnapshotError('스냅샷의 마지막 헤더 해시가 tip_hash와 다릅니다.')
+    return chain
+
+
+def save_snapshot(snapshot, path):
+    """임시 파일에 쓴 뒤 교체하여, 읽는 쪽이 쓰다 만 파일을 보지 않도록 합니다."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """스냅샷 파일을 읽습니다. (검증은 verify_snapshot) 읽을 수 없으면 SnapshotError"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f'스냅샷 파일을 읽을 수 없습니다: {path} ({e})') from e
+    if not isinstance(snapshot, dict):
+        raise SnapshotError(f'스냅샷 파일 형식이 올바르지 않습니다: {path}')
+    return snapshot
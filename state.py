@@ -0,0 +1,247 @@
+import json
+import math
+import os
+from numbers import Real
+
+# 채굴 보상 거래의 sender (잔액 없이 새 코인을 만들어 냄)
+COINBASE_SENDER = '0'
+
+# 블록마다 채굴자가 받는 보상 (블록의 마지막 거래)
+BLOCK_REWARD = 1
+
+# 거래에 반드시 있어야 하는 필드
+REQUIRED_TRANSACTION_FIELDS = ('sender', 'recipient', 'amount', 'time')
+
+
+class InvalidTransactionError(ValueError):
+    pass
+
+
+def is_finite_number(value):
+    """유한한 실수인지 (bool, NaN, ±inf는 아님). NaN은 어떤 비교도 거짓이라 잔액 검사를 그대로 통과하므로 막아야 합니다."""
+    return isinstance(value, Real) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def transaction_amount(tx):
+    """거래 금액. 유한한 숫자가 아니면 None"""
+    amount = tx.get('amount')
+    return amount if is_finite_number(amount) else None
+
+
+def transaction_fee(tx):
+    """거래 수수료 (없으면 0). 0 이상의 유한한 숫자가 아니면 None"""
+    fee = tx.get('fee', 0)
+    return fee if is_finite_number(fee) and fee >= 0 else None
+
+
+def transaction_cost(tx):
+    """송신자가 내는 금액 (거래 금액 + 수수료). 수수료는 그 블록을 만든 채굴자가 받습니다."""
+    return (transaction_amount(tx) or 0) + (transaction_fee(tx) or 0)
+
+
+def block_fees(transactions):
+    """거래 목록의 수수료 합계 (채굴 보상 거래 제외). 블록을 만드는 쪽과 검증하는 쪽이 같은 순서로 더합니다."""
+    return sum(transaction_fee(tx) or 0 for tx in transactions if not is_coinbase(tx))
+
+
+def is_coinbase(tx):
+    return str(tx.get('sender')) == COINBASE_SENDER
+
+
+def check_block_transactions(transactions):
+    """
+    블록의 거래 목록이 형식(필수 필드가 있는 dict, 올바른 수수료)과 채굴 보상 규칙(check_coinbase)에 맞는지 확인합니다.
+    이웃이 보낸 블록은 잔액을 계산하기 전에 이 검사를 거쳐야 합니다. 맞지 않으면 InvalidTransactionError.
+    """
+    for position, tx in enumerate(transactions):
+        if not isinstance(tx, dict) or not all(key in tx for key in REQUIRED_TRANSACTION_FIELDS):
+            raise InvalidTransactionError(f"{position}번째 거래의 형식이 올바르지 않습니다. (필수 값: {', '.join(REQUIRED_TRANSACTION_FIELDS)})")
+        if transaction_fee(tx) is None:
+            raise InvalidTransactionError(f"{position}번째 거래의 수수료가 올바르지 않습니다: {tx.get('fee')!r}")
+    check_coinbase(transactions)
+
+
+def check_coinbase(transactions):
+    """
+    블록의 채굴 보상 규칙을 확인합니다. 채굴 보상 거래는 블록마다 정확히 하나, 마지막 거래이며
+    금액은 BLOCK_REWARD + 블록에 담긴 거래의 수수료 합계(block_fees)입니다.
+    (그렇지 않으면 블록을 만드는 쪽이 원하는 만큼 코인을 만들어 낼 수 있음) 맞지 않으면 InvalidTransactionError.
+    """
+    if not transactions or not is_coinbase(transactions[-1]):
+        raise InvalidTransactionError('블록의 마지막 거래가 채굴 보상 거래가 아닙니다.')
+    if any(is_coinbase(tx) for tx in transactions[:-1]):
+        raise InvalidTransactionError('채굴 보상 거래는 블록에 하나만, 마지막 거래로만 넣을 수 있습니다.')
+    reward = BLOCK_REWARD + block_fees(transactions[:-1])
+    if transaction_amount(transactions[-1]) != reward:
+        raise InvalidTransactionError(f"채굴 보상 금액은 {reward}(보상 {BLOCK_REWARD} + 수수료)이어야 합니다: {transactions[-1].get('amount')!r}")
+
+
+class AccountState:
+    """
+    주소별 잔액 상태. 블록을 하나 적용할 때마다 바뀐 주소의 이전 잔액을 되돌리기 기록(undo log)에
+    남겨 두므로, 체인이 교체될 때 fork 지점까지 블록 단위로 싸게 되돌릴 수 있습니다.
+    undo_depth보다 깊은 fork는 체인을 처음부터 다시 적용해 복구합니다.
+    """
+
+    def __init__(self, undo_depth=1000):
+        self.undo_depth = undo_depth
+        self.balances = {}
+        self.height = 0      # 마지막으로 적용한 블록 번호
+        self.tip_hash = None
+        self.undo_log = []   # [(블록 번호, 이전 tip_hash, {주소: 이전 잔액 또는 None})]
+
+    def balance(self, address):
+        return self.balances.get(str(address), 0)
+
+    def check_transaction(self, tx, pending_spent=0):
+        """
+        거래 하나가 현재 잔액으로 가능한지 확인합니다. 송신자는 거래 금액과 수수료를 함께 냅니다.
+        pending_spent는 같은 송신자가 이미 대기 중인 거래로 쓰기로 한 금액입니다. 불가능하면 InvalidTransactionError를 던집니다.
+        """
+        amount = transaction_amount(tx)
+        if amount is None or amount <= 0:
+            raise InvalidTransactionError(f"거래 금액이 올바르지 않습니다: {tx.get('amount')!r}")
+        if transaction_fee(tx) is None:
+            raise InvalidTransactionError(f"거래 수수료가 올바르지 않습니다: {tx.get('fee')!r}")
+        if is_coinbase(tx):
+            return
+        available = self.balance(tx['sender']) - pending_spent
+        cost = transaction_cost(tx)
+        if available < cost:
+            raise InvalidTransactionError(f"잔액 부족: {tx['sender']}의 사용 가능 잔액 {available}, 거래 금액(수수료 포함) {cost}")
+
+    def select_valid(self, transactions):
+        """
+        거래들을 순서대로 적용해 보며 잔액이 부족한 거래를 걸러낸 목록을 반환합니다. (상태는 바뀌지 않음)
+        채굴 보상 거래는 블록을 만들 때 따로 붙이므로 걸러냅니다.
+        """
+        spent = {}
+        received = {}
+        valid = []
+        for tx in transactions:
+            if is_coinbase(tx):
+                continue
+            sender = str(tx.get('sender'))
+            try:
+                self.check_transaction(tx, spent.get(sender, 0) - received.get(sender, 0))
+            except InvalidTransactionError:
+                continue
+            spent[sender] = spent.get(sender, 0) + transaction_cost(tx)
+            recipient = str(tx.get('recipient'))
+            received[recipient] = received.get(recipient, 0) + transaction_amount(tx)
+            valid.append(tx)
+        return valid
+
+    def apply_block(self, block, block_hash, validate=True):
+        """
+        블록의 거래를 잔액에 반영합니다. validate가 True면 거래 형식이나 채굴 보상 규칙(check_block_transactions)에 맞지 않거나
+        잔액이 부족한 거래가 하나라도 있을 때 아무것도 바꾸지 않고 InvalidTransactionError를 던집니다.
+        """
+        previous = {}
+        try:
+            if validate:
+                check_block_transactions(block['transactions'])
+            for tx in block['transactions']:
+                if validate:
+                    self.check_transaction(tx)
+                if not is_coinbase(tx):
+                    self._add(str(tx.get('sender')), -transaction_cost(tx), previous)
+                self._add(str(tx.get('recipient')), transaction_amount(tx) or 0, previous)
+        except InvalidTransactionError as e:
+            self._restore(previous)
+            raise InvalidTransactionError(f"블록 #{block['index']}: {e}") from e
+        self.undo_log.append((self.height, self.tip_hash, previous))
+        if len(self.undo_log) > self.undo_depth:
+            del self.undo_log[0]
+        self.height = block['index']
+        self.tip_hash = block_hash
+
+    def revert_block(self):
+        """마지막으로 적용한 블록을 되돌립니다."""
+        height, tip_hash, previous = self.undo_log.pop()
+        self._restore(previous)
+        self.height = height
+        self.tip_hash = tip_hash
+
+    def can_rollback_to(self, length):
+        return self.height - length <= len(self.undo_log)
+
+    def rollback_to(self, length):
+        while self.height > length:
+            self.revert_block()
+
+    def rebuild(self, chain, hash_fn):
+        """체인 전체를 처음부터 다시 적용합니다. (이미 검증된 로컬 체인이므로 잔액 검사는 생략)"""
+        self.balances = {}
+        self.undo_log = []
+        self.height = 0
+        self.tip_hash = None
+        for block in chain:
+            self.apply_block(block, hash_fn(block), validate=False)
+
+    def reorg(self, chain, fork_length, new_blocks, hash_fn):
+        """
+        fork 지점(fork_length)까지 되돌린 뒤 new_blocks를 검증하며 적용합니다.
+        new_blocks에 잔액이 부족한 거래가 있으면 원래 체인(chain) 상태로 복구하고 예외를 다시 던집니다.
+        """
+        old_blocks = chain[fork_length:]
+        self._rewind(chain, fork_length, hash_fn)
+        try:
+            for block in new_blocks:
+                self.apply_block(block, hash_fn(block))
+        except InvalidTransactionError:
+            self._rewind(chain, fork_length, hash_fn)
+            for block in old_blocks:
+                self.apply_block(block, hash_fn(block), validate=False)
+            raise
+
+    def _rewind(self, chain, fork_length, hash_fn):
+        if self.can_rollback_to(fork_length):
+            self.rollback_to(fork_length)
+        else:
+            self.rebuild(chain[:fork_length], hash_fn)
+
+    def _add(self, address, delta, previous):
+        if address not in previous:
+            previous[address] = self.balances.get(address)
+        self.balances[address] = self.balances.get(address, 0) + delta
+
+    def _restore(self, previous):
+        for address, balance in previous.items():
+            if balance is None:
+                self.balances.pop(address, None)
+            else:
+                self.balances[address] = balance
+
+    def restore(self, balances, height, tip_hash):
+        """저장된(또는 스냅샷으로 받은) 잔액 상태로 바꿉니다. 그 이전 블록은 되돌릴 수 없으므로 되돌리기 기록은 비웁니다."""
+        self.balances = dict(balances)
+        self.height = height
+        self.tip_hash = tip_hash
+        self.undo_log = []
+
+    def save(self, path):
+        """잔액 상태를 파일로 저장합니다. (다음 시작 시 체인 전체를 다시 적용하지 않도록)"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'height': self.height, 'tip_hash': self.tip_hash, 'balances': self.balances}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path, chain, hash_fn):
+        """
+        저장된 잔액 상태가 체인과 맞으면 불러와서 그 이후 블록만 적용하고, 아니면 처음부터 다시 만듭니다.
+        새로 적용한 블록 수를 반환합니다.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            height = saved['height']
+            if not (0 < height <= len(chain) and hash_fn(chain[height - 1]) == saved['tip_hash']):
+                raise ValueError('체인과 맞지 않는 잔액 상태')
+        except (OSError, ValueError, KeyError):
+            self.rebuild(chain, hash_fn)
+            return len(chain)
+        self.restore(saved['balances'], height, saved['tip_hash'])
+        for block in chain[height:]:
+            self.apply_block(block, hash_fn(block), validate=False)
+        return len(chain) - height
@@ -0,0 +1,76 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from block import Block  # noqa: E402
+from blockchain_node_v3 import Blockchain  # noqa: E402
+from merkle import CURRENT_BLOCK_VERSION, compute_merkle_root  # noqa: E402
+from miner import difficulty_to_target  # noqa: E402
+from state import BLOCK_REWARD, block_fees  # noqa: E402
+
+PORT = 5999
+
+_times = itertools.count(1)
+
+
+def coinbase(recipient='miner', fees=0):
+    # 거래 ID가 블록마다 달라지도록 time을 하나씩 늘립니다.
+    return {'sender': '0', 'recipient': recipient, 'amount': BLOCK_REWARD + fees, 'time': float(next(_times))}
+
+
+def payment(sender, recipient, amount, **extra):
+    return dict({'sender': sender, 'recipient': recipient, 'amount': amount, 'time': float(next(_times))}, **extra)
+
+
+@pytest.fixture
+def blockchain():
+    """작업 증명 난이도를 낮춘 새 체인 (채굴은 프로세스 풀 없이 현재 프로세스에서)"""
+    chain = Blockchain()
+    chain.set_pow_target(difficulty_to_target(1), workers=1)
+    return chain
+
+
+@pytest.fixture
+def make_block(blockchain):
+    """parent 뒤에 오는 유효한 블록을 만듭니다. (수수료를 더한 채굴 보상 거래는 끝에 자동으로 붙음)"""
+    def make(parent, transactions=(), miner='miner', version=CURRENT_BLOCK_VERSION):
+        transactions = list(transactions) + [coinbase(miner, block_fees(transactions))]
+        return Block(
+            parent['index'] + 1,
+            float(next(_times)),
+            transactions,
+            blockchain.proof_of_work(parent['proof']),
+            blockchain.hash(parent),
+            compute_merkle_root(transactions, version),
+            version
+        )
+    return make
+
+
+def reload(monkeypatch, tmp_path, **attributes):
+    """블록 로그를 새 노드로 다시 읽고, validate_chain이 어디서부터 검증했는지 함께 돌려줍니다."""
+    monkeypatch.chdir(tmp_path)
+    chain = Blockchain()
+    chain.set_pow_target(difficulty_to_target(1), workers=1)
+    for name, value in attributes.items():
+        setattr(chain, name, value)
+    validated = []
+    original = chain.validate_chain
+    monkeypatch.setattr(chain, 'validate_chain', lambda blocks, start=1: validated.append(start) or original(blocks, start))
+    chain.load_chain(PORT)
+    return chain, validated
+
+
+def build_log(monkeypatch, tmp_path, blockchain, make_block, count):
+    """블록 count개짜리 로그를 만들고 닫은 뒤 블록 해시 목록을 돌려줍니다."""
+    monkeypatch.chdir(tmp_path)
+    blockchain.load_chain(PORT)
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    for _ in range(count - 1):
+        blockchain.append_block(make_block(blockchain.last_block, [payment('alice', 'bob', 0.01)]))
+    blockchain.store.close()
+    return [blockchain.hash(block) for block in blockchain.chain]
@@ -0,0 +1,24 @@
+import pytest
+
+import blockchain_node_v3
+from blockchain_node_v3 import app
+
+
+@pytest.fixture
+def client(monkeypatch, blockchain):
+    monkeypatch.setattr(blockchain_node_v3, 'blockchain', blockchain)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path, key, constant', [
+    ('/chain/headers', 'headers', 'MAX_HEADERS_PER_REQUEST'),
+    ('/chain/blocks', 'blocks', 'MAX_BLOCKS_PER_REQUEST'),
+])
+@pytest.mark.parametrize('limit, expected', [(-1, 1), (0, 1), (3, 3), (10 ** 9, 5)])
+def test_chain_pages_clamp_limit(monkeypatch, client, blockchain, make_block, path, key, constant, limit, expected):
+    monkeypatch.setattr(blockchain_node_v3, constant, 5)
+    for _ in range(10):
+        blockchain.append_block(make_block(blockchain.last_block))
+    response = client.get(path, query_string={'from': 1, 'limit': limit}, headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    assert len(response.get_json()[key]) == expected
@@ -0,0 +1,112 @@
+import json
+import os
+import zlib
+
+import pytest
+
+import blockchain_node_v3
+from block import Block
+from block_store import RECORD_HEADER, BlockStore, StaleBlockError, StoredBlock
+from blockchain_node_v3 import Blockchain, app
+from conftest import PORT, build_log, reload
+
+
+def test_truncated_tail_is_recovered(monkeypatch, tmp_path, blockchain, make_block):
+    hashes = build_log(monkeypatch, tmp_path, blockchain, make_block, 5)
+    log_path = tmp_path / f'blockchain_{PORT}.log'
+    with open(log_path, 'r+b') as f:
+        f.truncate(os.path.getsize(log_path) - 3)
+    store = BlockStore(str(log_path))
+    blocks = store.open()
+    assert store.recovered_bytes > 0
+    assert [block.hash for block in blocks] == hashes[:-1]
+    store.close()
+
+
+def test_zero_filled_tail_is_recovered(monkeypatch, tmp_path, blockchain, make_block):
+    hashes = build_log(monkeypatch, tmp_path, blockchain, make_block, 5)
+    log_path = tmp_path / f'blockchain_{PORT}.log'
+    size = os.path.getsize(log_path)
+    with open(log_path, 'ab') as f:
+        f.write(bytes(4096))
+    store = BlockStore(str(log_path))
+    assert [block.hash for block in store.open()] == hashes
+    assert os.path.getsize(log_path) == size
+    store.close()
+
+
+@pytest.mark.parametrize('fix_crc', [False, True])
+def test_corrupt_record_mid_log_is_not_truncated(monkeypatch, tmp_path, blockchain, make_block, fix_crc):
+    build_log(monkeypatch, tmp_path, blockchain, make_block, 5)
+    log_path = tmp_path / f'blockchain_{PORT}.log'
+    store = BlockStore(str(log_path))
+    store.open()
+    offset = store.offsets[2]
+    store.close()
+    size = os.path.getsize(log_path)
+    with open(log_path, 'r+b') as f:
+        f.seek(offset)
+        length, _ = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+        garbage = b'\xff' * length
+        f.seek(offset)
+        # crc까지 맞추면 crc는 통과하지만 블록으로 읽을 수 없는 레코드가 됩니다.
+        f.write(RECORD_HEADER.pack(length, zlib.crc32(garbage) if fix_crc else 0) + garbage)
+    with pytest.raises(ValueError):
+        BlockStore(str(log_path)).open()
+    assert os.path.getsize(log_path) == size
+
+
+def test_stored_blocks_read_bodies_lazily(monkeypatch, tmp_path, blockchain, make_block):
+    build_log(monkeypatch, tmp_path, blockchain, make_block, 8)
+    chain, _ = reload(monkeypatch, tmp_path, block_cache_size=2)
+    assert all(isinstance(block, StoredBlock) for block in chain.chain)
+    misses = chain.store.cache_misses
+    assert [block['transactions'] for block in chain.chain] == [block['transactions'] for block in blockchain.chain]
+    assert chain.store.cache_misses > misses
+    chain.store.close()
+
+
+def reorged_chain(monkeypatch, tmp_path, blockchain, make_block):
+    """블록 로그가 있는 체인을 끝에서 두 블록 앞부터 재구성하고, 재구성 전의 체인 리스트를 함께 돌려줍니다."""
+    build_log(monkeypatch, tmp_path, blockchain, make_block, 6)
+    chain, _ = reload(monkeypatch, tmp_path, block_cache_size=1)
+    old = chain.chain
+    fork = [make_block(old[-3], miner='other')]
+    for _ in range(2):
+        fork.append(make_block(fork[-1], miner='other'))
+    assert chain.replace_chain(old[:-2] + fork)
+    for block in old[:3]:
+        block['transactions']  # 캐시에서 재구성 전 블록을 밀어냅니다.
+    return chain, old
+
+
+def test_stale_block_after_reorg_raises(monkeypatch, tmp_path, blockchain, make_block):
+    chain, old = reorged_chain(monkeypatch, tmp_path, blockchain, make_block)
+    with pytest.raises(StaleBlockError):
+        old[-1]['transactions']
+    chain.store.close()
+
+
+@pytest.mark.parametrize('query', [{}, {'format': 'ndjson'}])
+def test_chain_route_retries_stale_read(monkeypatch, tmp_path, blockchain, make_block, query):
+    chain, old = reorged_chain(monkeypatch, tmp_path, blockchain, make_block)
+    reads = []
+
+    def chain_list(self):
+        # 첫 번째 조회는 재구성 전의 체인 리스트를 붙잡고 있던 요청처럼 동작합니다.
+        reads.append(None)
+        return old if len(reads) == 1 else self.__dict__['chain']
+    monkeypatch.setattr(Blockchain, 'chain', property(chain_list), raising=False)
+    monkeypatch.setattr(blockchain_node_v3, 'blockchain', chain)
+    response = app.test_client().get('/chain', query_string=query)
+    assert response.status_code == 200
+    current = chain.__dict__['chain']
+    if query:
+        # 스트리밍은 시작할 때의 길이만큼, 거래 내역을 읽지 못한 자리부터는 바뀐 체인의 블록으로 보냅니다.
+        blocks = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(blocks) == len(old)
+        assert Block.from_dict(blocks[-1]).hash == current[len(old) - 1].hash
+    else:
+        blocks = response.get_json()['chain']
+        assert [Block.from_dict(block).hash for block in blocks] == [block.hash for block in current]
+    chain.store.close()
@@ -0,0 +1,21 @@
+import pytest
+
+from chain_index import ChainIndex
+from conftest import payment
+from mempool import transaction_id
+from state import InvalidTransactionError
+
+
+def test_duplicate_txid_is_rejected_not_overwritten(tmp_path, blockchain, make_block):
+    index = ChainIndex(str(tmp_path / 'index.db'))
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    replayed = payment('alice', 'bob', 0.5)
+    first = make_block(blockchain.last_block, [replayed])
+    blockchain.append_block(first)
+    index.sync(blockchain.chain, blockchain.hash)
+    second = make_block(first, [replayed])
+    with pytest.raises(InvalidTransactionError):
+        index.add_block(second, second.hash)
+    assert index.transaction_location(transaction_id(replayed)) == (first['index'], 0)
+    assert index.tip() == (first['index'], first.hash)
+    index.close()
@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+
+from conftest import PORT, build_log, coinbase, reload
+
+
+def test_reload_trusts_checkpoint(monkeypatch, tmp_path, blockchain, make_block):
+    hashes = build_log(monkeypatch, tmp_path, blockchain, make_block, 20)
+    chain, validated = reload(monkeypatch, tmp_path)
+    assert [chain.hash(block) for block in chain.chain] == hashes
+    # 체크포인트까지(마지막 블록까지 flush됨)는 다시 검증하지 않습니다.
+    assert validated == [len(hashes)]
+    chain.store.close()
+
+
+def test_reload_with_mismatching_checkpoint_verifies_everything(monkeypatch, tmp_path, blockchain, make_block):
+    hashes = build_log(monkeypatch, tmp_path, blockchain, make_block, 10)
+    with open(f'blockchain_{PORT}.ckpt', 'w') as f:
+        f.write('{"length": 10, "tip_hash": "' + '0' * 64 + '"}')
+    chain, validated = reload(monkeypatch, tmp_path)
+    assert validated == [1]
+    assert [chain.hash(block) for block in chain.chain] == hashes
+    chain.store.close()
+
+
+def test_full_verify_ignores_checkpoint(monkeypatch, tmp_path, blockchain, make_block):
+    build_log(monkeypatch, tmp_path, blockchain, make_block, 5)
+    chain, validated = reload(monkeypatch, tmp_path, full_verify=True)
+    assert validated == [1]
+    chain.store.close()
+
+
+def test_imported_chain_is_not_trusted(monkeypatch, tmp_path, blockchain, make_block):
+    monkeypatch.chdir(tmp_path)
+    # 작업 증명과 merkle_root는 맞지만 채굴 보상을 1000으로 부풀린 블록
+    forged = make_block(blockchain.last_block, [dict(coinbase('mallory'), amount=1000)])
+    with open(f'blockchain_{PORT}.json', 'w') as f:
+        json.dump([dict(block) for block in blockchain.chain + [forged]], f)
+    for _ in range(2):
+        with pytest.raises(SystemExit):
+            reload(monkeypatch, tmp_path)
+        assert not os.path.exists(f'blockchain_{PORT}.ckpt')
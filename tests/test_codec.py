@@ -0,0 +1,48 @@
+import pytest
+
+from block import Block
+from codec import CodecError, decode_block, decode_header, encode_block
+from merkle import BINARY_HEADER_VERSION, MERKLE_VERSION, compute_merkle_root
+
+TRANSACTIONS = [
+    {'sender': 'alice', 'recipient': 'bob', 'amount': 2.5, 'time': 1500000000.25, 'fee': 0.01},
+    {'sender': 'bob', 'recipient': 'carol', 'amount': 1, 'time': 1500000001.0, 'memo': '한글 메모'},
+    {'sender': '0', 'recipient': 'miner', 'amount': 1, 'time': 1500000002.0},
+]
+
+
+def make_block(version):
+    return Block(7, 1500000003.5, TRANSACTIONS, 123456, 'ab' * 32, compute_merkle_root(TRANSACTIONS, version), version)
+
+
+@pytest.mark.parametrize('version', [MERKLE_VERSION, BINARY_HEADER_VERSION])
+def test_round_trip(version):
+    block = make_block(version)
+    decoded = decode_block(encode_block(block))
+    assert decoded == block.to_dict()
+    assert Block.from_dict(decoded).hash == block.hash
+
+
+def test_v3_uses_fixed_header_and_decode_header_skips_transactions():
+    block = make_block(BINARY_HEADER_VERSION)
+    data = encode_block(block)
+    assert data[:1] == b'\xb3'
+    header = {key: value for key, value in block.to_dict().items() if key != 'transactions'}
+    assert decode_header(data) == header
+
+
+def test_v2_decode_header_drops_transactions():
+    block = make_block(MERKLE_VERSION)
+    assert 'transactions' not in decode_header(encode_block(block))
+
+
+def test_trailing_garbage_is_rejected():
+    with pytest.raises(CodecError):
+        decode_block(encode_block(make_block(BINARY_HEADER_VERSION)) + b'\x00')
+
+
+@pytest.mark.parametrize('version', ['3', 3.0, True, [3]])
+def test_non_integer_version_is_rejected(version):
+    data = dict(make_block(BINARY_HEADER_VERSION).to_dict(), version=version)
+    with pytest.raises(ValueError):
+        Block.from_dict(data)
@@ -0,0 +1,70 @@
+import pytest
+
+from block import Block
+from conftest import payment
+from merkle import compute_merkle_root
+from mempool import transaction_id
+from state import InvalidTransactionError
+
+
+def extend(blockchain, make_block, count, miner='miner'):
+    for _ in range(count):
+        assert blockchain.receive_block(make_block(blockchain.last_block, miner=miner)) == 'extended'
+
+
+def test_side_branch_then_reorg(blockchain, make_block):
+    extend(blockchain, make_block, 1, miner='alice')
+    fork_point = blockchain.last_block
+    payment_to_bob = payment('alice', 'bob', 0.5)
+    main = make_block(fork_point, [payment_to_bob], miner='main')
+    assert blockchain.receive_block(main) == 'extended'
+
+    side = make_block(fork_point, miner='attacker')
+    assert blockchain.receive_block(side) == 'side'
+    assert blockchain.last_block.hash == main.hash
+    assert blockchain.receive_block(side) == 'known'
+
+    # 곁가지가 한 블록 더 길어지면 누적 작업량이 커져서 그 가지로 재구성합니다.
+    assert blockchain.receive_block(make_block(side, miner='attacker')) == 'reorg'
+    assert [blockchain.hash(block) for block in blockchain.chain[2:3]] == [side.hash]
+    assert blockchain.state.balance('bob') == 0
+    assert blockchain.state.balance('attacker') == 2
+    assert blockchain.state.balance('main') == 0
+    # 밀려난 블록의 거래는 대기 목록으로, 밀려난 블록은 곁가지로 돌아갑니다.
+    assert transaction_id(payment_to_bob) in blockchain.mempool
+    assert main.hash in blockchain.tree
+    assert blockchain.positions == {blockchain.hash(block): position for position, block in enumerate(blockchain.chain)}
+
+
+def test_invalid_side_branch_does_not_replace_chain(blockchain, make_block):
+    extend(blockchain, make_block, 1, miner='alice')
+    fork_point = blockchain.last_block
+    extend(blockchain, make_block, 1)
+    tip = blockchain.last_block
+    balances = dict(blockchain.state.balances)
+
+    side = make_block(fork_point, [payment('alice', 'mallory', 5)], miner='mallory')
+    assert blockchain.receive_block(side) == 'side'
+    assert blockchain.receive_block(make_block(side, miner='mallory')) == 'side'
+    assert blockchain.last_block.hash == tip.hash
+    assert blockchain.state.balances == balances
+    assert side.hash not in blockchain.tree
+
+
+def test_orphan_connects_when_parent_arrives(blockchain, make_block):
+    parent = make_block(blockchain.last_block)
+    child = make_block(parent)
+    assert blockchain.receive_block(child) == 'orphan'
+    assert blockchain.receive_block(parent) == 'extended'
+    assert blockchain.last_block.hash == child.hash
+
+
+def test_block_minting_extra_coins_is_rejected(blockchain, make_block):
+    block = make_block(blockchain.last_block)
+    transactions = list(block['transactions'])
+    transactions[-1] = dict(transactions[-1], amount=10 ** 9)
+    forged = Block(block.index, block.timestamp, transactions, block.proof, block.previous_hash,
+                   compute_merkle_root(transactions, block.version), block.version)
+    with pytest.raises(InvalidTransactionError):
+        blockchain.receive_block(forged)
+    assert len(blockchain.chain) == 1
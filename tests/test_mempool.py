@@ -0,0 +1,64 @@
+import pytest
+
+from conftest import coinbase, payment
+from mempool import Mempool
+from state import InvalidTransactionError
+
+
+@pytest.mark.parametrize('extra', [{'time': 'z'}, {'time': float('nan')}, {'fee': 'a'}, {'fee': -1}, {'amount': float('inf')}])
+def test_malformed_transaction_is_rejected(extra):
+    mempool = Mempool()
+    with pytest.raises(InvalidTransactionError):
+        mempool.add(dict(payment('alice', 'bob', 1), **extra))
+    assert len(mempool) == 0
+
+
+def test_block_order_is_fee_then_time():
+    mempool = Mempool()
+    late = payment('alice', 'bob', 1)
+    early_cheap = dict(payment('alice', 'bob', 1), time=0.5)
+    rich = payment('alice', 'bob', 1, fee=0.1)
+    for tx in (late, early_cheap, rich):
+        mempool.add(tx)
+    assert mempool.select() == [rich, early_cheap, late]
+
+
+def test_new_transactions_reports_bad_fields_per_transaction(blockchain, make_block):
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    results = blockchain.new_transactions([
+        payment('alice', 'bob', 0.1, time='z'),
+        payment('alice', 'bob', 0.1, fee='a'),
+        payment('alice', 'bob', float('nan')),
+        {'sender': '0', 'recipient': 'evil', 'amount': 10 ** 9, 'time': 1.0},
+        payment('alice', 'bob', 0.1),
+    ])
+    assert [txid is not None for txid, _ in results] == [False, False, False, False, True]
+    assert all(error for _, error in results[:4])
+
+
+def test_pending_spend_includes_fee(blockchain, make_block):
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    assert blockchain.new_transaction(payment('alice', 'bob', 0.5, fee=0.25)) is not None
+    with pytest.raises(InvalidTransactionError):
+        blockchain.new_transaction(payment('alice', 'carol', 0.5))
+
+
+def test_new_block_pays_fees_to_miner(blockchain, make_block):
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    blockchain.new_transaction(payment('alice', 'bob', 0.5, fee=0.25))
+    block = blockchain.new_block(blockchain.proof_of_work(blockchain.last_block['proof']), reward_transaction=coinbase('carol'))
+    assert block['transactions'][-1]['amount'] == 1.25
+    assert [blockchain.state.balance(address) for address in ('alice', 'bob', 'carol')] == [0.25, 0.5, 1.25]
+
+
+def test_failed_new_block_keeps_transactions(monkeypatch, blockchain, make_block):
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    blockchain.new_transaction(payment('alice', 'bob', 0.5))
+
+    def fail(block):
+        raise OSError('disk full')
+    monkeypatch.setattr(blockchain, 'append_block', fail)
+    with pytest.raises(OSError):
+        blockchain.new_block(blockchain.proof_of_work(blockchain.last_block['proof']), reward_transaction=coinbase())
+    assert len(blockchain.mempool) == 1
+    assert blockchain.mempool.spent_by('alice') == 0.5
@@ -0,0 +1,59 @@
+import pytest
+
+from block import Block
+from conftest import coinbase, payment
+from mempool import transaction_id
+from merkle import MerkleTree, legacy_root, verify_proof
+
+
+@pytest.mark.parametrize('size', range(1, 10))
+def test_every_transaction_has_a_valid_proof(size):
+    transactions = [payment('alice', f'user-{i}', 1) for i in range(size)]
+    tree = MerkleTree.from_transactions(transactions)
+    for tx in transactions:
+        txid = transaction_id(tx)
+        assert verify_proof(txid, tree.proof(txid), tree.root)
+
+
+def test_proof_does_not_verify_other_transaction_or_root():
+    transactions = [payment('alice', f'user-{i}', 1) for i in range(5)]
+    tree = MerkleTree.from_transactions(transactions)
+    txid = transaction_id(transactions[0])
+    other = transaction_id(transactions[1])
+    assert not verify_proof(other, tree.proof(txid), tree.root)
+    assert not verify_proof(txid, tree.proof(txid), MerkleTree.from_transactions(transactions[:4]).root)
+    assert tree.proof(transaction_id(payment('mallory', 'x', 1))) is None
+
+
+def test_duplicated_last_transaction_keeps_root_but_block_is_rejected(blockchain, make_block):
+    honest = make_block(blockchain.last_block, [payment('alice', 'bob', 1), payment('alice', 'carol', 1)])
+    transactions = list(honest['transactions'])
+    mutated = Block.from_dict(dict(honest.to_dict(), transactions=transactions + [transactions[-1]]))
+    # 홀수 층의 마지막 노드를 복제하므로 루트와 블록 해시가 같습니다. (CVE-2012-2459)
+    assert MerkleTree.from_transactions(mutated['transactions']).root == honest['merkle_root']
+    assert mutated.hash == honest.hash
+    assert MerkleTree.from_transactions(mutated['transactions']).has_duplicates
+    assert blockchain.valid_merkle_root(honest)
+    assert not blockchain.valid_merkle_root(mutated)
+
+
+def test_mutated_orphan_does_not_hide_honest_block(blockchain, make_block):
+    parent = make_block(blockchain.last_block)
+    child = make_block(parent, [payment('miner', 'carol', 0.1), payment('miner', 'bob', 0.2)])
+    transactions = list(child['transactions'])
+    mutated = Block.from_dict(dict(child.to_dict(), transactions=transactions + [transactions[-1]]))
+    assert mutated.hash == child.hash
+    # 부모를 모르는 고아 블록이라도 변조된 본문은 보관하지 않아야, 같은 해시의 정상 블록을 'known'으로 버리지 않습니다.
+    with pytest.raises(ValueError):
+        blockchain.receive_block(mutated)
+    assert blockchain.receive_block(child) == 'orphan'
+    assert blockchain.receive_block(parent) == 'extended'
+    assert blockchain.last_block.hash == child.hash
+    assert blockchain.state.balance('carol') == 0.1
+
+
+def test_legacy_block_with_duplicate_transactions_is_rejected(blockchain):
+    tx = payment('alice', 'bob', 1)
+    transactions = [tx, tx, coinbase()]
+    block = {'index': 2, 'timestamp': 1.0, 'transactions': transactions, 'proof': 0, 'previous_hash': 'x', 'merkle_root': legacy_root(transactions)}
+    assert not blockchain.valid_merkle_root(block)
@@ -0,0 +1,78 @@
+import pytest
+
+from blockchain_node_v3 import Blockchain
+from chain_index import ChainIndex
+from conftest import payment
+from mempool import transaction_id
+from network import TransactionRelay
+from snapshot import make_snapshot
+from state import InvalidTransactionError
+
+
+@pytest.fixture(params=['scan', 'index'])
+def funded(request, tmp_path, blockchain, make_block):
+    """alice가 채굴 보상을 받고 bob에게 0.5를 보낸 거래(paid)가 담긴 체인. 색인이 있을 때와 없을 때 모두 시험합니다."""
+    if request.param == 'index':
+        blockchain.index = ChainIndex(str(tmp_path / 'index.db'))
+        blockchain.index.sync(blockchain.chain, blockchain.hash)
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    fork_point = blockchain.last_block
+    paid = payment('alice', 'bob', 0.5)
+    blockchain.append_block(make_block(fork_point, [paid]))
+    yield blockchain, fork_point, paid
+    if blockchain.index:
+        blockchain.index.close()
+
+
+def test_mined_transaction_cannot_be_resubmitted(funded):
+    blockchain, _, paid = funded
+    with pytest.raises(InvalidTransactionError):
+        blockchain.new_transaction(dict(paid, propagated=True))
+    assert len(blockchain.mempool) == 0
+
+
+def test_block_replaying_confirmed_transaction_is_rejected(funded, make_block):
+    blockchain, _, paid = funded
+    length = len(blockchain.chain)
+    with pytest.raises(InvalidTransactionError):
+        blockchain.receive_block(make_block(blockchain.last_block, [paid]))
+    assert len(blockchain.chain) == length
+    assert (blockchain.state.balance('alice'), blockchain.state.balance('bob')) == (0.5, 0.5)
+
+
+def test_reorg_replaying_transaction_is_rejected(funded, make_block):
+    blockchain, fork_point, paid = funded
+    main_tip = blockchain.last_block
+    # 같은 거래를 곁가지에서 두 번 담으면, 가지 안에서 겹치므로 재구성하지 않습니다.
+    first = make_block(fork_point, [paid], miner='attacker')
+    second = make_block(first, [paid], miner='attacker')
+    assert not blockchain.replace_chain(blockchain.chain[:2] + [first, second])
+    # fork 지점 이전에 담긴 거래를 다시 담은 가지도 마찬가지입니다.
+    replay = make_block(main_tip, [paid], miner='attacker')
+    assert not blockchain.replace_chain(blockchain.chain + [replay, make_block(replay, miner='attacker')])
+    assert blockchain.last_block.hash == main_tip.hash
+    assert (blockchain.state.balance('alice'), blockchain.state.balance('bob')) == (0.5, 0.5)
+
+
+def test_validate_chain_rejects_replayed_transaction(funded, make_block):
+    blockchain, _, paid = funded
+    replay = make_block(blockchain.last_block, [paid])
+    assert not blockchain.validate_chain(blockchain.chain + [replay])
+
+
+def test_relay_does_not_request_confirmed_transactions(funded):
+    blockchain, _, paid = funded
+    relay = TransactionRelay(None, nodes=list, lookup=blockchain.mempool.get, confirmed=blockchain.confirmed_transactions)
+    unknown = transaction_id(payment('alice', 'carol', 0.1))
+    assert relay.missing([transaction_id(paid), unknown]) == [unknown]
+
+
+def test_scan_skips_history_not_yet_fetched_after_snapshot(blockchain, make_block):
+    blockchain.append_block(make_block(blockchain.last_block, miner='alice'))
+    blockchain.append_block(make_block(blockchain.last_block, [payment('alice', 'bob', 0.5)]))
+    fresh = Blockchain()
+    fresh.set_pow_target(blockchain.pow_target, workers=1)
+    fresh.install_snapshot(make_snapshot(blockchain.chain, blockchain.state))
+    assert fresh.history_start == len(blockchain.chain)
+    assert fresh.new_transaction(payment('alice', 'carol', 0.25)) is not None
+    fresh.append_block(make_block(fresh.last_block, [payment('bob', 'carol', 0.25)]))
@@ -0,0 +1,36 @@
+import threading
+
+import blockchain_node_v3
+from snapshot import load_snapshot, make_snapshot
+
+
+def test_snapshot_is_built_outside_chain_lock(monkeypatch, tmp_path, blockchain, make_block):
+    blockchain.snapshot_path = str(tmp_path / 'snapshot.json')
+    blockchain.snapshot_interval = 3
+    held = []
+
+    def build(chain, state):
+        # 스냅샷 스레드에서 체인 잠금을 바로 잡을 수 있어야 합니다.
+        acquired = blockchain.lock.acquire(blocking=False)
+        held.append(not acquired)
+        if acquired:
+            blockchain.lock.release()
+        return make_snapshot(chain, state)
+    monkeypatch.setattr(blockchain_node_v3, 'make_snapshot', build)
+
+    release = threading.Event()
+    blockchain.snapshot_writer.submit(release.wait)  # 앞선 스냅샷이 밀려 있는 상황
+    for _ in range(4):
+        blockchain.append_block(make_block(blockchain.last_block))
+    # 스냅샷 스레드가 막혀 있어도 블록 추가는 기다리지 않습니다.
+    assert len(blockchain.chain) == 5 and held == []
+    release.set()
+    blockchain.snapshot_writer.submit(lambda: None).result()
+
+    assert held == [False]
+    snapshot = load_snapshot(blockchain.snapshot_path)
+    # 스냅샷은 쓰기를 예약한 시점(블록 #3)의 체인과 잔액입니다.
+    assert snapshot['height'] == 3
+    assert len(snapshot['headers']) == 3
+    assert blockchain.snapshot['height'] == 3
+    assert blockchain.write_snapshot()['height'] == 5
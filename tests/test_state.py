@@ -0,0 +1,132 @@
+import math
+
+import pytest
+
+from block import Block
+from conftest import coinbase, payment
+from state import AccountState, InvalidTransactionError, check_block_transactions
+
+
+def block_hash(chain_block):
+    # 시험용 블록은 작업 증명이 없으므로, 블록마다 다른 timestamp를 해시 대신 씁니다.
+    return f"hash-{chain_block['timestamp']}"
+
+
+def apply(state, index, transactions, timestamp=None):
+    new_block = Block(index, float(timestamp or index), transactions, 0, 'parent', None, None)
+    state.apply_block(new_block, block_hash(new_block))
+    return new_block
+
+
+def base_chain():
+    """제네시스 -> #2 (alice 채굴) -> #3 (alice가 bob에게 1 전송, bob 채굴)"""
+    state = AccountState()
+    genesis = Block(1, 1.0, [], 0, '1', None, None)
+    state.apply_block(genesis, block_hash(genesis), validate=False)
+    chain = [genesis, apply(state, 2, [coinbase('alice')]), apply(state, 3, [payment('alice', 'bob', 1), coinbase('bob')])]
+    return state, chain
+
+
+def test_apply_and_revert_restore_balances():
+    state, chain = base_chain()
+    assert (state.balance('alice'), state.balance('bob')) == (0, 2)
+    state.revert_block()
+    assert state.balances == {'alice': 1}
+    assert (state.height, state.tip_hash) == (2, block_hash(chain[1]))
+
+
+def test_reorg_matches_rebuild_of_new_chain():
+    state, chain = base_chain()
+    # 블록 #3 대신 alice가 carol에게 보내는 가지(#3', #4')로 교체
+    fork = [Block(3, 3.5, [payment('alice', 'carol', 0.5), coinbase('carol')], 0, block_hash(chain[1]), None, None),
+            Block(4, 4.0, [payment('carol', 'dave', 0.25), coinbase('dave')], 0, 'hash-3.5', None, None)]
+    state.reorg(chain, 2, fork, block_hash)
+    rebuilt = AccountState()
+    rebuilt.rebuild(chain[:2] + fork, block_hash)
+    assert state.balances == rebuilt.balances
+    assert state.balance('bob') == 0
+    assert (state.height, state.tip_hash) == (4, 'hash-4.0')
+
+
+def test_failed_reorg_restores_original_chain():
+    state, chain = base_chain()
+    before = dict(state.balances)
+    overspend = [Block(3, 3.5, [payment('alice', 'carol', 5), coinbase('carol')], 0, block_hash(chain[1]), None, None)]
+    with pytest.raises(InvalidTransactionError):
+        state.reorg(chain, 2, overspend, block_hash)
+    assert state.balances == before
+    assert (state.height, state.tip_hash) == (3, block_hash(chain[2]))
+
+
+def test_deep_reorg_beyond_undo_log_rebuilds():
+    state, chain = base_chain()
+    state.undo_log.clear()
+    fork = [Block(3, 3.5, [coinbase('carol')], 0, block_hash(chain[1]), None, None),
+            Block(4, 4.0, [coinbase('carol')], 0, 'hash-3.5', None, None)]
+    state.reorg(chain, 2, fork, block_hash)
+    assert state.balances == {'alice': 1, 'carol': 2}
+
+
+@pytest.mark.parametrize('transactions', [
+    [],
+    [payment('alice', 'bob', 1)],
+    [coinbase(), coinbase()],
+    [coinbase(), payment('alice', 'bob', 1)],
+    [dict(coinbase(), amount=10 ** 9)],
+    [dict(coinbase(), amount=float('nan'))],
+    [payment('alice', 'bob', 1, fee=0.5), coinbase()],
+    [payment('alice', 'bob', 1, fee=0.5), coinbase(fees=1)],
+    [payment('alice', 'bob', 1, fee='z'), coinbase()],
+    [{'recipient': 'bob', 'amount': 1, 'time': 1.0}, coinbase()],
+    ['not a transaction', coinbase()],
+])
+def test_bad_coinbase_or_shape_is_rejected(transactions):
+    with pytest.raises(InvalidTransactionError):
+        check_block_transactions(transactions)
+    state = AccountState()
+    with pytest.raises(InvalidTransactionError):
+        apply(state, 2, transactions)
+    assert state.balances == {} and state.height == 0
+
+
+@pytest.mark.parametrize('amount', [float('nan'), float('inf'), -float('inf'), 0, -1, True, '1'])
+def test_invalid_amount_is_rejected(amount):
+    state = AccountState()
+    apply(state, 2, [coinbase('alice')])
+    with pytest.raises(InvalidTransactionError):
+        state.check_transaction(payment('alice', 'bob', amount))
+    with pytest.raises(InvalidTransactionError):
+        apply(state, 3, [payment('alice', 'bob', amount), coinbase()])
+    assert state.balances == {'alice': 1}
+    assert all(math.isfinite(balance) for balance in state.balances.values())
+
+
+@pytest.mark.parametrize('fee', [float('nan'), float('inf'), -0.1, 'z'])
+def test_invalid_fee_is_rejected(fee):
+    state = AccountState()
+    apply(state, 2, [coinbase('alice')])
+    with pytest.raises(InvalidTransactionError):
+        state.check_transaction(payment('alice', 'bob', 0.5, fee=fee))
+
+
+def test_select_valid_drops_coinbase_and_overspend():
+    state = AccountState()
+    apply(state, 2, [coinbase('alice')])
+    ok = payment('alice', 'bob', 0.6)
+    assert state.select_valid([coinbase('alice'), ok, payment('alice', 'carol', 0.6)]) == [ok]
+
+
+def test_fee_is_paid_by_sender_to_miner():
+    state, chain = base_chain()
+    apply(state, 4, [payment('bob', 'carol', 1, fee=0.5), coinbase('miner', fees=0.5)])
+    assert (state.balance('bob'), state.balance('carol'), state.balance('miner')) == (0.5, 1, 1.5)
+    state.revert_block()
+    assert state.balances == {'alice': 0, 'bob': 2}
+
+
+def test_fee_counts_against_balance():
+    state, chain = base_chain()
+    with pytest.raises(InvalidTransactionError):
+        state.check_transaction(payment('bob', 'carol', 1.75, fee=0.5))
+    fee_payment = payment('bob', 'carol', 1, fee=0.5)
+    assert state.select_valid([fee_payment, payment('bob', 'dave', 0.75)]) == [fee_payment]
@@ -0,0 +1,201 @@
+"""
+이웃 선택(토폴로지)과 이웃 목록.
+
+노드마다 이웃을 max_peers개까지만 두고, 블록과 거래는 이웃에게서 이웃으로 한 단계씩 전달(gossip)합니다.
+노드 N개가 모두 서로 연결되면(full) 전파 메시지가 N×(N-1)개로 늘어나지만,
+이웃 수를 k개로 제한하면 N×k개 정도에 그칩니다. (이미 가진 블록/거래는 다시 전달하지 않으므로)
+    full        : 모든 기존 노드와 연결 (예전 동작)
+    random      : 기존 노드 중 무작위로 k개
+    lattice     : 바로 앞에 등록한 k개 (등록 순서로 이어진 격자. 지름이 길어 전파 단계가 많음)
+    small-world : 절반은 바로 앞에 등록한 노드, 나머지는 무작위 (격자에 지름길을 더한 형태)
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import requests
+
+TOPOLOGIES = ('full', 'random', 'lattice', 'small-world')
+DEFAULT_MAX_PEERS = 8
+
+
+def order_candidates(existing, topology, count, rng=random):
+    """
+    새 노드에게 소개할 기존 노드(등록 순서대로의 목록)를 연결을 시도할 순서로 정렬해 반환합니다.
+    앞에서부터 count개와 연결하되, 이웃이 가득 차서 거절한 노드가 있으면 다음 후보로 넘어갑니다.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"토폴로지는 {', '.join(TOPOLOGIES)} 중 하나여야 합니다: {topology}")
+    existing = list(existing)
+    if topology == 'full':
+        return existing
+    recent = existing[::-1]
+    if topology == 'lattice':
+        return recent
+    if topology == 'small-world':
+        nearest = recent[:count // 2]
+        rest = recent[count // 2:]
+        rng.shuffle(rest)
+        return nearest + rest
+    rng.shuffle(existing)
+    return existing
+
+
+def peer_address(url):
+    """'http://127.0.0.1:5001' 또는 '127.0.0.1:5001' -> '127.0.0.1:5001'"""
+    parsed_url = urlparse(url)
+    if parsed_url.netloc:
+        return parsed_url.netloc
+    if parsed_url.path:
+        return parsed_url.path
+    raise ValueError('잘못된 URL입니다.')
+
+
+class PeerTable:
+    """
+    노드의 이웃 목록과 주소록.
+    - 이웃(peers): 블록/거래를 주고받는 노드. max_peers개까지만 둡니다.
+    - 주소록(known): 이웃 교환으로 알게 되었거나 이웃에서 빠진 노드. 이웃 자리가 비면 여기서 채웁니다.
+    요청이 연속 max_failures번 실패한 이웃은 주소록으로 내립니다.
+    set처럼 in, len(), 반복을 쓸 수 있으며, 반복은 잠금 안에서 만든 사본을 돌므로 다른 스레드가 바꿔도 안전합니다.
+    """
+
+    def __init__(self, max_peers=DEFAULT_MAX_PEERS, max_failures=3, known_size=1000):
+        self.max_peers = max_peers
+        self.max_failures = max_failures
+        self.known_size = known_size
+        self.me = None                # 이 노드의 주소 (이웃으로 넣지 않음)
+        self.lock = threading.Lock()
+        self.peers = {}               # 이웃 주소 -> 연속 실패 횟수
+        self.known = OrderedDict()    # 주소록 (먼저 알게 된 순서)
+
+    def __contains__(self, address):
+        return address in self.peers
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.peers))
+
+    def __len__(self):
+        return len(self.peers)
+
+    @property
+    def free_slots(self):
+        return max(self.max_peers - len(self.peers), 0)
+
+    def add(self, address):
+        """이웃으로 추가합니다. 이미 이웃이면 True, 자리가 없으면 주소록에만 넣고 False를 반환합니다."""
+        if address == self.me:
+            return False
+        with self.lock:
+            if address in self.peers:
+                return True
+            if len(self.peers) >= self.max_peers:
+                self._remember(address)
+                return False
+            self.peers[address] = 0
+            self.known.pop(address, None)
+            return True
+
+    def discard(self, address):
+        """이웃에서 빼고 주소록으로 옮깁니다."""
+        with self.lock:
+            if self.peers.pop(address, None) is not None:
+                self._remember(address)
+
+    def forget(self, address):
+        """주소록에서 지웁니다. (연결할 수 없는 주소)"""
+        with self.lock:
+            self.known.pop(address, None)
+
+    def learn(self, addresses):
+        """이웃 교환으로 받은 주소들을 주소록에 넣고, 새로 알게 된 수를 반환합니다."""
+        learned = 0
+        with self.lock:
+            for address in addresses:
+                if address != self.me and address not in self.peers and address not in self.known:
+                    self._remember(address)
+                    learned += 1
+        return learned
+
+    def candidates(self, count, rng=random):
+        """이웃이 아닌 주소록의 주소를 무작위로 최대 count개"""
+        with self.lock:
+            known = list(self.known)
+        return rng.sample(known, min(count, len(known)))
+
+    def record(self, address, error):
+        """이웃 요청 결과를 기록합니다. 연속으로 max_failures번 실패하면 이웃에서 빼고 True를 반환합니다."""
+        with self.lock:
+            if address not in self.peers:
+                return False
+            if error is None:
+                self.peers[address] = 0
+                return False
+            self.peers[address] += 1
+            if self.peers[address] < self.max_failures:
+                return False
+            del self.peers[address]
+            self._remember(address)
+            return True
+
+    def _remember(self, address):
+        # self.lock을 잡은 상태에서 호출
+        self.known[address] = None
+        self.known.move_to_end(address)
+        while len(self.known) > self.known_size:
+            self.known.popitem(last=False)
+
+
+class PeerExchange:
+    """
+    interval초마다 이웃 하나에게 이웃 목록(/nodes/peers)을 받아 주소록에 넣고,
+    이웃 자리가 비어 있으면 주소록의 노드에게 /add_peer로 연결을 요청합니다.
+    (관제실이 처음에 소개해 준 이웃이 빠지더라도, 네트워크가 끊어지지 않도록 이웃을 다시 채웁니다)
+    """
+
+    def __init__(self, table, peers, my_url, interval=30.0, on_connect=None, rng=random):
+        self.table = table
+        self.peers = peers          # PeerClient
+        self.my_url = my_url
+        self.interval = interval
+        self.on_connect = on_connect  # 새 이웃과 연결되면 호출 (주소)
+        self.rng = rng
+        self._thread = None
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='peer-exchange', daemon=True)
+            self._thread.start()
+
+    def exchange(self):
+        """한 번 실행합니다. 새로 연결한 이웃 수를 반환합니다."""
+        neighbors = list(self.table)
+        if neighbors:
+            node = self.rng.choice(neighbors)
+            try:
+                response = self.peers.get(node, '/nodes/peers', retries=0)
+                response.raise_for_status()
+                self.table.learn(peer_address(url) for url in response.json().get('peers', []))
+            except (requests.exceptions.RequestException, ValueError):
+                pass  # 실패는 on_request로 기록되어, 계속 실패하면 이웃에서 빠집니다.
+        connected = 0
+        for address in self.table.candidates(self.table.free_slots):
+            try:
+                response = self.peers.post(address, '/add_peer', json={'peer_url': self.my_url}, retries=0)
+            except requests.exceptions.RequestException:
+                self.table.forget(address)
+                continue
+            # 상대가 이웃으로 받아 준 경우(201)에만 연결합니다. (가득 찼으면 200: 주소록에 남겨 두고 나중에 다시 시도)
+            if response.status_code == 201 and self.table.add(address):
+                connected += 1
+                if self.on_connect:
+                    self.on_connect(address)
+        return connected
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.exchange()